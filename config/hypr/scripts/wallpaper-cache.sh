@@ -0,0 +1,149 @@
+#!/bin/bash
+# Pre-scaled wallpaper cache
+#
+# swww decodes and scales the original image on every switch (and keeps it
+# around for the whole transition), so wallpapers are scaled and cropped
+# ahead of time to each monitor mode in monitors.conf and stored as
+# uncompressed PNGs, which decode almost as fast as they are read.
+#
+#   wallpaper-cache.sh prepare      Build copies of every wallpaper, in parallel
+#   wallpaper-cache.sh path IMAGE   Print "FILE<TAB>OUTPUTS" lines to hand to
+#                                   swww, building missing copies first:
+#                                   outputs named by a monitor rule get the
+#                                   copy for its mode, every other output the
+#                                   copy for a nameless rule's mode or else
+#                                   the original (OUTPUTS empty: all outputs)
+#
+# Copies are keyed by content hash and mode, so renamed or duplicate files
+# share them. The cache is trimmed to WALLPAPER_CACHE_MB (default 1024),
+# least recently used first; `path` marks a copy as used.
+
+set -euo pipefail
+
+WALLDIR="$HOME/Pictures/wallpapers"
+MONITORS_CONF="$HOME/.config/hypr/config/monitors.conf"
+SCALED_CACHE="$HOME/.cache/wallpapers/scaled"
+CACHE_LIMIT_MB="${WALLPAPER_CACHE_MB:-1024}"
+
+mkdir -p "$SCALED_CACHE"
+
+# "OUTPUT WIDTHxHEIGHT" for each monitor with an explicit mode
+# (preferred/highres rules give no size to scale to)
+monitor_modes() {
+    local line name
+    [[ -f "$MONITORS_CONF" ]] || return 0
+    while IFS= read -r line; do
+        if [[ "$line" =~ ^[[:space:]]*monitor[[:space:]]*=[[:space:]]*([^,]*),[[:space:]]*([0-9]+x[0-9]+) ]]; then
+            name="${BASH_REMATCH[1]%"${BASH_REMATCH[1]##*[![:space:]]}"}"
+            echo "${name:-*} ${BASH_REMATCH[2]}"
+        fi
+    done < "$MONITORS_CONF"
+}
+
+# Distinct modes, e.g. "1920x1080"
+distinct_modes() {
+    monitor_modes | awk '!seen[$2]++ { print $2 }'
+}
+
+# Names of the connected outputs (empty outside a Hyprland session)
+connected_outputs() {
+    command -v hyprctl &>/dev/null || return 0
+    hyprctl monitors 2>/dev/null | awk '/^Monitor / { print $2 }'
+}
+
+content_key() {
+    sha256sum "$1" | cut -c1-16
+}
+
+# Scale and crop one image to every configured mode (skips existing copies)
+scale_image() {
+    local img=$1 key mode out tmp
+    key=$(content_key "$img")
+    for mode in $(distinct_modes); do
+        out="$SCALED_CACHE/$key-$mode.png"
+        [[ -f "$out" ]] && continue
+        tmp="$SCALED_CACHE/.$key-$mode.$$.png"
+        if magick "$img" -resize "${mode}^" -gravity center -extent "$mode" \
+            -strip -alpha off \
+            -define png:compression-level=0 -define png:compression-filter=0 \
+            "PNG24:$tmp" 2>/dev/null; then
+            mv -f "$tmp" "$out"
+        else
+            rm -f "$tmp"
+            echo "wallpaper-cache: could not scale $img" >&2
+        fi
+    done
+}
+
+# Delete least recently used copies until the cache fits the size limit
+evict() {
+    local limit=$(( CACHE_LIMIT_MB * 1024 * 1024 ))
+    find "$SCALED_CACHE" -maxdepth 1 -type f -name '*.png' -printf '%T@ %s %p\n' \
+        | sort -rn \
+        | awk -v limit="$limit" '{ total += $2; if (total > limit) { sub(/^[^ ]+ [^ ]+ /, ""); print } }' \
+        | while IFS= read -r old; do rm -f "$old"; done
+}
+
+prepare() {
+    command -v magick &>/dev/null || { echo "wallpaper-cache: magick not found" >&2; exit 1; }
+    [[ -n "$(distinct_modes)" ]] || exit 0
+    find "$WALLDIR" -type f \( -iname "*.png" -o -iname "*.jpg" -o -iname "*.jpeg" -o -iname "*.webp" -o -iname "*.bmp" \) -print0 \
+        | xargs -0 -r -n 1 -P "$(nproc)" "$0" scale
+    evict
+}
+
+path() {
+    local img=$1 key mode out name fallback file
+    local -a modes outputs
+    local -A named=() files=()
+    mapfile -t modes < <(monitor_modes)
+    mapfile -t outputs < <(connected_outputs)
+
+    # No usable mode, no ImageMagick or no output list: the original, for
+    # all outputs
+    if [[ ${#modes[@]} -eq 0 || ${#outputs[@]} -eq 0 ]] || ! command -v magick &>/dev/null; then
+        printf '%s\t\n' "$img"
+        return
+    fi
+
+    key=$(content_key "$img")
+    for mode in "${modes[@]}"; do
+        if [[ ! -f "$SCALED_CACHE/$key-${mode#* }.png" ]]; then
+            scale_image "$img"
+            evict
+            break
+        fi
+    done
+
+    # Copy per named output; a rule without a name (and with a mode) covers
+    # the outputs no rule names, which otherwise get the original
+    fallback=$img
+    for mode in "${modes[@]}"; do
+        out="$SCALED_CACHE/$key-${mode#* }.png"
+        [[ -f "$out" ]] || out=$img
+        if [[ "${mode% *}" == "*" ]]; then
+            fallback=$out
+        else
+            named[${mode% *}]=$out
+        fi
+    done
+
+    # One swww call per file, for all the outputs showing it
+    for name in "${outputs[@]}"; do
+        file=${named[$name]:-$fallback}
+        files[$file]+="${files[$file]:+,}$name"
+    done
+    for file in "${!files[@]}"; do
+        if [[ "$file" != "$img" ]]; then
+            touch "$file"
+        fi
+        printf '%s\t%s\n' "$file" "${files[$file]}"
+    done
+}
+
+case "${1:-}" in
+    prepare) prepare ;;
+    path)    path "$2" ;;
+    scale)   scale_image "$2" ;;
+    *)       echo "Usage: $(basename "$0") prepare | path IMAGE" >&2; exit 1 ;;
+esac
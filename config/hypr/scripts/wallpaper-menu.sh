@@ -67,15 +67,20 @@ chosen=$(echo "$chosen" | sed 's/^⭐ //' | sed 's/^\[.*\] //' | xargs)
 # Find the actual file path
 WALLPATH=$(find "$WALLDIR" -type f -name "$chosen" | head -1)
 
-# Set wallpaper with swww
+# Set wallpaper with swww, from the copies pre-scaled to each monitor mode
 if command -v swww &> /dev/null; then
-  swww img "$WALLPATH" \
-    --transition-type grow \
-    --transition-pos 0.925,0.977 \
-    --transition-duration 1.5 \
-    --transition-fps 60
+  while IFS=$'\t' read -r scaled output; do
+    swww img "$scaled" ${output:+--outputs "$output"} \
+      --transition-type grow \
+      --transition-pos 0.925,0.977 \
+      --transition-duration 1.5 \
+      --transition-fps 60
+  done < <("$HOME/.config/hypr/scripts/wallpaper-cache.sh" path "$WALLPATH")
   
   echo "$WALLPATH" > "$CURRENT_WALL"
+
+  # Pre-blur the new wallpaper for the lock screen
+  "$HOME/.config/theme-switcher/scripts/generate-themes.py" --lock-background &>/dev/null &
   
   notify-send "Wallpaper Changed! 🎨" "$chosen" \
     -u low \
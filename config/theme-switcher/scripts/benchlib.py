@@ -0,0 +1,77 @@
+"""
+Starship prompt latency benchmark for generate-themes.py --bench-prompt:
+times `starship prompt` under several configs in stub directories that
+exercise the prompt's modules (plain, deep, git and language projects).
+Imported by --bench-prompt only.
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# ============================================================================
+# PROMPT BENCHMARK
+# ============================================================================
+
+def make_prompt_stubs(root: Path) -> Dict[str, Path]:
+    """Directories that exercise the prompt's modules: plain, deep, git and language projects"""
+    stubs = {
+        'plain': root / 'plain',
+        'deep': root / 'deep' / 'a' / 'b' / 'c' / 'd' / 'e',
+        'git': root / 'git',
+        'python': root / 'python',
+        'rust': root / 'rust',
+    }
+    for path in stubs.values():
+        path.mkdir(parents=True)
+    (stubs['python'] / 'pyproject.toml').write_text('[project]\nname = "stub"\n')
+    (stubs['python'] / 'main.py').write_text('print("stub")\n')
+    (stubs['rust'] / 'Cargo.toml').write_text('[package]\nname = "stub"\nversion = "0.1.0"\n')
+    if shutil.which('git'):
+        subprocess.run(['git', 'init', '-q', str(stubs['git'])],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    (stubs['git'] / 'README').write_text('stub\n')
+    return stubs
+
+
+def time_prompt(starship: str, config: Path, cwd: Path, runs: int) -> List[float]:
+    """Wall time in ms of `starship prompt` with the given config, one warm-up run discarded"""
+    env = dict(os.environ, STARSHIP_CONFIG=str(config), STARSHIP_SHELL='zsh',
+               STARSHIP_LOG='error', PWD=str(cwd))
+    argv = [starship, 'prompt', '--status', '0', '--cmd-duration', '10', '--jobs', '0']
+    times = []
+    for run in range(runs + 1):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if run:
+            times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def compare_configs(starship: str, theme_name: str, configs: Dict[str, str], runs: int) -> None:
+    """
+    Time `starship prompt` under each config (label -> config text) in
+    every stub directory; prints median and p90 per directory.
+    """
+    with tempfile.TemporaryDirectory(prefix='starship-bench-') as tmp:
+        root = Path(tmp)
+        config_files = {}
+        for label, text in configs.items():
+            config_files[label] = root / f"{label.replace(' ', '-')}.toml"
+            config_files[label].write_text(text)
+        stubs = make_prompt_stubs(root / 'stubs')
+        
+        print(f"⏱️  starship prompt, {theme_name}, {runs} runs per directory (median / p90 ms)\n")
+        print(f"  {'directory':<10} " + ''.join(f"{label:>20}" for label in configs))
+        for name, cwd in stubs.items():
+            cells = []
+            for label, config in config_files.items():
+                times = sorted(time_prompt(starship, config, cwd, runs))
+                p90 = times[min(len(times) - 1, int(len(times) * 0.9))]
+                cells.append(f"{statistics.median(times):9.2f} / {p90:6.2f}")
+            print(f"  {name:<10} " + ''.join(f"{cell:>20}" for cell in cells))
@@ -0,0 +1,131 @@
+"""
+Single-file theme bundles: a header, a JSON index of (theme, file) ->
+offset/length/sha256, then the concatenated rendered outputs. Reading
+memory-maps the file and hands out zero-copy slices. Imported by
+--bundle and when --ensure finds an installed bundle.
+
+    with ThemeBundle(Path('themes.bundle')) as bundle:
+        data = bundle.read('nord', 'kitty-theme.conf', verify=True)
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BUNDLE_MAGIC = b"THEMEBDL"
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct("<8sII")  # magic, version, index length
+
+# ============================================================================
+# READING
+# ============================================================================
+
+class ThemeBundle:
+    """
+    Read-only view of a theme bundle. The file is memory-mapped once and
+    every output is returned as a zero-copy memoryview slice of the map.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, index_len = BUNDLE_HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = version = index_len = None
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} theme bundle")
+        start = BUNDLE_HEADER.size
+        self.index = json.loads(self._map[start:start + index_len])
+    
+    def __enter__(self) -> 'ThemeBundle':
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    def __contains__(self, theme_name: str) -> bool:
+        return theme_name in self.index
+    
+    def close(self) -> None:
+        self._map.close()
+    
+    def themes(self) -> List[str]:
+        return sorted(self.index)
+    
+    def read(self, theme_name: str, filename: str, verify: bool = False) -> memoryview:
+        """One rendered output, optionally checked against its index hash"""
+        offset, length, digest = self.index[theme_name]['files'][filename]
+        view = memoryview(self._map)[offset:offset + length]
+        if verify and hashlib.sha256(view).hexdigest() != digest:
+            raise ValueError(f"{self.path}: corrupt entry {theme_name}/{filename}")
+        return view
+    
+    def files(self, theme_name: str, verify: bool = False) -> Dict[str, memoryview]:
+        return {name: self.read(theme_name, name, verify)
+                for name in self.index[theme_name]['files']}
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def pack_bundle(path: Path, themes: Iterable[Tuple[str, Optional[str], Dict[str, bytes]]]) -> int:
+    """
+    Write (theme, palette hash, {filename: data}) entries as a bundle,
+    atomically. Identical outputs are stored once. Returns the number of
+    themes written.
+    """
+    blobs: List[bytes] = []
+    offsets: Dict[str, Tuple[int, int]] = {}   # sha256 -> (blob number, length)
+    index: Dict[str, Dict] = {}
+    
+    for theme, palette, theme_files in themes:
+        entry = {'palette': palette, 'files': {}}
+        for filename, data in theme_files.items():
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in offsets:
+                offsets[digest] = (len(blobs), len(data))
+                blobs.append(data)
+            entry['files'][filename] = digest
+        index[theme] = entry
+    
+    # Offsets depend on the index length, which depends on the offsets'
+    # digits: lay out with placeholders until the length settles
+    starts = [0] * len(blobs)
+    position = 0
+    for i, blob in enumerate(blobs):
+        starts[i] = position
+        position += len(blob)
+    
+    index_bytes = b''
+    while True:
+        base = BUNDLE_HEADER.size + len(index_bytes)
+        resolved = {
+            theme: {'palette': entry['palette'], 'files': {
+                filename: [base + starts[offsets[digest][0]], offsets[digest][1], digest]
+                for filename, digest in entry['files'].items()
+            }}
+            for theme, entry in index.items()
+        }
+        encoded = json.dumps(resolved, separators=(',', ':'), sort_keys=True).encode()
+        settled = len(encoded) == len(index_bytes)
+        index_bytes = encoded
+        if settled:
+            break
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    with open(tmp, 'wb') as f:
+        f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+    return len(index)
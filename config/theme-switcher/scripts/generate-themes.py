@@ -3,15 +3,50 @@
 """
 Theme Generator for Hyprland Dotfiles
 Generates theme files for multiple applications from JSON color palettes
+
+Rendering itself lives in themelib.py; this script adds the palette
+library, caches, bundles and the switcher's IPC helpers around it. The
+machinery only some subcommands need lives in sibling modules imported by
+those subcommands, so the switcher's frequent calls start quickly:
+
+  imagelib.py    PNG codec and blur (swatches, --lock-background)
+  bundlelib.py   theme bundle format (--bundle, --ensure)
+  reloadlib.py   concurrent reload strategies (--reload)
+  ipclib.py      kitty/Hyprland sockets (--transition, --workspace-accents, previews)
+  schedlib.py    schedule rules and timerfd wait (--schedule)
+  benchlib.py    starship prompt benchmark (--bench-prompt)
 """
 
+import functools
+import glob
+import hashlib
 import json
+import os
+import re
+import runpy
+import shlex
+import shutil
+import subprocess
 import sys
+import time
+import warnings
+import zlib
 from pathlib import Path
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from dataclasses import asdict
 import argparse
 
+import themelib
+from themelib import (
+    BASE16_SLOTS, BASE24_SLOTS, MIN_TEXT_CONTRAST, MIN_UI_CONTRAST, TARGETS,
+    THEME_REQUIRED_COLORS, VARIANTS, ContrastResult, PaletteError, PaletteVariant,
+    Target, ThemeConfig, audit_contrast, derive_palettes, fix_contrast,
+    generate_hyprland_colors, generate_kitty,
+    get_mapped_colors, hex_to_oklab, oklab_to_hex, register_target,
+    relative_luminance, validate_palette,
+)
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -19,276 +54,145 @@ import argparse
 BASE_DIR = Path.home() / ".config" / "theme-switcher"
 PALETTES_DIR = BASE_DIR / "palettes"
 THEMES_DIR = BASE_DIR / "themes"
-
-# Theme-specific required colors (different themes use different naming)
-THEME_REQUIRED_COLORS = {
-    'catppuccin-mocha': {'base', 'text', 'red', 'green', 'yellow', 'blue', 'pink'},
-    'catppuccin-latte': {'base', 'text', 'red', 'green', 'yellow', 'blue', 'pink'},
-    'rose-pine': {'base', 'text', 'love', 'gold', 'pine', 'foam', 'iris', 'rose'},
-    'nord': {'nord0', 'nord4', 'nord10', 'nord11', 'nord13', 'nord14'},
-    'gruvbox': {'bg', 'fg', 'red', 'green', 'yellow', 'blue', 'orange'},
-    'tokyo-night': {'bg', 'fg', 'red', 'green', 'yellow', 'blue', 'cyan'},
-    'dracula': {'bg', 'fg', 'red', 'green', 'yellow', 'cyan', 'pink'},
-}
-
-# Universal fallback for unknown themes
-REQUIRED_COLORS = {
-    'base', 'text', 'red', 'green', 'yellow', 'blue'
+PALETTE_INDEX_FILE = BASE_DIR / ".palette-index.json"
+MENU_CACHE_FILE = BASE_DIR / "menu.tsv"
+
+# Compact index theme-query.py answers list/current/validate-status from
+# without importing this script (see write_query_index)
+QUERY_INDEX_FILE = BASE_DIR / ".theme-index.tsv"
+QUERY_INDEX_VERSION = 1
+
+# Starship prompt layout; when present, the starship target renders one
+# complete starship.toml per theme from it (see starship_config_target)
+STARSHIP_LAYOUT_FILE = BASE_DIR.parent / "starship" / "layout.toml"
+
+# Lazily rendered themes (see --ensure), most recently used kept
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "theme-switcher"
+THEME_CACHE_DIR = CACHE_DIR / "themes"
+THEME_CACHE_SIZE = 8
+
+# Single-file bundle of rendered themes (see --bundle): header, JSON index
+# of (theme, file) -> offset/length/sha256, then the concatenated outputs
+BUNDLE_FILE = BASE_DIR / "themes.bundle"
+
+# Derived palette variants ('nord-oled', ...): definitions in variants.json
+# (a list of PaletteVariant fields; the built-in variants when missing),
+# derived palettes cached per palette hash and variant
+VARIANTS_FILE = BASE_DIR / "variants.json"
+VARIANT_CACHE_FILE = CACHE_DIR / "variants.json"
+
+# Menu swatch icons, one PNG per palette hash
+SWATCH_DIR = CACHE_DIR / "swatches"
+SWATCH_SIZE = 64
+SWATCH_ACCENTS = ['red', 'peach', 'yellow', 'green', 'teal', 'blue', 'mauve', 'pink']
+
+# Animated theme transitions (see --transition): frames are pushed over IPC
+# to running kitty instances (kitty.conf: listen_on
+# unix:${XDG_RUNTIME_DIR}/kitty) and to the Hyprland compositor
+TRANSITION_FRAMES = 30
+TRANSITION_FPS = 60
+TRANSITION_TARGETS = ('kitty', 'hyprland')
+KITTY_SOCKET_GLOB = os.path.join(os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}"), "kitty-*")
+
+# Reload orchestration (see --reload): every reload runs concurrently with a
+# per-attempt timeout and bounded retries; restarted daemons must stay up
+# for RELOAD_READY_SETTLE seconds to count as ready
+RELOAD_TIMEOUT = 5.0
+RELOAD_RETRIES = 2
+RELOAD_READY_SETTLE = 0.2
+
+# Cached shell init (see --shell-init): the theme's shell colors plus the
+# output of each tool's init command, rebuilt only when the theme or a tool
+# binary changes, so .zshrc sources a single pre-compiled file
+SHELL_INIT_FILE = CACHE_DIR / "shell-init.zsh"
+SHELL_COMPDUMP = CACHE_DIR / "zcompdump"
+SHELL_INIT_TOOLS = {
+    'starship': ['init', 'zsh', '--print-full-init'],
+    'zoxide': ['init', 'zsh'],
 }
 
-# ============================================================================
-# DATA CLASSES
-# ============================================================================
-
-@dataclass
-class ThemeConfig:
-    """Configuration for theme generation"""
-    name: str
-    palette_file: Path
-    output_dir: Path
-    colors: Dict[str, str]
-
-
-# ============================================================================
-# COLOR MAPPING FUNCTIONS
-# ============================================================================
-
-def get_mapped_colors(theme_name: str, colors: Dict[str, str]) -> Dict[str, str]:
-    """
-    Map theme-specific color names to a unified color scheme.
-    This allows different themes to use their own naming conventions.
-    """
-    
-    # Catppuccin themes (Mocha, Latte, etc.)
-    if theme_name.startswith("catppuccin"):
-        return {
-            'base': colors.get('base', '#1e1e2e'),
-            'mantle': colors.get('mantle', '#181825'),
-            'crust': colors.get('crust', '#11111b'),
-            'text': colors.get('text', '#cdd6f4'),
-            'subtext0': colors.get('subtext0', '#a6adc8'),
-            'subtext1': colors.get('subtext1', '#bac2de'),
-            'surface0': colors.get('surface0', '#313244'),
-            'surface1': colors.get('surface1', '#45475a'),
-            'surface2': colors.get('surface2', '#585b70'),
-            'overlay0': colors.get('overlay0', '#6c7086'),
-            'overlay1': colors.get('overlay1', '#7f849c'),
-            'blue': colors.get('blue', '#89b4fa'),
-            'lavender': colors.get('lavender', '#b4befe'),
-            'sapphire': colors.get('sapphire', '#74c7ec'),
-            'sky': colors.get('sky', '#89dceb'),
-            'teal': colors.get('teal', '#94e2d5'),
-            'green': colors.get('green', '#a6e3a1'),
-            'yellow': colors.get('yellow', '#f9e2af'),
-            'peach': colors.get('peach', '#fab387'),
-            'maroon': colors.get('maroon', '#eba0ac'),
-            'red': colors.get('red', '#f38ba8'),
-            'mauve': colors.get('mauve', '#cba6f7'),
-            'pink': colors.get('pink', '#f5c2e7')
-        }
-    
-    # Rose Pine theme
-    elif theme_name == "rose-pine":
-        return {
-            'base': colors.get('base', '#191724'),
-            'mantle': colors.get('surface', '#1f1d2e'),
-            'crust': colors.get('base', '#191724'),
-            'text': colors.get('text', '#e0def4'),
-            'subtext0': colors.get('subtle', '#908caa'),
-            'subtext1': colors.get('subtle', '#908caa'),
-            'surface0': colors.get('surface', '#1f1d2e'),
-            'surface1': colors.get('overlay', '#26233a'),
-            'surface2': colors.get('highlight_med', '#403d52'),
-            'overlay0': colors.get('muted', '#6e6a86'),
-            'overlay1': colors.get('subtle', '#908caa'),
-            'blue': colors.get('pine', '#31748f'),
-            'lavender': colors.get('iris', '#c4a7e7'),
-            'sapphire': colors.get('foam', '#9ccfd8'),
-            'sky': colors.get('foam', '#9ccfd8'),
-            'teal': colors.get('foam', '#9ccfd8'),
-            'green': colors.get('foam', '#9ccfd8'),
-            'yellow': colors.get('gold', '#f6c177'),
-            'peach': colors.get('gold', '#f6c177'),
-            'maroon': colors.get('love', '#eb6f92'),
-            'red': colors.get('love', '#eb6f92'),
-            'mauve': colors.get('iris', '#c4a7e7'),
-            'pink': colors.get('rose', '#ebbcba')
-        }
-    
-    # Nord theme
-    elif theme_name == "nord":
-        return {
-            'base': colors.get('nord0', '#2e3440'),
-            'mantle': colors.get('nord1', '#3b4252'),
-            'crust': colors.get('nord0', '#2e3440'),
-            'text': colors.get('nord4', '#d8dee9'),
-            'subtext0': colors.get('nord4', '#d8dee9'),
-            'subtext1': colors.get('nord5', '#e5e9f0'),
-            'surface0': colors.get('nord1', '#3b4252'),
-            'surface1': colors.get('nord2', '#434c5e'),
-            'surface2': colors.get('nord3', '#4c566a'),
-            'overlay0': colors.get('nord3', '#4c566a'),
-            'overlay1': colors.get('nord4', '#d8dee9'),
-            'blue': colors.get('nord10', '#5e81ac'),
-            'lavender': colors.get('nord15', '#b48ead'),
-            'sapphire': colors.get('nord8', '#88c0d0'),
-            'sky': colors.get('nord8', '#88c0d0'),
-            'teal': colors.get('nord7', '#8fbcbb'),
-            'green': colors.get('nord14', '#a3be8c'),
-            'yellow': colors.get('nord13', '#ebcb8b'),
-            'peach': colors.get('nord12', '#d08770'),
-            'maroon': colors.get('nord11', '#bf616a'),
-            'red': colors.get('nord11', '#bf616a'),
-            'mauve': colors.get('nord15', '#b48ead'),
-            'pink': colors.get('nord15', '#b48ead')
-        }
-    
-    # Gruvbox theme
-    elif theme_name == "gruvbox":
-        return {
-            'base': colors.get('bg', '#282828'),
-            'mantle': colors.get('bg0', '#282828'),
-            'crust': colors.get('bg', '#282828'),
-            'text': colors.get('fg', '#ebdbb2'),
-            'subtext0': colors.get('fg2', '#d5c4a1'),
-            'subtext1': colors.get('fg1', '#ebdbb2'),
-            'surface0': colors.get('bg1', '#3c3836'),
-            'surface1': colors.get('bg2', '#504945'),
-            'surface2': colors.get('bg3', '#665c54'),
-            'overlay0': colors.get('bg4', '#7c6f64'),
-            'overlay1': colors.get('gray', '#928374'),
-            'blue': colors.get('blue', '#83a598'),
-            'lavender': colors.get('purple', '#d3869b'),
-            'sapphire': colors.get('aqua', '#8ec07c'),
-            'sky': colors.get('aqua', '#8ec07c'),
-            'teal': colors.get('aqua', '#8ec07c'),
-            'green': colors.get('green', '#b8bb26'),
-            'yellow': colors.get('yellow', '#fabd2f'),
-            'peach': colors.get('orange', '#fe8019'),
-            'maroon': colors.get('red', '#fb4934'),
-            'red': colors.get('red', '#fb4934'),
-            'mauve': colors.get('purple', '#d3869b'),
-            'pink': colors.get('purple', '#d3869b')
-        }
-    
-    # Tokyo Night theme
-    elif theme_name == "tokyo-night":
-        return {
-            'base': colors.get('bg', '#1a1b26'),
-            'mantle': colors.get('bg_dark', '#16161e'),
-            'crust': colors.get('bg_dark', '#16161e'),
-            'text': colors.get('fg', '#c0caf5'),
-            'subtext0': colors.get('fg_dark', '#a9b1d6'),
-            'subtext1': colors.get('fg', '#c0caf5'),
-            'surface0': colors.get('bg_highlight', '#292e42'),
-            'surface1': colors.get('terminal_black', '#414868'),
-            'surface2': colors.get('dark3', '#545c7e'),
-            'overlay0': colors.get('comment', '#565f89'),
-            'overlay1': colors.get('dark5', '#737aa2'),
-            'blue': colors.get('blue', '#7aa2f7'),
-            'lavender': colors.get('purple', '#bb9af7'),
-            'sapphire': colors.get('cyan', '#7dcfff'),
-            'sky': colors.get('cyan', '#7dcfff'),
-            'teal': colors.get('teal', '#1abc9c'),
-            'green': colors.get('green', '#9ece6a'),
-            'yellow': colors.get('yellow', '#e0af68'),
-            'peach': colors.get('orange', '#ff9e64'),
-            'maroon': colors.get('red1', '#db4b4b'),
-            'red': colors.get('red', '#f7768e'),
-            'mauve': colors.get('purple', '#bb9af7'),
-            'pink': colors.get('magenta', '#ff007c')
-        }
-    
-    # Dracula theme
-    elif theme_name == "dracula":
-        return {
-            'base': colors.get('bg', '#282a36'),
-            'mantle': colors.get('bg', '#282a36'),
-            'crust': colors.get('bg', '#282a36'),
-            'text': colors.get('fg', '#f8f8f2'),
-            'subtext0': colors.get('comment', '#6272a4'),
-            'subtext1': colors.get('fg', '#f8f8f2'),
-            'surface0': colors.get('current_line', '#44475a'),
-            'surface1': colors.get('selection', '#44475a'),
-            'surface2': colors.get('selection', '#44475a'),
-            'overlay0': colors.get('comment', '#6272a4'),
-            'overlay1': colors.get('comment', '#6272a4'),
-            'blue': colors.get('cyan', '#8be9fd'),
-            'lavender': colors.get('purple', '#bd93f9'),
-            'sapphire': colors.get('cyan', '#8be9fd'),
-            'sky': colors.get('cyan', '#8be9fd'),
-            'teal': colors.get('cyan', '#8be9fd'),
-            'green': colors.get('green', '#50fa7b'),
-            'yellow': colors.get('yellow', '#f1fa8c'),
-            'peach': colors.get('orange', '#ffb86c'),
-            'maroon': colors.get('red', '#ff5555'),
-            'red': colors.get('red', '#ff5555'),
-            'mauve': colors.get('purple', '#bd93f9'),
-            'pink': colors.get('pink', '#ff79c6')
-        }
-    
-    # Default/unknown theme - try to use colors as-is
-    else:
-        print(f"⚠️  Warning: Unknown theme '{theme_name}', using direct color mapping")
-        return colors
-
+# Pre-blurred lock screen backgrounds (see --lock-background): the current
+# wallpaper's pre-scaled copy, downscaled, blurred and tinted toward the
+# theme's base color, cached per content hash; hyprlock.conf sources the
+# generated background block
+CURRENT_WALLPAPER_FILE = Path.home() / ".cache" / "current_wallpaper"
+WALLPAPER_CACHE_SCRIPT = BASE_DIR.parent / "hypr" / "scripts" / "wallpaper-cache.sh"
+LOCK_BACKGROUND_CONF = BASE_DIR.parent / "hypr" / "hyprlock-background.conf"
+LOCK_CACHE_DIR = CACHE_DIR / "lock"
+LOCK_CACHE_SIZE = 8
+LOCK_WIDTH = 480          # blurred image width; hyprlock scales it to the monitor
+LOCK_BLUR_WINDOW = 8      # box width in downscaled pixels (a power of two)
+LOCK_BLUR_PASSES = 3
+LOCK_TINT = 0.25          # share of the theme's base color
+LOCK_BRIGHTNESS = 0.82
+
+# Scheduled switching (see --schedule): rules in schedule.json, the next
+# theme pre-rendered into STAGE_DIR so a switch is only copies and reloads
+SCHEDULE_FILE = BASE_DIR / "schedule.json"
+STAGE_DIR = CACHE_DIR / "staged"
+SWITCHER = Path(__file__).resolve().with_name("switcher.sh")
+SWITCH_QUEUED_STATUS = 3  # apply handed the request to a running switch
+DUSK_STEPS = 4
+
+# Per-workspace border accents (see --workspace-accents): precomputed batch
+# requests, pushed by a listener on Hyprland's event socket
+WORKSPACE_ACCENTS_FILE = BASE_DIR.parent / "hypr" / "workspace-accents.tsv"
+
+# Library warnings (unknown theme families, odd color values) are printed
+# like the rest of this script's messages, each distinct one once per run:
+# a palette is mapped from several places (index, variants, each render)
+_shown_warnings: set = set()
+
+
+def show_warning(message, *_) -> None:
+    if str(message) not in _shown_warnings:
+        _shown_warnings.add(str(message))
+        print(f"⚠️  Warning: {message}")
+
+
+warnings.showwarning = show_warning
 
 # ============================================================================
-# VALIDATION FUNCTIONS
+# PALETTE LOADING
 # ============================================================================
 
-def validate_palette(palette: Dict[str, str], theme_name: str) -> bool:
-    """Validate that a palette has all required colors for its theme type"""
-    
-    # Get required colors for this specific theme
-    required = THEME_REQUIRED_COLORS.get(theme_name, REQUIRED_COLORS)
-    
-    # Filter out the 'name' key as it's metadata, not a color
-    palette_colors = {k: v for k, v in palette.items() if k != 'name'}
-    
-    missing_colors = required - set(palette_colors.keys())
-    
-    if missing_colors:
-        print(f"❌ Error: Palette '{theme_name}' is missing required colors: {missing_colors}")
-        return False
-    
-    # Validate color format (should be hex colors, but 'name' is allowed as metadata)
-    for color_name, color_value in palette.items():
-        if color_name == 'name':  # Skip the name metadata field
-            continue
-            
-        if not isinstance(color_value, str):
-            print(f"❌ Error: Color '{color_name}' in '{theme_name}' is not a string")
-            return False
-        
-        if not color_value.startswith('#'):
-            print(f"⚠️  Warning: Color '{color_name}' in '{theme_name}' doesn't start with '#': {color_value}")
-    
-    return True
+# Parsed palettes keyed by name, invalidated by file mtime
+_palette_cache: Dict[str, Tuple[int, Dict[str, str]]] = {}
 
+# Derived variant palettes as read from VARIANT_CACHE_FILE (loaded once)
+_variant_palettes: Optional[Dict[str, Dict]] = None
 
-# ============================================================================
-# PALETTE LOADING
-# ============================================================================
 
 def load_palette(theme_name: str) -> Optional[Dict[str, str]]:
     """Load a color palette from JSON file"""
     palette_file = PALETTES_DIR / f"{theme_name}.json"
     
-    if not palette_file.exists():
+    try:
+        mtime = palette_file.stat().st_mtime_ns
+    except FileNotFoundError:
+        derived = load_variant_palettes().get(theme_name)
+        if derived:
+            return derived['palette']
         print(f"❌ Error: Palette file not found: {palette_file}")
         return None
     
+    cached = _palette_cache.get(theme_name)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
     try:
         with open(palette_file, 'r') as f:
             colors = json.load(f)
         
         # Validate palette
-        if not validate_palette(colors, theme_name):
-            return None
+        validate_palette(colors, theme_name)
         
+        _palette_cache[theme_name] = (mtime, colors)
         return colors
     
+    except PaletteError as e:
+        print(f"❌ Error: {e}")
+        return None
     except json.JSONDecodeError as e:
         print(f"❌ Error: Invalid JSON in {palette_file}: {e}")
         return None
@@ -297,1069 +201,1344 @@ def load_palette(theme_name: str) -> Optional[Dict[str, str]]:
         return None
 
 
-def discover_palettes() -> List[str]:
-    """Auto-discover available palette files"""
+def discover_palettes(include_variants: bool = False, save: bool = True) -> List[str]:
+    """Auto-discover available palette files (and their derived variants)"""
     if not PALETTES_DIR.exists():
         print(f"❌ Error: Palettes directory not found: {PALETTES_DIR}")
         return []
     
-    palettes = []
-    for palette_file in PALETTES_DIR.glob("*.json"):
-        theme_name = palette_file.stem
-        palettes.append(theme_name)
-    
-    return sorted(palettes)
+    return sorted(slug for slug, entry in load_palette_index(save=save).items()
+                  if include_variants or 'base' not in entry)
 
 
 # ============================================================================
-# THEME GENERATORS
+# PALETTE INDEX
 # ============================================================================
 
-def generate_waybar(theme_name: str, mapped: Dict[str, str]) -> str:
-    """Generate Waybar CSS theme"""
-    return f"""/* {theme_name.title()} */
-@define-color base   {mapped['base']};
-@define-color mantle {mapped['mantle']};
-@define-color crust  {mapped['crust']};
-
-@define-color text     {mapped['text']};
-@define-color subtext0 {mapped['subtext0']};
-@define-color subtext1 {mapped['subtext1']};
-
-@define-color surface0 {mapped['surface0']};
-@define-color surface1 {mapped['surface1']};
-@define-color surface2 {mapped['surface2']};
-
-@define-color overlay0 {mapped['overlay0']};
-@define-color overlay1 {mapped['overlay1']};
-
-@define-color blue     {mapped['blue']};
-@define-color lavender {mapped['lavender']};
-@define-color sapphire {mapped['sapphire']};
-@define-color sky      {mapped['sky']};
-@define-color teal     {mapped['teal']};
-@define-color green    {mapped['green']};
-@define-color yellow   {mapped['yellow']};
-@define-color peach    {mapped['peach']};
-@define-color maroon   {mapped['maroon']};
-@define-color red      {mapped['red']};
-@define-color mauve    {mapped['mauve']};
-@define-color pink     {mapped['pink']};
-
-* {{
-  border: none;
-  font-family: "Ubuntu Nerd Font Propo";
-  font-size: 15px;
-  font-weight: 600;
-  min-height: 0;
-  margin: 0;
-  padding: 0;
-}}
-
-window#waybar {{
-  background: transparent;
-  color: @text;
-}}
-
-tooltip {{
-  background: @base;
-  border: 1px solid @surface1;
-  border-radius: 8px;
-  padding: 6px;
-}}
-
-tooltip label {{
-  color: @text;
-}}
-
-#workspaces {{
-  background: alpha(@base, 0.8);
-  border-radius: 12px;
-  padding: 3px 9px;
-  margin: 4px 7px;
-}}
-
-#workspaces button {{
-  padding: 3px 11px;
-  margin: 0 2px;
-  border: 1px solid @surface1;
-  background: alpha(@surface0, 0.8);
-  color: @text;
-  border-radius: 8px;
-  transition: all 200ms ease;
-}}
-
-#workspaces button.active {{
-  border-radius: 100px;
-  border: 1px solid @mauve;
-  color: @crust;
-  background: @mauve;
-  min-width: 47px;
-  font-size: 15px;
-}}
-
-#clock {{
-  background: @blue;
-  color: @crust;
-  font-size: 17px;
-  font-weight: 600;
-  padding: 6px 18px;
-  margin: 4px 8px;
-  border-radius: 14px;
-}}
-
-#custom-arch {{
-  font-size: 18px;
-  padding: 6px 14px;
-  margin-left: 12px;
-  margin-right: 8px;
-  min-height: 32px;
-  color: @mauve;
-  background: transparent;
-  border-radius: 12px;
-  transition: all 200ms ease;
-}}
+def palette_variant(mapped: Dict[str, str]) -> str:
+    """Classify a mapped palette as 'light' or 'dark' from its base color"""
+    return 'light' if relative_luminance(mapped['base']) > 0.18 else 'dark'
 
-#custom-arch:hover {{
-  background: alpha(@mauve, 0.2);
-  color: @mauve;
-}}
 
-#custom-spotify {{
-  background: @green;
-  color: @crust;
-  padding: 3px 11px;
-  margin: 4px 3px;
-  border-radius: 8px;
-  font-weight: 600;
-  font-size: 14px;
-  min-width: 200px;
-}}
+def palette_family(theme_name: str, colors: Dict[str, str]) -> str:
+    """Name of the alias table get_mapped_colors() uses for this palette"""
+    if 'family' in colors:
+        return colors['family']
+    if theme_name.startswith('catppuccin'):
+        return 'catppuccin'
+    if theme_name in THEME_REQUIRED_COLORS:
+        return theme_name
+    return 'direct'
 
-#custom-spotify.paused {{
-  background: @surface1;
-  color: @overlay1;
-}}
 
-#custom-spotify.playing {{
-  background: @green;
-  color: @crust;
-}}
-
-#cpu {{
-  background: @green;
-  color: @crust;
-  padding: 3px 11px;
-  margin: 4px 3px;
-  border-radius: 8px;
-}}
+def index_palette_file(path: Path, stat) -> Optional[Dict]:
+    """Build the index entry for one palette file"""
+    data = path.read_bytes()
+    try:
+        colors = json.loads(data)
+        validate_palette(colors, path.stem)
+        mapped = get_mapped_colors(path.stem, colors)
+        variant = colors.get('variant') or palette_variant(mapped)
+    except (ValueError, KeyError, StopIteration, PaletteError) as e:
+        print(f"⚠️  Warning: Skipping unreadable palette {path.name}: {e}")
+        return None
+    
+    return {
+        'name': colors.get('name', path.stem),
+        'family': palette_family(path.stem, colors),
+        'variant': variant,
+        'hash': hashlib.sha256(data).hexdigest()[:16],
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size,
+    }
 
-#memory {{
-  background: @yellow;
-  color: @crust;
-  padding: 3px 11px;
-  margin: 4px 3px;
-  border-radius: 8px;
-}}
 
-#pulseaudio {{
-  background: @mauve;
-  color: @crust;
-  padding: 3px 11px;
-  margin: 4px 3px;
-  border-radius: 8px;
-}}
+def load_palette_index(refresh: bool = True, save: bool = True) -> Dict[str, Dict]:
+    """
+    Load the persistent palette index, re-reading only palette files whose
+    mtime or size changed since the index was written. Without save, the
+    refreshed index (and derived variants) are returned but not written back.
+    
+    Listing a large library costs one directory scan plus a stat per file;
+    JSON is parsed only for new or modified palettes. Derived variants are
+    added on top (see add_palette_variants) but never written to the file.
+    """
+    try:
+        with open(PALETTE_INDEX_FILE, 'r') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        index = {}
+    
+    if not refresh or not PALETTES_DIR.exists():
+        return add_palette_variants(index, save)
+    
+    changed = False
+    seen = set()
+    with os.scandir(PALETTES_DIR) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json') or not entry.is_file():
+                continue
+            
+            theme_name = entry.name[:-5]
+            seen.add(theme_name)
+            stat = entry.stat()
+            cached = index.get(theme_name)
+            if cached and cached['mtime'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                continue
+            
+            record = index_palette_file(Path(entry.path), stat)
+            if record:
+                index[theme_name] = record
+            else:
+                index.pop(theme_name, None)
+            changed = True
+    
+    for theme_name in set(index) - seen:
+        del index[theme_name]
+        changed = True
+    
+    if changed and save:
+        save_palette_index(index)
+    
+    return add_palette_variants(index, save)
 
-#pulseaudio.muted {{
-  background: @surface1;
-  color: @overlay1;
-}}
 
-#network {{
-  background: @sky;
-  color: @crust;
-  padding: 3px 11px;
-  margin: 4px 6px;
-  border-radius: 8px;
-}}
+def save_palette_index(index: Dict[str, Dict]) -> None:
+    """Atomically write the palette index"""
+    PALETTE_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PALETTE_INDEX_FILE.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(dict(sorted(index.items())), f, indent=1)
+    os.replace(tmp, PALETTE_INDEX_FILE)
 
-#network.disconnected {{
-  background: @surface1;
-  color: @red;
-}}
 
-#custom-notification {{
-  background: @pink;
-  color: @crust;
-  margin-right: 6px;
-  padding: 3px 11px;
-  margin: 4px 12px 4px 3px;
-  border-radius: 8px;
-  font-size: 16px;
-}}
+def load_variants() -> List[PaletteVariant]:
+    """Variants to derive: those in VARIANTS_FILE if present, else the built-in ones"""
+    try:
+        with open(VARIANTS_FILE, 'r') as f:
+            return [PaletteVariant(**spec) for spec in json.load(f)]
+    except FileNotFoundError:
+        return list(VARIANTS.values())
+    except (ValueError, TypeError) as e:
+        print(f"⚠️  Warning: Ignoring {VARIANTS_FILE}: {e}")
+        return list(VARIANTS.values())
+
+
+def load_variant_palettes() -> Dict[str, Dict]:
+    """Derived palettes cache: theme -> {'key': ..., 'palette': {...}}"""
+    global _variant_palettes
+    if _variant_palettes is None:
+        try:
+            with open(VARIANT_CACHE_FILE, 'r') as f:
+                _variant_palettes = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _variant_palettes = {}
+    return _variant_palettes
 
-#custom-notification.notification {{
-  color: #f38ba8;
-  text-shadow: 0 0 6px rgba(243, 139, 168, 0.6);
-}}
 
-#custom-notification.dnd-notification {{
-  background: @maroon;
-  color: @crust;
-}}
+def add_palette_variants(index: Dict[str, Dict], save: bool = True) -> Dict[str, Dict]:
+    """
+    Add a virtual '<palette>-<variant>' entry per palette and applicable
+    variant (a real palette of that name wins). Derived palettes are cached
+    under a key of palette hash plus variant definition; stale ones are
+    re-derived in one derive_palettes() batch per variant.
+    """
+    cached = load_variant_palettes()
+    entries: Dict[str, Dict] = {}
+    stale: Dict[str, Tuple[PaletteVariant, Dict[str, str]]] = {}
+    
+    for variant in load_variants():
+        spec = json.dumps(asdict(variant), sort_keys=True)
+        for slug, entry in index.items():
+            name = f"{slug}-{variant.name}"
+            if variant.applies_to not in ('any', entry['variant']) or name in index:
+                continue
+            key = hashlib.sha256(f"{entry['hash']}{spec}".encode()).hexdigest()[:16]
+            entries[name] = {
+                'name': f"{entry['name']} ({variant.label})",
+                'family': 'roles',
+                'variant': entry['variant'],
+                'hash': key,
+                'base': slug,
+            }
+            if cached.get(name, {}).get('key') != key:
+                stale.setdefault(variant.name, (variant, {}))[1][name] = slug
+    
+    mapped: Dict[str, Optional[Dict[str, str]]] = {}
+    for variant, names in stale.values():
+        sources = {}
+        for name, slug in names.items():
+            if slug not in mapped:
+                colors = load_palette(slug)
+                mapped[slug] = get_mapped_colors(slug, colors) if colors else None
+            if mapped[slug]:
+                sources[name] = mapped[slug]
+        derived = derive_palettes(sources, variant)
+        for name in names:
+            if name in derived:
+                palette = {'name': entries[name]['name'], 'family': 'roles', **derived[name]}
+                cached[name] = {'key': entries[name]['hash'], 'palette': palette}
+            else:
+                cached.pop(name, None)
+    
+    removed = set(cached) - set(entries)
+    for name in removed:
+        del cached[name]
+    if (stale or removed) and save:
+        VARIANT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = VARIANT_CACHE_FILE.with_name(f".{VARIANT_CACHE_FILE.name}.{os.getpid()}")
+        with open(tmp, 'w') as f:
+            json.dump(cached, f, separators=(',', ':'))
+        os.replace(tmp, VARIANT_CACHE_FILE)
+    
+    index.update((name, entry) for name, entry in entries.items() if name in cached)
+    return index
 
-#mode {{
-  background: @red;
-  color: @crust;
-  padding: 4px 12px;
-  margin: 4px 6px;
-  border-radius: 8px;
-  font-weight: 700;
-}}
-"""
 
+def palette_problem(path: Path) -> str:
+    """Why a palette file could not be indexed, on one line"""
+    try:
+        colors = json.loads(path.read_bytes())
+        validate_palette(colors, path.stem)
+        get_mapped_colors(path.stem, colors)
+    except (ValueError, KeyError, StopIteration, PaletteError, OSError) as e:
+        return ' '.join(str(e).split()) or type(e).__name__
+    return "not indexed"
 
-def generate_swaync(theme_name: str, mapped: Dict[str, str]) -> str:
-    """Generate SwayNC CSS theme"""
-    return f"""/* {theme_name.title()} Colors */
-@define-color base   {mapped['base']};
-@define-color mantle {mapped['mantle']};
-@define-color crust  {mapped['crust']};
-
-@define-color text     {mapped['text']};
-@define-color subtext0 {mapped['subtext0']};
-@define-color subtext1 {mapped['subtext1']};
-
-@define-color surface0 {mapped['surface0']};
-@define-color surface1 {mapped['surface1']};
-@define-color surface2 {mapped['surface2']};
-
-@define-color overlay0 {mapped['overlay0']};
-@define-color overlay1 {mapped['overlay1']};
-
-@define-color blue     {mapped['blue']};
-@define-color lavender {mapped['lavender']};
-@define-color sapphire {mapped['sapphire']};
-@define-color sky      {mapped['sky']};
-@define-color teal     {mapped['teal']};
-@define-color green    {mapped['green']};
-@define-color yellow   {mapped['yellow']};
-@define-color peach    {mapped['peach']};
-@define-color maroon   {mapped['maroon']};
-@define-color red      {mapped['red']};
-@define-color mauve    {mapped['mauve']};
-@define-color pink     {mapped['pink']};
-
-* {{
-  font-family: "Ubuntu Nerd Font Propo";
-  font-weight: 600;
-  font-size: 14px;
-}}
 
-.control-center {{
-  background: alpha(@base, 0.85);
-  backdrop-filter: blur(20px);
-  border-radius: 16px;
-  border: 2px solid alpha(@mauve, 0.4);
-  box-shadow: 0 8px 32px 0 rgba(0, 0, 0, 0.5);
-  margin: 10px;
-  padding: 0;
-}}
+def write_query_index(index: Dict[str, Dict]) -> None:
+    """
+    Write QUERY_INDEX_FILE for theme-query.py: a header with the version and
+    the mtimes of the palettes directory and variants.json, then one
+    'slug, name, variant, kind, source, mtime, size, status' line per theme.
+    Source is the palette file the theme comes from (its base, for variants)
+    with the mtime and size it had when indexed, so the reader can tell
+    whether the index is stale from stat calls alone. Palettes that could
+    not be indexed are listed too, with the error as their status.
+    """
+    def mtime_ns(path: Path) -> int:
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+    
+    lines = [f"# theme-index {QUERY_INDEX_VERSION}\t{mtime_ns(PALETTES_DIR)}\t{mtime_ns(VARIANTS_FILE)}\n"]
+    for slug in sorted(index):
+        entry = index[slug]
+        source = entry.get('base', slug)
+        kind = f"variant of {source}" if 'base' in entry else entry['family']
+        lines.append(f"{slug}\t{entry['name']}\t{entry['variant']}\t{kind}\t{source}\t"
+                     f"{index[source]['mtime']}\t{index[source]['size']}\tok\n")
+    
+    if PALETTES_DIR.exists():
+        for path in sorted(PALETTES_DIR.glob("*.json")):
+            if path.stem in index:
+                continue
+            stat = path.stat()
+            lines.append(f"{path.stem}\t{path.stem}\t-\t-\t{path.stem}\t"
+                         f"{stat.st_mtime_ns}\t{stat.st_size}\t{palette_problem(path)}\n")
+    
+    content = "".join(lines)
+    try:
+        if QUERY_INDEX_FILE.read_text() == content:
+            return
+    except FileNotFoundError:
+        pass
+    QUERY_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = QUERY_INDEX_FILE.with_name(f".{QUERY_INDEX_FILE.name}.{os.getpid()}")
+    tmp.write_text(content)
+    os.replace(tmp, QUERY_INDEX_FILE)
 
-.control-center .notification-row:focus,
-.control-center .notification-row:hover {{
-  background: alpha(@surface1, 0.6);
-  border-radius: 12px;
-}}
 
-.widget-title {{
-  background: alpha(@mauve, 0.3);
-  backdrop-filter: blur(10px);
-  color: @text;
-  font-size: 18px;
-  font-weight: 700;
-  border-radius: 12px;
-  margin: 12px;
-  padding: 12px;
-  border: 1px solid alpha(@mauve, 0.5);
-}}
+def write_menu_cache(index: Dict[str, Dict]) -> None:
+    """
+    Write menu.tsv, one 'Display Name<TAB>slug<TAB>' line per palette followed
+    by rofi's icon metadata pointing at the palette swatch. switcher.sh pipes
+    it straight into rofi (showing only the first column) and reads the slug
+    back from the selected line, so opening the menu needs no per-theme work
+    in the shell. While the index and the swatch files are unchanged the
+    cache already matches, and nothing is rendered or written.
+    """
+    def menu(icons: Dict[str, Path]) -> str:
+        return "".join(
+            f"{index[slug]['name']}\t{slug}\t\0icon\x1f{icons[slug]}\n"
+            if slug in icons else f"{index[slug]['name']}\t{slug}\t\n"
+            for slug in sorted(index)
+        )
+    
+    try:
+        current = MENU_CACHE_FILE.read_text()
+    except FileNotFoundError:
+        current = None
+    
+    icons = {slug: SWATCH_DIR / f"{entry['hash']}.png" for slug, entry in index.items()}
+    content = menu(icons)
+    if current != content or not all(path.exists() for path in icons.values()):
+        content = menu(ensure_swatches(index))
+    if current == content:
+        # Up to date: touch it, so switcher.sh's mtime check passes again
+        os.utime(MENU_CACHE_FILE)
+        return
+    tmp = MENU_CACHE_FILE.with_suffix('.tmp')
+    tmp.write_text(content)
+    os.replace(tmp, MENU_CACHE_FILE)
+
+
+def refresh_palette_caches() -> Dict[str, Dict]:
+    """
+    Bring the palette index up to date (re-reading only changed palette
+    files) and rewrite the menu and query caches built from it. Run by the
+    commands that change palettes or themes, never by read-only ones.
+    """
+    index = load_palette_index()
+    write_menu_cache(index)
+    write_query_index(index)
+    return index
 
-.widget-title > button {{
-  background: alpha(@pink, 0.8);
-  color: @crust;
-  border-radius: 8px;
-  padding: 6px 12px;
-  font-size: 13px;
-  font-weight: 700;
-  border: none;
-  box-shadow: 0 4px 12px alpha(@pink, 0.4);
-  transition: all 200ms ease;
-}}
 
-.widget-title > button:hover {{
-  background: @pink;
-  box-shadow: 0 6px 16px alpha(@pink, 0.6);
-  transform: translateY(-2px);
-}}
+# ============================================================================
+# SWATCH ICONS
+# ============================================================================
 
-.widget-dnd {{
-  background: alpha(@surface0, 0.6);
-  backdrop-filter: blur(10px);
-  border-radius: 12px;
-  margin: 12px;
-  padding: 12px;
-  border: 1px solid alpha(@surface2, 0.5);
-}}
+def render_swatch(mapped: Dict[str, str], size: int = SWATCH_SIZE) -> bytes:
+    """
+    Render a square swatch: the base color with text and subtext bars on
+    top, and one column per accent role along the bottom.
+    """
+    import imagelib
+    
+    def px(role: str) -> bytes:
+        return bytes.fromhex(mapped[role].lstrip('#')[:6])
+    
+    pad = size // 8
+    base = px('base')
+    plain = base * size
+    text_bar = base * pad + px('text') * (size - 2 * pad) + base * pad
+    subtext_bar = base * pad + px('subtext0') * (size // 2 - pad) + base * (size - size // 2)
+    
+    column = size // len(SWATCH_ACCENTS)
+    accents = b''.join(px(role) * column for role in SWATCH_ACCENTS)
+    accents += px(SWATCH_ACCENTS[-1]) * (size - column * len(SWATCH_ACCENTS))
+    
+    top = size * 5 // 8
+    rows = []
+    for y in range(size):
+        if y >= top:
+            rows.append(accents)
+        elif pad * 2 <= y < pad * 3:
+            rows.append(text_bar)
+        elif pad * 3 + pad // 2 <= y < pad * 4:
+            rows.append(subtext_bar)
+        else:
+            rows.append(plain)
+    return imagelib.encode_png(size, size, rows)
 
-.widget-dnd > label {{
-  color: @text;
-  font-weight: 600;
-}}
 
-.widget-dnd > switch {{
-  background: alpha(@surface2, 0.8);
-  border-radius: 20px;
-  border: none;
-  min-width: 50px;
-  min-height: 26px;
-}}
+def build_swatch(theme_name: str, path: Path) -> Optional[str]:
+    """Render one palette's swatch to path; returns an error message on failure"""
+    try:
+        try:
+            with open(PALETTES_DIR / f"{theme_name}.json", 'r') as f:
+                colors = json.load(f)
+        except FileNotFoundError:
+            colors = load_variant_palettes()[theme_name]['palette']
+        data = render_swatch(get_mapped_colors(theme_name, colors))
+        tmp = path.with_suffix('.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except (OSError, ValueError, KeyError, StopIteration) as e:
+        return f"{theme_name}: {e}"
+    return None
+
+
+def ensure_swatches(index: Dict[str, Dict], workers: Optional[int] = None) -> Dict[str, Path]:
+    """
+    Make sure every indexed palette has a swatch, keyed by palette hash so a
+    swatch is only rebuilt when its palette changes. Missing swatches are
+    rendered in a process pool when there are many of them. Swatches of
+    removed or changed palettes are pruned.
+    """
+    SWATCH_DIR.mkdir(parents=True, exist_ok=True)
+    paths = {slug: SWATCH_DIR / f"{entry['hash']}.png" for slug, entry in index.items()}
+    missing = [(slug, path) for slug, path in paths.items() if not path.exists()]
+    
+    if len(missing) > 32:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            errors = list(pool.map(build_swatch, *zip(*missing), chunksize=32))
+    else:
+        errors = [build_swatch(slug, path) for slug, path in missing]
+    
+    for error in filter(None, errors):
+        print(f"⚠️  Warning: Could not render swatch for {error}")
+    
+    wanted = {path.name for path in paths.values()}
+    for entry in os.scandir(SWATCH_DIR):
+        if entry.name.endswith('.png') and entry.name not in wanted:
+            os.unlink(entry.path)
+    
+    return {slug: path for slug, path in paths.items() if path.exists()}
 
-.widget-dnd > switch:checked {{
-  background: @mauve;
-  box-shadow: 0 4px 12px alpha(@mauve, 0.4);
-}}
 
-.widget-dnd > switch slider {{
-  background: @text;
-  border-radius: 50%;
-  border: none;
-}}
+# ============================================================================
+# SCHEME IMPORT (base16 / base24)
+# ============================================================================
 
-.notification {{
-  background: alpha(@surface0, 0.7);
-  backdrop-filter: blur(15px);
-  border-radius: 12px;
-  margin: 8px 12px;
-  padding: 0;
-  border: 1px solid alpha(@surface2, 0.5);
-  box-shadow: 0 4px 16px rgba(0, 0, 0, 0.3);
-  transition: all 200ms ease;
-}}
+def parse_scheme_yaml(text: str) -> Dict:
+    """
+    Parse a base16/base24 scheme file. Uses PyYAML when installed, otherwise
+    a reader for the flat 'key: "value"' layout (with one optional nested
+    'palette:' block) that scheme files use.
+    """
+    try:
+        import yaml
+    except ImportError:
+        yaml = None
+    
+    if yaml is not None:
+        return yaml.safe_load(text) or {}
+    
+    scheme: Dict = {}
+    section = scheme
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#') or ':' not in stripped:
+            continue
+        
+        key, _, value = stripped.partition(':')
+        value = value.strip()
+        if value[:1] in ('"', "'"):
+            value = value[1:value.index(value[0], 1)]
+        else:
+            value = value.split(' #', 1)[0].strip()
+        
+        if not line[0].isspace():
+            section = scheme
+        if not value:
+            section = scheme.setdefault(key.strip(), {})
+            continue
+        section[key.strip()] = value
+    
+    return scheme
 
-.notification:hover {{
-  background: alpha(@surface1, 0.8);
-  border-color: alpha(@mauve, 0.6);
-  transform: translateX(-4px);
-  box-shadow: 0 6px 20px rgba(0, 0, 0, 0.4);
-}}
 
-.notification-content {{
-  background: transparent;
-  padding: 12px;
-  border-radius: 12px;
-}}
+def scheme_to_palette(scheme: Dict) -> Optional[Dict[str, str]]:
+    """Convert a parsed base16/base24 scheme into a palette dict"""
+    slots = scheme.get('palette', scheme)
+    if not isinstance(slots, dict) or not all(slot in slots for slot in BASE16_SLOTS):
+        return None
+    
+    palette = {
+        'name': scheme.get('name') or scheme.get('scheme') or 'Unnamed',
+        'family': 'base16',
+    }
+    if scheme.get('author'):
+        palette['author'] = scheme['author']
+    
+    for slot in BASE24_SLOTS:
+        if slot in slots:
+            palette[slot] = '#' + str(slots[slot]).lstrip('#').lower()[:6]
+    
+    variant = scheme.get('variant')
+    palette['variant'] = variant if variant in ('light', 'dark') else palette_variant(
+        get_mapped_colors('', palette))
+    return palette
+
+
+def iter_schemes(paths: List[Path]):
+    """Yield (source, scheme) pairs one file at a time from files or directories"""
+    for path in paths:
+        if path.is_dir():
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                yield from iter_schemes([Path(root) / name for name in sorted(files)
+                                         if name.endswith(('.yaml', '.yml', '.json'))])
+            continue
+        
+        try:
+            text = path.read_text()
+            data = json.loads(text) if path.suffix == '.json' else parse_scheme_yaml(text)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Warning: Skipping {path}: {e}")
+            continue
+        
+        # JSON collections: a list of schemes or a mapping of slug -> scheme
+        if isinstance(data, list):
+            for scheme in data:
+                yield path, scheme
+        elif isinstance(data, dict) and 'base00' not in data and 'palette' not in data:
+            for scheme in data.values():
+                yield path, scheme
+        else:
+            yield path, data
 
-.notification-default-action {{
-  background: transparent;
-  padding: 0;
-  margin: 0;
-}}
 
-.summary {{
-  color: @text;
-  font-size: 15px;
-  font-weight: 700;
-  margin-bottom: 4px;
-}}
+def slugify(name: str) -> str:
+    return '-'.join(''.join(c if c.isalnum() else ' ' for c in name.lower()).split())
 
-.body {{
-  color: @subtext0;
-  font-size: 13px;
-  font-weight: 500;
-}}
 
-.time {{
-  color: @overlay1;
-  font-size: 11px;
-  font-weight: 600;
-  margin-top: 4px;
-}}
+def import_schemes(paths: List[Path], force: bool = False, verbose: bool = False) -> Tuple[int, int]:
+    """
+    Convert base16/base24 scheme files into palettes, streaming one scheme at
+    a time. Imported palettes are prefixed 'base16-' so they never shadow the
+    bundled palettes. Returns (imported, skipped).
+    """
+    PALETTES_DIR.mkdir(parents=True, exist_ok=True)
+    imported = skipped = 0
+    
+    for source, scheme in iter_schemes(paths):
+        palette = scheme_to_palette(scheme) if isinstance(scheme, dict) else None
+        if not palette:
+            print(f"⚠️  Warning: Not a base16/base24 scheme: {source}")
+            skipped += 1
+            continue
+        
+        slug = f"base16-{slugify(palette['name'])}"
+        target = PALETTES_DIR / f"{slug}.json"
+        if target.exists() and not force:
+            skipped += 1
+            continue
+        
+        tmp = target.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(palette, f, indent=2)
+        os.replace(tmp, target)
+        imported += 1
+        if verbose:
+            print(f"  ✓ {slug} ({palette['name']})")
+    
+    return imported, skipped
 
-.notification-icon {{
-  min-width: 48px;
-  min-height: 48px;
-  margin-right: 12px;
-  border-radius: 10px;
-}}
 
-.app-icon {{
-  color: @mauve;
-}}
+# ============================================================================
+# TARGET REGISTRY
+# ============================================================================
 
-.notification-action {{
-  background: alpha(@mauve, 0.3);
-  color: @text;
-  border-radius: 8px;
-  margin: 6px;
-  padding: 8px 12px;
-  border: 1px solid alpha(@mauve, 0.4);
-  font-weight: 600;
-  transition: all 200ms ease;
-}}
+def load_starship_layout() -> None:
+    """Switch the starship target to pre-merged configs if a layout exists"""
+    try:
+        layout = STARSHIP_LAYOUT_FILE.read_text()
+    except FileNotFoundError:
+        return
+    register_target(themelib.starship_config_target(layout))
 
-.notification-action:hover {{
-  background: alpha(@mauve, 0.5);
-  border-color: @mauve;
-  box-shadow: 0 4px 12px alpha(@mauve, 0.3);
-}}
 
-.close-button {{
-  background: alpha(@red, 0.8);
-  color: @crust;
-  border-radius: 8px;
-  padding: 6px 10px;
-  margin: 8px;
-  border: none;
-  font-size: 16px;
-  font-weight: 700;
-  box-shadow: 0 4px 12px alpha(@red, 0.4);
-  transition: all 200ms ease;
-}}
+def load_target_plugins() -> None:
+    """
+    Run every targets.d/*.py next to the palettes. Plugins receive Target and
+    register_target so new applications can be added without editing this
+    script or switcher.sh.
+    """
+    plugin_dir = BASE_DIR / "targets.d"
+    if not plugin_dir.is_dir():
+        return
+    
+    for plugin in sorted(plugin_dir.glob("*.py")):
+        try:
+            runpy.run_path(str(plugin), init_globals={
+                'Target': Target,
+                'register_target': register_target,
+            })
+        except Exception as e:
+            print(f"⚠️  Warning: Failed to load target plugin {plugin.name}: {e}")
 
-.close-button:hover {{
-  background: @red;
-  box-shadow: 0 6px 16px alpha(@red, 0.6);
-  transform: scale(1.1);
-}}
 
-.notification.critical {{
-  border: 2px solid @red;
-  background: alpha(@red, 0.15);
-}}
+def select_targets(spec: Optional[str]) -> List[Target]:
+    """
+    Resolve a --targets value: comma-separated target names or required
+    binaries, or 'installed' for targets whose application is on PATH.
+    """
+    if not spec:
+        return list(TARGETS.values())
+    
+    if spec == 'installed':
+        return [t for t in TARGETS.values() if shutil.which(t.requires)]
+    
+    wanted = {name.strip() for name in spec.split(',') if name.strip()}
+    unknown = wanted - set(TARGETS) - {t.requires for t in TARGETS.values()}
+    if unknown:
+        raise ValueError(f"unknown targets: {', '.join(sorted(unknown))}")
+    return [t for t in TARGETS.values() if t.name in wanted or t.requires in wanted]
+
+
+def write_target_registry() -> None:
+    """Write targets.tsv, the registry view switcher.sh reads when applying"""
+    lines = ["# name\tfile\tdeploy\tdeploy_mode\treload\trequires"]
+    for t in TARGETS.values():
+        lines.append("\t".join([t.name, t.filename, t.deploy, t.deploy_mode, t.reload, t.requires]))
+    
+    registry = BASE_DIR / "targets.tsv"
+    content = "\n".join(lines) + "\n"
+    try:
+        if registry.read_text() == content:
+            return
+    except FileNotFoundError:
+        pass
+    tmp = registry.with_suffix('.tmp')
+    tmp.write_text(content)
+    os.replace(tmp, registry)
 
-.notification.critical .summary {{
-  color: @red;
-}}
 
-scrollbar {{
-  background: transparent;
-  width: 8px;
-}}
+# ============================================================================
+# CONTRAST AUDIT
+# ============================================================================
 
-scrollbar slider {{
-  background: alpha(@mauve, 0.5);
-  border-radius: 8px;
-  min-height: 40px;
-}}
+def print_contrast_report(results: List[ContrastResult]) -> None:
+    """Print a pair x theme WCAG matrix followed by the failing pairs"""
+    themes = list(dict.fromkeys(r.theme for r in results))
+    matrix: Dict[Tuple[str, str], Dict[str, ContrastResult]] = {}
+    targets: Dict[Tuple[str, str, str], List[str]] = {}
+    for r in results:
+        cells = matrix.setdefault((r.fg, r.bg), {})
+        # The same pair can be text in one target and UI in another
+        if r.theme not in cells or (cells[r.theme].passed and not r.passed):
+            cells[r.theme] = r
+        targets.setdefault((r.theme, r.fg, r.bg), []).append(r.target)
+
+    print("Themes:")
+    for i, theme in enumerate(themes, 1):
+        print(f"  [{i}] {theme}")
+    print()
+
+    width = max(len(f"{fg} on {bg}") for fg, bg in matrix)
+    print(" " * width + "".join(f"{f'[{i}]':>8}" for i in range(1, len(themes) + 1)))
+    for (fg, bg), cells in matrix.items():
+        row = f"{fg} on {bg}".ljust(width)
+        for theme in themes:
+            r = cells[theme]
+            row += f"{r.wcag:>7.2f}" + (" " if r.passed else "!")
+        print(row)
 
-scrollbar slider:hover {{
-  background: alpha(@mauve, 0.7);
-}}
+    failing = [cells[theme] for cells in matrix.values() for theme in themes
+               if not cells[theme].passed]
+    print()
+    if not failing:
+        print("✅ All role pairs meet their contrast thresholds")
+        return
 
-.blank-window {{
-  background: alpha(@base, 0.85);
-  backdrop-filter: blur(20px);
-  border-radius: 16px;
-  border: 2px solid alpha(@mauve, 0.4);
-}}
+    print(f"❌ {len(failing)} failing pairs:")
+    for r in sorted(failing, key=lambda r: (r.theme, r.wcag)):
+        used_by = ", ".join(targets[(r.theme, r.fg, r.bg)])
+        print(f"  {r.theme}: {r.fg} on {r.bg} ({r.fg_hex} on {r.bg_hex}) "
+              f"{r.wcag:.2f}:1 < {r.threshold}:1, APCA Lc {r.apca:.0f} [{used_by}]")
 
-.widget-label {{
-  color: @subtext0;
-  font-size: 16px;
-  margin: 20px;
-}}
-"""
 
+# ============================================================================
+# THEME GENERATION
+# ============================================================================
 
-def generate_rofi(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Rofi theme"""
-    mapped = get_mapped_colors(theme_name, colors)
+def render_theme(
+    theme_name: str,
+    verbose: bool = False,
+    fix_contrast_pairs: bool = False,
+    min_text: float = MIN_TEXT_CONTRAST,
+    min_ui: float = MIN_UI_CONTRAST,
+    targets: Optional[List[Target]] = None,
+    report_contrast: bool = False,
+) -> Optional[Dict[str, str]]:
+    """
+    Render a theme's files in memory: filename -> content. Low-contrast
+    role pairs are only reported with report_contrast, so renders done on
+    the switcher's behalf (--ensure, staging, bundles) stay quiet.
+    """
+    # Load palette
+    colors = load_palette(theme_name)
+    if not colors:
+        return None
     
-    return f"""configuration {{
-    show-icons: false;
-}}
-
-* {{
-    bg:     {mapped['base']};
-    bg-alt: {mapped['mantle']};
-    fg:     {mapped['text']};
-    accent: {mapped['mauve']};
-    green:  {mapped['green']};
-    red:    {mapped['red']};
-    selected: {mapped['mauve']};
-    background: {mapped['base']};
-    background-alt: {mapped['surface0']};
-    foreground: {mapped['text']};
-    urgent: {mapped['red']};
-    active: {mapped['green']};
-
-    font: "JetBrainsMono Nerd Font 12";
-}}
-
-window {{
-    transparency: "real";
-    location: center;
-    anchor: center;
-    fullscreen: false;
-    width: 640px;
-    padding: 0px;
-    border: 0px solid;
-    border-radius: 18px;
-    border-color: @selected;
-    background-color: @background;
-}}
-
-mainbox {{
-    enabled: true;
-    spacing: 12px;
-    margin: 0px;
-    padding: 20px;
-    border: 0px solid;
-    border-radius: 0px;
-    background-color: transparent;
-    children: [ "inputbar", "listview" ];
-}}
-
-inputbar {{
-    enabled: true;
-    spacing: 15px;
-    margin: 0px;
-    padding: 0px;
-    border: 0px;
-    border-radius: 0px;
-    background-color: transparent;
-    text-color: @foreground;
-    children: [ "textbox-prompt-colon", "prompt" ];
-}}
-
-textbox-prompt-colon {{
-    enabled: true;
-    expand: false;
-    str: "";
-    padding: 12px 15px;
-    border-radius: 100%;
-    background-color: @urgent;
-    text-color: @background;
-    font: "feather bold 20";
-    vertical-align: 0.5;
-    horizontal-align: 0.5;
-}}
-
-prompt {{
-    enabled: true;
-    padding: 12px 20px;
-    border-radius: 100%;
-    background-color: @active;
-    text-color: @background;
-    font: "JetBrainsMono Nerd Font 12";
-    vertical-align: 0.5;
-    horizontal-align: 0.5;
-}}
-
-listview {{
-    enabled: true;
-    columns: 5;
-    lines: 1;
-    cycle: true;
-    dynamic: true;
-    scrollbar: false;
-    layout: vertical;
-    reverse: false;
-    fixed-height: true;
-    fixed-columns: true;
-    spacing: 12px;
-    margin: 0px 0px 0px -10px;
-    padding: 0px;
-    border: 0px solid;
-    border-radius: 0px;
-    background-color: transparent;
-    text-color: @foreground;
-    cursor: "default";
-}}
+    # Get mapped colors, contrast-nudged if asked
+    theme = ThemeConfig(theme_name, colors, fix_contrast_pairs, min_text, min_ui)
+    mapped, changes = theme.map_colors()
+    if verbose:
+        for role, (old, new) in changes.items():
+            print(f"  ↻ {role}: {old} → {new}")
+    
+    # Check readability of the role pairs the generators rely on (a count
+    # by default, so real errors stay visible; the pairs with -v or --audit)
+    if report_contrast:
+        failing = [r for r in audit_contrast({theme_name: mapped}, min_text, min_ui)
+                   if not r.passed]
+        pairs = sorted({f"{r.fg}/{r.bg}" for r in failing})
+        if pairs and verbose:
+            print(f"⚠️  Warning: {theme_name} has {len(pairs)} low-contrast role pairs: "
+                  f"{', '.join(pairs)}")
+        elif pairs:
+            print(f"⚠️  Warning: {theme_name} has {len(pairs)} low-contrast role pairs "
+                  f"(-v or --audit to list them)")
+    
+    # Generate each theme file
+    return {
+        target.filename: target.render(theme_name, mapped)
+        for target in (targets or TARGETS.values())
+    }
 
-element {{
-    enabled: true;
-    margin: 0px;
-    padding: 0px;
-    border-radius: 100%;
-    background-color: @background-alt;
-    text-color: @foreground;
-    cursor: pointer;
-    orientation: vertical;
-}}
 
-element-text {{
-    font: "feather bold 28";
-    background-color: transparent;
-    text-color: inherit;
-    cursor: inherit;
-    horizontal-align: 0.5;
-    vertical-align: 0.5;
-    padding: 45px;
-}}
+def generate_theme(
+    theme_name: str,
+    verbose: bool = False,
+    fix_contrast_pairs: bool = False,
+    min_text: float = MIN_TEXT_CONTRAST,
+    min_ui: float = MIN_UI_CONTRAST,
+    output_dir: Optional[Path] = None,
+    targets: Optional[List[Target]] = None,
+    report_contrast: bool = False,
+) -> bool:
+    """Generate theme files for a given theme (all registered targets by default)"""
+    if verbose:
+        print(f"📦 Generating theme: {theme_name}")
+    
+    theme_files = render_theme(theme_name, verbose, fix_contrast_pairs, min_text, min_ui, targets,
+                               report_contrast)
+    if theme_files is None:
+        return False
+    
+    # Create theme directory
+    theme_dir = (output_dir or THEMES_DIR) / theme_name
+    theme_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Write files
+    for filename, content in theme_files.items():
+        file_path = theme_dir / filename
+        try:
+            with open(file_path, 'w') as f:
+                f.write(content)
+            if verbose:
+                print(f"  ✓ {filename}")
+        except Exception as e:
+            print(f"  ❌ Error writing {filename}: {e}")
+            return False
+    
+    if verbose:
+        print(f"✅ {theme_name} generated successfully\n")
+    
+    return True
 
-element selected.normal {{
-    background-color: @accent;
-    text-color: @background;
-}}
-"""
 
+# ============================================================================
+# THEME BUNDLE
+# ============================================================================
 
-def generate_rofi_launcher_colors(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Rofi launcher colors (adi1090x style)"""
-    mapped = get_mapped_colors(theme_name, colors)
+def write_bundle(path: Path, themes: List[str], targets: Optional[List[Target]] = None,
+                 verbose: bool = False, **render_options) -> Tuple[int, int]:
+    """
+    Render themes into a single bundle file (see bundlelib.pack_bundle).
+    Returns (themes bundled, themes failed).
+    """
+    import bundlelib
     
-    return f"""/**
- * Rofi Colors - {theme_name.title()}
- * Generated by theme-switcher
- * 
- * Author : Aditya Shakya (adi1090x)
- * Github : @adi1090x
- */
-
-* {{
-    background:     {mapped['base']};
-    background-alt: {mapped['surface0']};
-    foreground:     {mapped['text']};
-    selected:       {mapped['mauve']};
-    active:         {mapped['green']};
-    urgent:         {mapped['red']};
-}}
-"""
+    palette_index = load_palette_index(refresh=False)
+    failed = 0
+    
+    def rendered():
+        nonlocal failed
+        for theme in themes:
+            theme_files = render_theme(theme, targets=targets, **render_options)
+            if theme_files is None:
+                failed += 1
+                continue
+            yield (theme, palette_index.get(theme, {}).get('hash'),
+                   {filename: content.encode() for filename, content in theme_files.items()})
+            if verbose:
+                print(f"  ✓ {theme}")
+    
+    bundled = bundlelib.pack_bundle(path, rendered())
+    return bundled, failed
 
 
-def generate_btop(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Btop theme"""
-    mapped = get_mapped_colors(theme_name, colors)
-    
-    return f"""theme[main_bg]="{mapped['crust']}"
-theme[main_fg]="{mapped['text']}"
-theme[title]="{mapped['pink']}"
-theme[hi_fg]="{mapped['mauve']}"
-theme[selected_bg]="{mapped['surface2']}"
-theme[selected_fg]="{mapped['pink']}"
-theme[inactive_fg]="{mapped['overlay0']}"
-theme[graph_text]="{mapped['subtext1']}"
-theme[meter_bg]="{mapped['base']}"
-theme[proc_misc]="{mapped['pink']}"
-theme[cpu_box]="{mapped['mauve']}"
-theme[mem_box]="{mapped['green']}"
-theme[net_box]="{mapped['blue']}"
-theme[proc_box]="{mapped['yellow']}"
-theme[div_line]="{mapped['surface1']}"
-theme[temp_start]="{mapped['green']}"
-theme[temp_mid]="{mapped['yellow']}"
-theme[temp_end]="{mapped['red']}"
-theme[cpu_start]="{mapped['blue']}"
-theme[cpu_mid]="{mapped['mauve']}"
-theme[cpu_end]="{mapped['pink']}"
-theme[free_start]="{mapped['mauve']}"
-theme[free_mid]="{mapped['pink']}"
-theme[free_end]="{mapped['maroon']}"
-theme[cached_start]="{mapped['sky']}"
-theme[cached_mid]="{mapped['lavender']}"
-theme[cached_end]="{mapped['mauve']}"
-theme[available_start]="{mapped['peach']}"
-theme[available_mid]="{mapped['yellow']}"
-theme[available_end]="{mapped['green']}"
-theme[used_start]="{mapped['red']}"
-theme[used_mid]="{mapped['peach']}"
-theme[used_end]="{mapped['yellow']}"
-theme[download_start]="{mapped['green']}"
-theme[download_mid]="{mapped['sky']}"
-theme[download_end]="{mapped['blue']}"
-theme[upload_start]="{mapped['yellow']}"
-theme[upload_mid]="{mapped['peach']}"
-theme[upload_end]="{mapped['red']}"
-theme[process_start]="{mapped['blue']}"
-theme[process_mid]="{mapped['lavender']}"
-theme[process_end]="{mapped['mauve']}"
-"""
+def bundle_theme_key(bundle: Optional['bundlelib.ThemeBundle'], theme_name: str) -> Optional[str]:
+    """
+    Cache key for serving a theme from the bundle, or None when it must be
+    rendered: the bundle lacks it, or the local palette changed since.
+    """
+    if bundle is None or theme_name not in bundle:
+        return None
+    entry = bundle.index[theme_name]
+    local = load_palette_index().get(theme_name)
+    if local and entry['palette'] and local['hash'] != entry['palette']:
+        return None
+    digests = ''.join(f"{name}{f[2]}" for name, f in sorted(entry['files'].items()))
+    return "bundle-" + hashlib.sha256(digests.encode()).hexdigest()[:16]
+
 
+def open_bundle(path: Path = BUNDLE_FILE) -> Optional['bundlelib.ThemeBundle']:
+    """The installed theme bundle, if there is a readable one"""
+    if not path.exists():
+        return None
+    import bundlelib
+    
+    try:
+        return bundlelib.ThemeBundle(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Warning: Ignoring theme bundle {path}: {e}")
+        return None
 
-def generate_cava(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Cava config"""
-    mapped = get_mapped_colors(theme_name, colors)
-    grad = [mapped['mauve'], mapped['pink'], mapped['red'], mapped['peach'], mapped['yellow'], mapped['green']]
-    
-    return f"""[general]
-framerate = 60
-bars = 0
-bar_width = 2
-bar_spacing = 1
-
-[input]
-method = pulse
-source = auto
-
-[output]
-method = ncurses
-channels = stereo
-mono_option = average
-reverse = 0
-
-[color]
-gradient = 1
-gradient_count = 6
-gradient_color_1 = '{grad[0]}'
-gradient_color_2 = '{grad[1]}'
-gradient_color_3 = '{grad[2]}'
-gradient_color_4 = '{grad[3]}'
-gradient_color_5 = '{grad[4]}'
-gradient_color_6 = '{grad[5]}'
-
-[smoothing]
-monstercat = 1
-waves = 0
-gravity = 100
-ignore = 0
-"""
 
+# ============================================================================
+# RENDERED THEME CACHE
+# ============================================================================
 
-def generate_alacritty(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Alacritty theme"""
-    mapped = get_mapped_colors(theme_name, colors)
-    
-    return f"""[colors.primary]
-background = '{mapped['base']}'
-foreground = '{mapped['text']}'
-
-[colors.cursor]
-text = '{mapped['base']}'
-cursor = '{mapped['pink']}'
-
-[colors.selection]
-text = '{mapped['base']}'
-background = '{mapped['pink']}'
-
-[colors.normal]
-black = '{mapped['surface1']}'
-red = '{mapped['red']}'
-green = '{mapped['green']}'
-yellow = '{mapped['yellow']}'
-blue = '{mapped['blue']}'
-magenta = '{mapped['pink']}'
-cyan = '{mapped['teal']}'
-white = '{mapped['subtext1']}'
-
-[colors.bright]
-black = '{mapped['surface2']}'
-red = '{mapped['red']}'
-green = '{mapped['green']}'
-yellow = '{mapped['yellow']}'
-blue = '{mapped['blue']}'
-magenta = '{mapped['pink']}'
-cyan = '{mapped['teal']}'
-white = '{mapped['subtext0']}'
-"""
+@functools.lru_cache(maxsize=1)
+def generator_hash() -> str:
+    """Hash of everything besides the palette that shapes the rendered files"""
+    sources = [Path(__file__), Path(themelib.__file__), STARSHIP_LAYOUT_FILE,
+               *sorted((BASE_DIR / "targets.d").glob("*.py"))]
+    return hashlib.sha256(b''.join(p.read_bytes() for p in sources if p.exists())).hexdigest()[:16]
 
 
-def generate_kitty(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Kitty theme"""
-    mapped = get_mapped_colors(theme_name, colors)
-    
-    return f"""foreground {mapped['text']}
-background {mapped['base']}
-selection_foreground {mapped['base']}
-selection_background {mapped['pink']}
-cursor {mapped['pink']}
-cursor_text_color {mapped['base']}
-url_color {mapped['pink']}
-active_border_color {mapped['lavender']}
-inactive_border_color {mapped['overlay0']}
-bell_border_color {mapped['yellow']}
-active_tab_foreground {mapped['crust']}
-active_tab_background {mapped['mauve']}
-inactive_tab_foreground {mapped['text']}
-inactive_tab_background {mapped['mantle']}
-tab_bar_background {mapped['crust']}
-color0 {mapped['surface1']}
-color8 {mapped['surface2']}
-color1 {mapped['red']}
-color9 {mapped['red']}
-color2  {mapped['green']}
-color10 {mapped['green']}
-color3  {mapped['yellow']}
-color11 {mapped['yellow']}
-color4  {mapped['blue']}
-color12 {mapped['blue']}
-color5  {mapped['pink']}
-color13 {mapped['pink']}
-color6  {mapped['teal']}
-color14 {mapped['teal']}
-color7  {mapped['subtext1']}
-color15 {mapped['subtext0']}
-"""
+def theme_cache_key(theme_name: str) -> Optional[str]:
+    """Cache key of a rendered theme: palette hash plus generator (layout, plugins) hash"""
+    entry = load_palette_index().get(theme_name)
+    if not entry:
+        return None
+    return f"{entry['hash']}-{generator_hash()}"
 
 
-def generate_theme_menu(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate theme switcher menu for Rofi"""
-    mapped = get_mapped_colors(theme_name, colors)
+def ensure_cached_theme(theme_name: str, max_themes: int = THEME_CACHE_SIZE,
+                        verbose: bool = False) -> bool:
+    """
+    Make sure THEME_CACHE_DIR/<theme> holds an up-to-date rendering of the
+    palette, rendering it on demand (or slicing it out of the theme bundle
+    when that has it). The cache is an LRU keyed on directory mtime: every
+    hit touches the directory, and the least recently used themes beyond
+    max_themes are evicted.
+    """
+    bundle = open_bundle()
+    bundle_key = bundle_theme_key(bundle, theme_name)
+    key = bundle_key or theme_cache_key(theme_name)
+    if not key:
+        print(f"❌ Error: Palette file not found: {PALETTES_DIR / f'{theme_name}.json'}")
+        return False
     
-    return f"""configuration {{
-	modi:                       "drun";
-    show-icons:                 false;
-    display-drun:               "󰏘";
-	drun-display-format:        "{{name}}";
-}}
+    theme_dir = THEME_CACHE_DIR / theme_name
+    key_file = theme_dir / ".cache-key"
+    try:
+        hit = key_file.read_text() == key
+    except FileNotFoundError:
+        hit = False
+    
+    if hit:
+        os.utime(theme_dir)
+    elif bundle_key:
+        theme_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            for filename, data in bundle.files(theme_name, verify=True).items():
+                with open(theme_dir / filename, 'wb') as f:
+                    f.write(data)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return False
+        key_file.write_text(key)
+    else:
+        if not generate_theme(theme_name, verbose=verbose, output_dir=THEME_CACHE_DIR):
+            return False
+        key_file.write_text(key)
+    
+    evict_theme_cache(max_themes, keep={theme_name})
+    return True
+
 
-* {{
-    bg:     {mapped['base']};
-    bg-alt: {mapped['mantle']};
-    fg:     {mapped['text']};
-    accent: {mapped['mauve']};
-    surface: {mapped['surface0']};
+def evict_theme_cache(max_themes: int, keep: set = frozenset()) -> List[str]:
+    """Remove least recently used cached themes beyond max_themes"""
+    if not THEME_CACHE_DIR.exists():
+        return []
     
-    background: {mapped['base']};
-    background-alt: {mapped['surface0']};
-    foreground: {mapped['text']};
-    selected: {mapped['mauve']};
+    try:
+        keep = set(keep) | {(BASE_DIR / ".current-theme").read_text().strip()}
+    except FileNotFoundError:
+        pass
     
-    font: "Ubuntu Nerd Font 13";
-}}
+    cached = sorted(
+        (entry for entry in os.scandir(THEME_CACHE_DIR) if entry.is_dir()),
+        key=lambda entry: entry.stat().st_mtime_ns,
+        reverse=True,
+    )
+    evicted = []
+    for entry in cached[max_themes:]:
+        if entry.name in keep:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        evicted.append(entry.name)
+    return evicted
 
-window {{
-    transparency:                "real";
-    location:                    center;
-    anchor:                      center;
-    fullscreen:                  false;
-    width:                       450px;
-    x-offset:                    0px;
-    y-offset:                    0px;
-
-    enabled:                     true;
-    margin:                      0px;
-    padding:                     0px;
-    border:                      0px solid;
-    border-radius:               12px;
-    border-color:                @selected;
-    background-color:            @background;
-    cursor:                      "default";
-}}
 
-mainbox {{
-    enabled:                     true;
-    spacing:                     0px;
-    margin:                      0px;
-    padding:                     0px;
-    border:                      0px solid;
-    border-radius:               0px 0px 0px 0px;
-    border-color:                @selected;
-    background-color:            transparent;
-    children:                    [ "inputbar", "listview" ];
-}}
+# ============================================================================
+# SHELL INIT
+# ============================================================================
 
-inputbar {{
-    enabled:                     true;
-    spacing:                     10px;
-    margin:                      0px;
-    padding:                     15px;
-    border:                      0px solid;
-    border-radius:               12px 12px 0px 0px;
-    border-color:                @selected;
-    background-color:            @selected;
-    text-color:                  @background;
-    children:                    [ "prompt", "entry" ];
-}}
+def shell_init_checks(colors_file: Path, tools: Dict[str, Optional[str]]) -> List[str]:
+    """
+    zsh conditions that hold while the init file is current: the deployed
+    shell colors and every tool binary still have the mtime they had when
+    it was built (tools that were missing must still be missing). zstat is
+    a builtin, so checking costs no fork.
+    """
+    def unchanged(path: str) -> str:
+        try:
+            mtime = int(os.stat(path).st_mtime)
+        except FileNotFoundError:
+            return f"[[ ! -e {shlex.quote(path)} ]] || return 1"
+        return f"zstat -A st +mtime -- {shlex.quote(path)} 2>/dev/null && (( st[1] == {mtime} )) || return 1"
+
+    checks = [unchanged(str(colors_file))]
+    for tool, binary in tools.items():
+        if binary:
+            checks.append(unchanged(binary))
+        else:
+            checks.append(f"(( ! $+commands[{tool}] )) || return 1")
+    return checks
 
-prompt {{
-    enabled:                     true;
-    background-color:            inherit;
-    text-color:                  inherit;
-}}
 
-entry {{
-    enabled:                     true;
-    background-color:            inherit;
-    text-color:                  inherit;
-    cursor:                      text;
-    placeholder:                 "Search themes...";
-    placeholder-color:           inherit;
-}}
+def build_shell_init(path: Path = SHELL_INIT_FILE, verbose: bool = False) -> bool:
+    """
+    Write the cached shell init sourced by .zshrc: a freshness guard, the
+    deployed theme's shell colors, the full `starship`/`zoxide init zsh`
+    output and a compinit that only rebuilds its dump once a day. The file
+    is byte-compiled with zcompile so zsh reads the .zwc instead.
+    """
+    colors_file = Path.home() / ".config" / TARGETS['shell'].deploy
+    tools = {tool: shutil.which(tool) for tool in SHELL_INIT_TOOLS}
 
-listview {{
-    enabled:                     true;
-    columns:                     1;
-    lines:                       7;
-    cycle:                       true;
-    dynamic:                     true;
-    scrollbar:                   false;
-    layout:                      vertical;
-    reverse:                     false;
-    fixed-height:                true;
-    fixed-columns:               true;
-    
-    spacing:                     5px;
-    margin:                      0px;
-    padding:                     10px;
-    border:                      0px solid;
-    border-radius:               0px;
-    border-color:                @selected;
-    background-color:            transparent;
-    text-color:                  @foreground;
-    cursor:                      "default";
-}}
+    sections = []
+    try:
+        sections.append(("theme colors", colors_file.read_text()))
+    except FileNotFoundError:
+        print(f"⚠️  Warning: {colors_file} not deployed yet, shell colors skipped")
 
-element {{
-    enabled:                     true;
-    spacing:                     10px;
-    margin:                      0px;
-    padding:                     10px;
-    border:                      0px solid;
-    border-radius:               8px;
-    border-color:                @selected;
-    background-color:            transparent;
-    text-color:                  @foreground;
-    cursor:                      pointer;
+    for tool, binary in tools.items():
+        if not binary:
+            continue
+        try:
+            proc = subprocess.run([binary, *SHELL_INIT_TOOLS[tool]], capture_output=True,
+                                  text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️  Warning: {tool} init failed: {e}")
+            continue
+        if proc.returncode != 0:
+            print(f"⚠️  Warning: {tool} init exited with {proc.returncode}")
+            continue
+        sections.append((tool, proc.stdout))
+        if verbose:
+            print(f"  ✓ {tool:<10} {binary}")
+
+    guard = '\n'.join(f"  {check}" for check in shell_init_checks(colors_file, tools))
+    generator = shlex.quote(str(Path(__file__).resolve()))
+    init = shlex.quote(str(path))
+    dump = shlex.quote(str(SHELL_COMPDUMP))
+
+    body = '\n'.join(f"# --- {name} ---\n{text.rstrip()}\n" for name, text in sections)
+    content = f"""# Shell init - generated by theme-switcher, do not edit
+# Rebuilt by generate-themes.py --shell-init when the theme or a tool changes
+
+zmodload -F zsh/stat b:zstat 2>/dev/null
+_theme_shell_init_current() {{
+  local -a st
+{guard}
+}}
+if [[ -z $_THEME_SHELL_REBUILT ]] && ! _theme_shell_init_current; then
+  unfunction _theme_shell_init_current
+  typeset -g _THEME_SHELL_REBUILT=1
+  python3 {generator} --shell-init >/dev/null && source {init}
+  unset _THEME_SHELL_REBUILT
+  return
+fi
+unfunction _theme_shell_init_current
+
+{body}
+# --- completion ---
+autoload -Uz compinit
+() {{
+  setopt localoptions extendedglob
+  local dump={dump}
+  if [[ -s $dump && -z $dump(#qN.mh+24) ]]; then
+    compinit -C -d $dump
+  else
+    compinit -d $dump
+    {{ zcompile -R -- $dump }} &!
+  fi
 }}
+"""
 
-element normal.normal {{
-    background-color:            @background;
-    text-color:                  @foreground;
-}}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Tools or completions changed: make compinit rebuild its dump
+    for stale in (SHELL_COMPDUMP, Path(f"{SHELL_COMPDUMP}.zwc"), Path(f"{path}.zwc")):
+        stale.unlink(missing_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp.write_text(content)
+    os.replace(tmp, path)
+
+    if shutil.which('zsh'):
+        subprocess.run(['zsh', '-fc', 'zcompile -R -- "$1"', 'zcompile', str(path)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return True
 
-element selected.normal {{
-    background-color:            @selected;
-    text-color:                  @background;
-}}
 
-element-text {{
-    background-color:            transparent;
-    text-color:                  inherit;
-    highlight:                   inherit;
-    cursor:                      inherit;
-    vertical-align:              0.5;
-    horizontal-align:            0.0;
+# ============================================================================
+# LOCK BACKGROUND
+# ============================================================================
+
+def blur_background(png: bytes, color: str) -> bytes:
+    """The lock screen image: png downscaled, blurred and tinted with color"""
+    from imagelib import box_blur, decode_png, downscale_rows, encode_png, tint_rows
+    
+    width, height, rows = decode_png(png)
+    factor = 1
+    while width // (factor * 2) >= LOCK_WIDTH and factor < 16:
+        factor *= 2
+    if factor > 1:
+        rows = downscale_rows(rows, width, factor)
+        width //= factor
+    rows = box_blur(rows, width, LOCK_BLUR_WINDOW.bit_length() - 1, LOCK_BLUR_PASSES)
+    rows = tint_rows(rows, width, color, LOCK_TINT, LOCK_BRIGHTNESS)
+    return encode_png(width, len(rows), rows)
+
+
+def lock_background_conf(image: Optional[Path]) -> str:
+    """The background block hyprlock.conf sources"""
+    if image is None:
+        return """# Lock Background - live blur (no pre-blurred wallpaper available)
+# Generated by generate-themes.py --lock-background
+background {
+    monitor =
+    path = screenshot
+    blur_passes = 3
+    blur_size = 8
+    noise = 0.0117
+    contrast = 0.8916
+    brightness = 0.8172
+    vibrancy = 0.1696
+    vibrancy_darkness = 0.0
+}
+"""
+    return f"""# Lock Background - pre-blurred wallpaper
+# Generated by generate-themes.py --lock-background
+background {{
+    monitor =
+    path = {image}
+    blur_passes = 0
+    noise = 0.0117
 }}
 """
 
 
-def generate_starship(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Starship dynamic palette"""
-    mapped = get_mapped_colors(theme_name, colors)
+def lock_background_source(wallpaper: Path) -> Path:
+    """The wallpaper's pre-scaled copy from the wallpaper cache, else itself"""
+    try:
+        result = subprocess.run([str(WALLPAPER_CACHE_SCRIPT), 'path', str(wallpaper)],
+                                capture_output=True, text=True, timeout=60)
+        first = result.stdout.split('\t', 1)[0].strip()
+        if result.returncode == 0 and first:
+            return Path(first)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    return wallpaper
+
+
+def build_lock_background(verbose: bool = False) -> bool:
+    """
+    Pre-compute the lock screen background for the current wallpaper and
+    the deployed hyprlock colors, and point hyprlock-background.conf at it.
+    Images are cached per content hash of (source image, tint color), so
+    switching back to a wallpaper/theme pair is only a config rewrite.
+    Without a decodable wallpaper the config falls back to live blur.
+    """
+    image = None
+    try:
+        wallpaper = Path(CURRENT_WALLPAPER_FILE.read_text().strip())
+        colors = (BASE_DIR.parent / TARGETS['hyprlock'].deploy).read_text()
+        color = re.search(r'^\$base = rgb\(([0-9a-fA-F]{6})\)', colors, re.M).group(1)
+        source = lock_background_source(wallpaper).read_bytes()
+        key = hashlib.sha256(source + f"{color}{LOCK_WIDTH}{LOCK_BLUR_WINDOW}{LOCK_BLUR_PASSES}"
+                             f"{LOCK_TINT}{LOCK_BRIGHTNESS}".encode()).hexdigest()[:16]
+        image = LOCK_CACHE_DIR / f"{key}.png"
+        if image.exists():
+            os.utime(image)
+        else:
+            data = blur_background(source, color)
+            LOCK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = image.with_name(f".{image.name}.{os.getpid()}")
+            tmp.write_bytes(data)
+            os.replace(tmp, image)
+            if verbose:
+                print(f"🔒 Blurred {wallpaper.name} → {image}")
+    except (OSError, AttributeError, ValueError, zlib.error) as e:
+        if verbose:
+            print(f"⚠️  Warning: No pre-blurred lock background: {e}")
+        image = None
     
-    return f"""# Starship Palette - {theme_name.title()}
-# Generated by theme-switcher
-# This palette is dynamically sourced by starship.toml
-
-[palettes.theme]
-rosewater = "{mapped.get('pink', '#f5c2e7')}"
-flamingo = "{mapped.get('pink', '#f5c2e7')}"
-pink = "{mapped['pink']}"
-mauve = "{mapped['mauve']}"
-red = "{mapped['red']}"
-maroon = "{mapped.get('maroon', mapped['red'])}"
-peach = "{mapped['peach']}"
-yellow = "{mapped['yellow']}"
-green = "{mapped['green']}"
-teal = "{mapped['teal']}"
-sky = "{mapped['sky']}"
-sapphire = "{mapped['sapphire']}"
-blue = "{mapped['blue']}"
-lavender = "{mapped['lavender']}"
-text = "{mapped['text']}"
-subtext1 = "{mapped['subtext1']}"
-subtext0 = "{mapped['subtext0']}"
-overlay2 = "{mapped.get('overlay2', mapped['overlay1'])}"
-overlay1 = "{mapped['overlay1']}"
-overlay0 = "{mapped['overlay0']}"
-surface2 = "{mapped['surface2']}"
-surface1 = "{mapped['surface1']}"
-surface0 = "{mapped['surface0']}"
-base = "{mapped['base']}"
-mantle = "{mapped['mantle']}"
-crust = "{mapped['crust']}"
-"""
+    conf = lock_background_conf(image)
+    try:
+        if LOCK_BACKGROUND_CONF.read_text() != conf:
+            raise FileNotFoundError
+    except FileNotFoundError:
+        LOCK_BACKGROUND_CONF.parent.mkdir(parents=True, exist_ok=True)
+        tmp = LOCK_BACKGROUND_CONF.with_name(f".{LOCK_BACKGROUND_CONF.name}.{os.getpid()}")
+        tmp.write_text(conf)
+        os.replace(tmp, LOCK_BACKGROUND_CONF)
+    
+    if LOCK_CACHE_DIR.exists():
+        cached = sorted(LOCK_CACHE_DIR.glob('*.png'), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+        for old in cached[LOCK_CACHE_SIZE:]:
+            old.unlink(missing_ok=True)
+    return image is not None
 
 
-def generate_hyprland_colors(theme_name: str, colors: Dict[str, str]) -> str:
-    """Generate Hyprland color configuration"""
+# ============================================================================
+# PROMPT BENCHMARK
+# ============================================================================
+
+def bench_prompt(theme_name: str, runs: int) -> int:
+    """
+    Compare prompt latency of the pre-merged starship config against the
+    layout with the full palette, in stub directories; prints median and
+    p90 per directory.
+    """
+    import benchlib
+    
+    starship = shutil.which('starship')
+    if not starship:
+        print("❌ Error: starship is not installed")
+        return 1
+    try:
+        layout = STARSHIP_LAYOUT_FILE.read_text()
+    except FileNotFoundError:
+        print(f"❌ Error: Starship layout not found: {STARSHIP_LAYOUT_FILE}")
+        return 1
+    colors = load_palette(theme_name)
+    if not colors:
+        return 1
     mapped = get_mapped_colors(theme_name, colors)
     
-    # Convert hex to rgb format for Hyprland
-    def hex_to_rgb(hex_color):
-        hex_color = hex_color.lstrip('#')
-        return f"rgb({hex_color})"
+    configs = {
+        'full palette': layout.rstrip() + '\n\n' + themelib.generate_starship(theme_name, mapped),
+        'pre-merged': themelib.generate_starship_config(theme_name, mapped, layout),
+    }
     
-    def hex_to_rgba(hex_color, alpha="44"):
-        hex_color = hex_color.lstrip('#')
-        return f"rgba({hex_color}{alpha})"
+    benchlib.compare_configs(starship, theme_name, configs, runs)
     
-    return f"""# Hyprland Colors - {theme_name.title()}
-# Generated by theme-switcher
-# Source this file in your appearance.conf
+    sizes = ', '.join(f"{label}: {len(text)} bytes" for label, text in configs.items())
+    print(f"\n  config size: {sizes}")
+    return 0
 
-$active_border = {hex_to_rgb(mapped['mauve'])}
-$inactive_border = {hex_to_rgb(mapped['surface1'])}
-$shadow_active = {hex_to_rgba(mapped['mauve'], '44')}
-$shadow_inactive = {hex_to_rgba(mapped['mantle'], '44')}
 
-general {{
-    col.active_border = $active_border
-    col.inactive_border = $inactive_border
-}}
+# ============================================================================
+# THEME TRANSITIONS
+# ============================================================================
 
-decoration {{
-    shadow {{
-        color = $shadow_active
-        color_inactive = $shadow_inactive
-    }}
-}}
-"""
+def interpolate_palettes(old: Dict[str, str], new: Dict[str, str],
+                         frames: int) -> List[Dict[str, str]]:
+    """
+    Cross-fade every role shared by two mapped palettes in OKLab. All frames
+    are computed in one batch up front: the role matrices are converted
+    once, and each frame is a single eased step along the per-role deltas.
+    The last frame is exactly the new palette.
+    """
+    roles = sorted(old.keys() & new.keys())
+    start = [hex_to_oklab(old[role]) for role in roles]
+    delta = [tuple(e - s for s, e in zip(a, b))
+             for a, b in zip(start, (hex_to_oklab(new[role]) for role in roles))]
+    
+    # Smoothstep easing: slow in, slow out
+    steps = [(i / frames) ** 2 * (3 - 2 * i / frames) for i in range(1, frames + 1)]
+    
+    batch = [
+        {role: oklab_to_hex((s[0] + d[0] * t, s[1] + d[1] * t, s[2] + d[2] * t))
+         for role, s, d in zip(roles, start, delta)}
+        for t in steps[:-1]
+    ]
+    batch.append({role: new[role] for role in roles})
+    return batch
+
+
+def kitty_frame_payload(theme_name: str, mapped: Dict[str, str]) -> bytes:
+    """kitty remote-control set-colors command for one frame"""
+    import ipclib
+    return ipclib.kitty_set_colors(ipclib.parse_kitty_colors(generate_kitty(theme_name, mapped)))
+
+
+def hyprland_frame_payload(theme_name: str, mapped: Dict[str, str]) -> bytes:
+    """Hyprland batched keyword request for one frame"""
+    values = {}
+    for line in generate_hyprland_colors(theme_name, mapped).splitlines():
+        if line.startswith('$'):
+            key, _, value = line.partition(' = ')
+            values[key] = value
+    return (
+        f"[[BATCH]]keyword general:col.active_border {values['$active_border']};"
+        f"keyword general:col.inactive_border {values['$inactive_border']};"
+        f"keyword decoration:shadow:color {values['$shadow_active']};"
+        f"keyword decoration:shadow:color_inactive {values['$shadow_inactive']}"
+    ).encode()
+
+
+def run_transition(old_theme: str, new_theme: str, frames: int = TRANSITION_FRAMES,
+                   fps: int = TRANSITION_FPS, targets: Optional[List[Target]] = None) -> Tuple[int, int]:
+    """
+    Animate kitty and Hyprland borders from old_theme to new_theme. Every
+    payload is computed up front and pushed by ipclib.push_frames, so a
+    slow IPC peer sees fewer frames, never a backlog.
+    
+    Returns (frames shown, frames dropped).
+    """
+    import ipclib
+    
+    names = {target.name for target in (targets or TARGETS.values())}
+    palettes = {}
+    for theme in (old_theme, new_theme):
+        colors = load_palette(theme)
+        if not colors:
+            raise ValueError(f"Palette not found: {theme}")
+        palettes[theme] = get_mapped_colors(theme, colors)
+    
+    peers = []
+    if 'kitty' in names:
+        peers += [(path, kitty_frame_payload) for path in sorted(glob.glob(KITTY_SOCKET_GLOB))]
+    hypr = ipclib.hyprland_socket() if 'hyprland' in names else None
+    if hypr:
+        peers.append((hypr, hyprland_frame_payload))
+    
+    if old_theme == new_theme or frames < 1 or not peers:
+        return 0, 0
+    
+    # Precompute every payload so the frame loop only does socket I/O
+    batch = interpolate_palettes(palettes[old_theme], palettes[new_theme], frames)
+    payloads = [[render(new_theme, mapped) for _, render in peers] for mapped in batch]
+    paths = [path for path, _ in peers]
+    
+    shown = ipclib.push_frames(paths, payloads, fps)
+    return shown, len(payloads) - shown
 
 
 # ============================================================================
-# THEME GENERATION
+# SCHEDULED SWITCHING
 # ============================================================================
 
-def generate_theme(theme_name: str, verbose: bool = False) -> bool:
-    """Generate all theme files for a given theme"""
-    if verbose:
-        print(f"📦 Generating theme: {theme_name}")
-    
-    # Load palette
-    colors = load_palette(theme_name)
-    if not colors:
-        return False
+def stage_switch(switch: 'schedlib.ScheduledSwitch') -> Optional[Path]:
+    """
+    Pre-render a switch's files so applying it is only copies and reloads.
+    Pre-generated themes are used in place; others, and dusk steps, are
+    rendered into STAGE_DIR and kept while their inputs are unchanged.
+    """
+    if not switch.step:
+        if (THEMES_DIR / switch.theme).is_dir():
+            return THEMES_DIR / switch.theme
+        key_parts = [theme_cache_key(switch.theme)]
+        key = key_parts[0]
+    else:
+        key_parts = [theme_cache_key(switch.previous), theme_cache_key(switch.final)]
+        key = f"{key_parts[0]}-{key_parts[1]}-{switch.step}/{switch.steps}"
+    if None in key_parts:
+        print(f"❌ Error: cannot stage {switch.theme}: palette not found")
+        return None
     
-    # Get mapped colors
-    mapped = get_mapped_colors(theme_name, colors)
+    stage_dir = STAGE_DIR / switch.theme
+    key_file = stage_dir / ".stage-key"
+    try:
+        if key_file.read_text() == key:
+            return stage_dir
+    except FileNotFoundError:
+        pass
     
-    # Create theme directory
-    theme_dir = THEMES_DIR / theme_name
-    theme_dir.mkdir(parents=True, exist_ok=True)
+    if not switch.step:
+        if not generate_theme(switch.theme, output_dir=STAGE_DIR):
+            return None
+    else:
+        old, new = load_palette(switch.previous), load_palette(switch.final)
+        if not old or not new:
+            return None
+        frames = interpolate_palettes(get_mapped_colors(switch.previous, old),
+                                      get_mapped_colors(switch.final, new), switch.steps)
+        mapped = frames[switch.step - 1]
+        stage_dir.mkdir(parents=True, exist_ok=True)
+        for target in TARGETS.values():
+            (stage_dir / target.filename).write_text(target.render(switch.final, mapped))
+    key_file.write_text(key)
+    return stage_dir
+
+
+def apply_switch(switch: 'schedlib.ScheduledSwitch', staged: Optional[Path]) -> bool:
+    """
+    Hand a switch to switcher.sh. Dusk steps apply without a notification
+    and are recorded under their own FINAL@STEP name, so status compares the
+    deployed files with the step that produced them.
+    """
+    argv = [str(SWITCHER), 'apply', switch.theme]
+    if staged:
+        argv += ['--staged', str(staged)]
+    if switch.step:
+        argv.append('--quiet')
+    code = subprocess.run(argv, stdout=subprocess.DEVNULL).returncode
+    return code in (0, SWITCH_QUEUED_STATUS)
+
+
+def run_schedule(path: Path = SCHEDULE_FILE) -> int:
+    """
+    Scheduler loop: apply the switch that is due if it is not already
+    active (at start, after a timer or a clock change), stage the next
+    switch together with its dusk steps, then sleep until it.
+    """
+    import schedlib
     
-    # Generate each theme file
-    theme_files = {
-        "waybar.css": generate_waybar(theme_name, mapped),
-        "swaync.css": generate_swaync(theme_name, mapped),
-        "rofi.rasi": generate_rofi(theme_name, colors),
-        "rofi-launcher-colors.rasi": generate_rofi_launcher_colors(theme_name, colors),
-        "btop.theme": generate_btop(theme_name, colors),
-        "cava": generate_cava(theme_name, colors),
-        "alacritty-theme.toml": generate_alacritty(theme_name, colors),
-        "kitty-theme.conf": generate_kitty(theme_name, colors),
-        "theme-switcher-menu.rasi": generate_theme_menu(theme_name, colors),
-        "starship-palette.toml": generate_starship(theme_name, colors),
-        "hyprland-colors.conf": generate_hyprland_colors(theme_name, colors),
-    }
+    try:
+        schedule = schedlib.load_schedule(path)
+    except FileNotFoundError:
+        print(f"⚠️  Warning: No schedule configured ({path})")
+        return 0
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
     
-    # Write files
-    for filename, content in theme_files.items():
-        file_path = theme_dir / filename
+    while True:
+        now = datetime.now().astimezone()
+        switches = schedlib.schedule_switches(schedule, now, DUSK_STEPS)
+        
+        due = [s for s in switches if s.when <= now]
         try:
-            with open(file_path, 'w') as f:
-                f.write(content)
-            if verbose:
-                print(f"  ✓ {filename}")
-        except Exception as e:
-            print(f"  ❌ Error writing {filename}: {e}")
-            return False
+            current = (BASE_DIR / ".current-theme").read_text().strip()
+        except FileNotFoundError:
+            current = None
+        if due and due[-1].theme != current:
+            switch = due[-1]
+            path = stage_switch(switch)   # staged already, unless an input changed
+            print(f"🕑 {now:%H:%M} switching to {switch.theme}")
+            if not apply_switch(switch, path):
+                print(f"❌ Error: switch to {switch.theme} failed")
+        
+        upcoming = [s for s in switches if s.when > now]
+        if not upcoming:
+            print("❌ Error: schedule has no upcoming switches")
+            return 1
+        # Stage the next switch, and the rest of its dusk series with it
+        for switch in upcoming:
+            stage_switch(switch)
+            if not switch.step:
+                break
+        print(f"⏰ Next: {upcoming[0].theme} at {upcoming[0].when:%Y-%m-%d %H:%M}")
+        
+        schedlib.wait_until(upcoming[0].when)
+
+
+def print_schedule(path: Path = SCHEDULE_FILE) -> int:
+    """Show the switches of the next 24 hours"""
+    import schedlib
     
-    if verbose:
-        print(f"✅ {theme_name} generated successfully\n")
+    try:
+        schedule = schedlib.load_schedule(path)
+    except FileNotFoundError:
+        print(f"❌ Error: No schedule configured ({path})")
+        return 1
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
     
-    return True
+    now = datetime.now().astimezone()
+    print("Scheduled switches (next 24 hours):")
+    print("=" * 40)
+    for switch in schedlib.schedule_switches(schedule, now, DUSK_STEPS):
+        if now < switch.when <= now + timedelta(days=1):
+            print(f"  {switch.when:%a %H:%M}  {switch.theme}")
+    return 0
 
 
 # ============================================================================
@@ -1375,8 +1554,23 @@ def main():
 Examples:
   %(prog)s                      # Generate all themes
   %(prog)s -t tokyo-night       # Generate only Tokyo Night
+  %(prog)s --targets kitty,hyprland  # Generate only some targets
   %(prog)s -l                   # List available palettes
+  %(prog)s --variants           # Also generate the oled/high-contrast/dim variants
+  %(prog)s --incremental        # Regenerate only themes whose inputs changed
+  %(prog)s --import ~/schemes   # Import base16/base24 schemes
+  %(prog)s --ensure nord        # Render nord into the theme cache
+  %(prog)s --bundle             # Pack every theme into themes.bundle
+  %(prog)s --transition dracula -t nord  # Cross-fade kitty and borders
+  %(prog)s --reload --targets waybar,kitty  # Reload running applications
+  %(prog)s --shell-init         # Rebuild the cached zsh init file
+  %(prog)s --lock-background    # Pre-blur the wallpaper for hyprlock
+  %(prog)s --schedule           # Run the light/dark scheduler (schedule.json)
+  %(prog)s --workspace-accents  # Recolor borders per workspace
+  %(prog)s --bench-prompt -t nord  # Starship prompt latency in stub directories
   %(prog)s -v                   # Verbose output
+  %(prog)s --audit              # Contrast matrix for all themes
+  %(prog)s --fix-contrast       # Generate with contrast-nudged colors
         """
     )
     
@@ -1389,31 +1583,273 @@ Examples:
         action='store_true',
         help='List available palette files'
     )
+    parser.add_argument(
+        '--import',
+        dest='import_paths',
+        nargs='+',
+        type=Path,
+        metavar='PATH',
+        help='Import base16/base24 scheme files or directories as palettes'
+    )
+    parser.add_argument(
+        '--targets',
+        metavar='LIST',
+        help="Comma-separated targets to generate (e.g. kitty,hyprland), or 'installed'"
+    )
+    parser.add_argument(
+        '--ensure',
+        metavar='THEME',
+        help='Render THEME on demand into the theme cache if missing or stale'
+    )
+    parser.add_argument(
+        '--bundle',
+        nargs='?',
+        const=BUNDLE_FILE,
+        type=Path,
+        metavar='PATH',
+        help=f'Write the selected themes into one indexed bundle file (default: {BUNDLE_FILE})'
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=THEME_CACHE_SIZE,
+        metavar='N',
+        help=f'Rendered themes kept in the cache (default: {THEME_CACHE_SIZE})'
+    )
+    parser.add_argument(
+        '--transition',
+        metavar='FROM',
+        help='Cross-fade running kitty and Hyprland borders from FROM to --theme'
+    )
+    parser.add_argument(
+        '--frames',
+        type=int,
+        default=TRANSITION_FRAMES,
+        metavar='N',
+        help=f'Transition length in frames (default: {TRANSITION_FRAMES})'
+    )
+    parser.add_argument(
+        '--fps',
+        type=int,
+        default=TRANSITION_FPS,
+        metavar='N',
+        help=f'Transition frame rate (default: {TRANSITION_FPS})'
+    )
+    parser.add_argument(
+        '--reload',
+        action='store_true',
+        help='Reload the running applications of the selected targets concurrently'
+    )
+    parser.add_argument(
+        '--reload-timeout',
+        type=float,
+        default=RELOAD_TIMEOUT,
+        metavar='SECONDS',
+        help=f'Per-attempt reload timeout (default: {RELOAD_TIMEOUT:g})'
+    )
+    parser.add_argument(
+        '--shell-init',
+        action='store_true',
+        help=f'Rebuild the cached shell init sourced by .zshrc ({SHELL_INIT_FILE})'
+    )
+    parser.add_argument(
+        '--lock-background',
+        action='store_true',
+        help='Pre-blur the current wallpaper for hyprlock, tinted with the deployed theme'
+    )
+    parser.add_argument(
+        '--bench-prompt',
+        nargs='?',
+        const=20,
+        type=int,
+        metavar='RUNS',
+        help='Benchmark starship prompt latency, full palette vs pre-merged config (default: 20 runs)'
+    )
+    parser.add_argument(
+        '--schedule',
+        action='store_true',
+        help=f'Switch themes on the rules in {SCHEDULE_FILE}, sleeping between switches'
+    )
+    parser.add_argument(
+        '--schedule-show',
+        action='store_true',
+        help='Print the scheduled switches of the next 24 hours'
+    )
+    parser.add_argument(
+        '--workspace-accents',
+        action='store_true',
+        help='Listen on Hyprland\'s event socket and recolor borders per workspace'
+    )
+    parser.add_argument(
+        '--replay-events',
+        type=Path,
+        metavar='FILE',
+        help='Serve stand-in Hyprland sockets replaying a recorded event log (for testing the listener)'
+    )
+    parser.add_argument(
+        '--replay-interval',
+        type=float,
+        default=0.0,
+        metavar='MS',
+        help='Delay between replayed events (default: 0, one burst)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only regenerate themes whose palette or generator changed since they were generated'
+    )
+    parser.add_argument(
+        '--variants',
+        action='store_true',
+        help="Also generate every palette's derived variants (oled, high-contrast, dim)"
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Overwrite existing palettes when importing'
+    )
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
         help='Verbose output'
     )
+    parser.add_argument(
+        '--refresh-caches',
+        action='store_true',
+        help='Only refresh the palette index, menu and query caches (run by switcher.sh)'
+    )
     parser.add_argument(
         '--validate',
         action='store_true',
         help='Only validate palettes without generating themes'
     )
+    parser.add_argument(
+        '--audit',
+        action='store_true',
+        help='Report WCAG/APCA contrast of every role pair used by every target'
+    )
+    parser.add_argument(
+        '--fix-contrast',
+        action='store_true',
+        help='Nudge role lightness until every pair meets its contrast threshold'
+    )
+    parser.add_argument(
+        '--min-contrast',
+        type=float,
+        default=MIN_TEXT_CONTRAST,
+        metavar='RATIO',
+        help=f'Minimum WCAG ratio for text pairs (default: {MIN_TEXT_CONTRAST})'
+    )
+    parser.add_argument(
+        '--min-ui-contrast',
+        type=float,
+        default=MIN_UI_CONTRAST,
+        metavar='RATIO',
+        help=f'Minimum WCAG ratio for borders and bars (default: {MIN_UI_CONTRAST})'
+    )
     
     args = parser.parse_args()
     
-    # Ensure directories exist
-    PALETTES_DIR.mkdir(parents=True, exist_ok=True)
-    THEMES_DIR.mkdir(parents=True, exist_ok=True)
+    # Cached shell init (also run by new shells when it went stale)
+    if args.shell_init:
+        return 0 if build_shell_init(verbose=args.verbose) else 1
+    
+    # Pre-blurred lock background (run by the wallpaper menu)
+    if args.lock_background:
+        build_lock_background(verbose=args.verbose)
+        return 0
+    
+    # Hyprland workspace accents (listener and its stand-in for testing)
+    if args.replay_events:
+        import ipclib
+        return ipclib.replay_hyprland_events(args.replay_events, args.replay_interval / 1000)
+    if args.workspace_accents:
+        import ipclib
+        return ipclib.run_workspace_listener(WORKSPACE_ACCENTS_FILE)
+    
+    # Target registry (built-in targets plus targets.d plugins), in memory
+    # only: the IPC, scheduling and cache paths below run on every switch
+    # and must not rewrite the registry, index or menu files
+    load_starship_layout()
+    load_target_plugins()
+    try:
+        targets = select_targets(args.targets)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    # Reload running applications after switcher.sh deployed their files
+    if args.reload:
+        import asyncio
+        import reloadlib
+        
+        options = reloadlib.ReloadOptions(BASE_DIR.parent, KITTY_SOCKET_GLOB, args.reload_timeout,
+                                          RELOAD_RETRIES, RELOAD_READY_SETTLE)
+        start = time.monotonic()
+        results = asyncio.run(reloadlib.reload_targets(targets, options))
+        reloadlib.print_reload_report(results, time.monotonic() - start)
+        return 0 if all(r.ok for r in results) else 1
+    
+    # Animated transition (IPC only, the caller applies the final state)
+    if args.transition:
+        if not args.theme:
+            print("❌ Error: --transition needs a target theme (-t THEME)")
+            return 1
+        try:
+            shown, dropped = run_transition(args.transition, args.theme,
+                                            args.frames, args.fps, targets)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return 1
+        if args.verbose:
+            print(f"🎞️  {shown} frames shown, {dropped} dropped")
+        return 0
+    
+    # Scheduled switching
+    if args.schedule_show:
+        return print_schedule()
+    if args.schedule:
+        return run_schedule()
+    
+    # Lazy rendering into the theme cache
+    if args.ensure:
+        return 0 if ensure_cached_theme(args.ensure, args.cache_size, args.verbose) else 1
+    
+    # Prompt latency benchmark (current theme unless -t is given)
+    if args.bench_prompt:
+        theme = args.theme
+        if not theme:
+            try:
+                theme = (BASE_DIR / ".current-theme").read_text().strip()
+            except FileNotFoundError:
+                print("❌ Error: no current theme, pass -t THEME")
+                return 1
+        return bench_prompt(theme, args.bench_prompt)
+    
+    # Palette index, menu and query caches (switcher.sh, after palettes changed)
+    if args.refresh_caches:
+        refresh_palette_caches()
+        return 0
+    
+    # Import schemes, then refresh the caches once
+    if args.import_paths:
+        PALETTES_DIR.mkdir(parents=True, exist_ok=True)
+        print("📥 Importing schemes...\n")
+        imported, skipped = import_schemes(args.import_paths, force=args.force, verbose=args.verbose)
+        refresh_palette_caches()
+        print(f"\n✅ Imported {imported} schemes ({skipped} skipped)")
+        return 0
     
-    # List palettes
+    # List palettes (read-only, as are --validate and --audit)
     if args.list:
-        palettes = discover_palettes()
+        index = load_palette_index(save=False)
         print("Available palettes:")
         print("=" * 40)
-        for palette in palettes:
-            print(f"  • {palette}")
-        print(f"\nTotal: {len(palettes)} palettes")
+        for palette in sorted(index):
+            entry = index[palette]
+            family = f"variant of {entry['base']}" if 'base' in entry else entry['family']
+            print(f"  • {palette:<28} {entry['variant']:<6} {family}")
+        print(f"\nTotal: {len(index)} palettes")
         return 0
     
     # Discover available themes
@@ -1421,7 +1857,8 @@ Examples:
         themes = [args.theme]
         print(f"🎨 Generating theme: {args.theme}\n")
     else:
-        themes = discover_palettes()
+        themes = discover_palettes(include_variants=args.variants,
+                                   save=not (args.validate or args.audit))
         if not themes:
             print("❌ No palette files found in:", PALETTES_DIR)
             return 1
@@ -1440,19 +1877,76 @@ Examples:
         
         return 0 if all_valid else 1
     
-    # Generate themes
+    # Contrast audit
+    if args.audit:
+        mapped_themes = {}
+        for theme in themes:
+            colors = load_palette(theme)
+            if not colors:
+                return 1
+            mapped = get_mapped_colors(theme, colors)
+            if args.fix_contrast:
+                mapped, changes = fix_contrast(theme, mapped, args.min_contrast, args.min_ui_contrast)
+                for role, (old, new) in changes.items():
+                    print(f"  ↻ {theme}: {role} {old} → {new}")
+            mapped_themes[theme] = mapped
+        
+        results = audit_contrast(mapped_themes, args.min_contrast, args.min_ui_contrast)
+        print_contrast_report(results)
+        return 0 if all(r.passed for r in results) else 1
+    
+    # Single-file bundle instead of theme directories
+    if args.bundle:
+        bundled, failed = write_bundle(args.bundle, themes, targets, args.verbose,
+                                       fix_contrast_pairs=args.fix_contrast,
+                                       min_text=args.min_contrast,
+                                       min_ui=args.min_ui_contrast)
+        print(f"📦 Bundled {bundled} themes into {args.bundle} "
+              f"({args.bundle.stat().st_size // 1024} KiB)")
+        return 1 if failed else 0
+    
+    # Registry view for switcher.sh and the palette caches
+    THEMES_DIR.mkdir(parents=True, exist_ok=True)
+    write_target_registry()
+    palette_index = refresh_palette_caches()
+    
+    # Generate themes (with --incremental, only those whose key changed;
+    # keys are only recorded for full, default-option generations). Contrast
+    # findings are reported for the palettes themselves, not for derived
+    # variants computed from them (unless one is generated by name)
     success_count = 0
     fail_count = 0
+    skip_count = 0
+    record_keys = args.targets is None and not args.fix_contrast
     
     for theme in themes:
-        if generate_theme(theme, verbose=args.verbose):
+        key_file = THEMES_DIR / theme / ".cache-key"
+        key = theme_cache_key(theme) if args.incremental or record_keys else None
+        if args.incremental and key and record_keys:
+            try:
+                if key_file.read_text() == key:
+                    skip_count += 1
+                    continue
+            except FileNotFoundError:
+                pass
+        
+        if generate_theme(theme, verbose=args.verbose,
+                          fix_contrast_pairs=args.fix_contrast,
+                          min_text=args.min_contrast,
+                          min_ui=args.min_ui_contrast,
+                          targets=targets,
+                          report_contrast=bool(args.theme) or 'base' not in palette_index.get(theme, {})):
             success_count += 1
+            if key and record_keys:
+                key_file.write_text(key)
         else:
             fail_count += 1
     
     # Summary
     print("=" * 50)
-    print(f"✅ Successfully generated: {success_count}/{len(themes)} themes")
+    if args.incremental:
+        print(f"⏭️  Unchanged: {skip_count} themes")
+    print(f"✅ Successfully generated: {success_count}/{len(themes) - skip_count} themes")
     if fail_count > 0:
         print(f"❌ Failed: {fail_count} themes")
         return 1
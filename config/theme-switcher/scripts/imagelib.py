@@ -0,0 +1,206 @@
+"""
+PNG codec and blur for the generator's images (menu swatches, lock screen
+backgrounds), in pure Python on the standard library. Imported by the
+subcommands that draw or decode images, not at generator startup.
+
+    rows = [bytes.fromhex('1e1e2e') * 64] * 64
+    png = encode_png(64, 64, rows)
+    width, height, rows = decode_png(png)
+    rows = box_blur(rows, width, bits=3, passes=3)
+"""
+
+import functools
+import struct
+import zlib
+from typing import List, Tuple
+
+
+# ============================================================================
+# LANE ARITHMETIC
+# ============================================================================
+
+# Rows of pixels are processed as one Python int per row with a 16-bit lane
+# per 8-bit sample (SIMD within a register): adding two ints adds every
+# lane at once and shifting by 48 bits moves a whole pixel, so blur sums
+# run in C-speed bigint arithmetic instead of per-pixel loops.
+
+@functools.lru_cache(maxsize=None)
+def lane_constant(value: int, count: int) -> int:
+    """An int with value in each of count 16-bit lanes"""
+    return int.from_bytes(value.to_bytes(2, 'little') * count, 'little')
+
+
+def pack_lanes(samples: bytes) -> int:
+    """8-bit samples -> an int with one 16-bit lane per sample"""
+    wide = bytearray(2 * len(samples))
+    wide[0::2] = samples
+    return int.from_bytes(wide, 'little')
+
+
+def unpack_lanes(value: int, count: int) -> bytes:
+    """The low byte of each of count lanes"""
+    return value.to_bytes(2 * count, 'little')[0::2]
+
+
+def divide_lanes(value: int, bits: int, count: int) -> int:
+    """Divide every lane by 2**bits, rounded to nearest"""
+    if not bits:
+        return value
+    value += lane_constant(1 << (bits - 1), count)
+    return (value >> bits) & lane_constant((1 << (16 - bits)) - 1, count)
+
+
+def window_sum(value: int, bits: int) -> int:
+    """Sum each pixel with the next 2**bits - 1 pixels (log2 shift-adds)"""
+    step = 48
+    for _ in range(bits):
+        value += value >> step
+        step *= 2
+    return value
+
+
+# ============================================================================
+# PNG CODEC
+# ============================================================================
+
+def encode_png(width: int, height: int, rows: List[bytes]) -> bytes:
+    """Encode 8-bit RGB scanlines as a PNG (no external imaging tools)"""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (struct.pack('>I', len(data)) + tag + data
+                + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+    
+    raw = b''.join(b'\x00' + row for row in rows)
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 9))
+            + chunk(b'IEND', b''))
+
+
+def unfilter_row(kind: int, row: bytes, prev: bytes, bpp: int) -> bytes:
+    """Undo a PNG Sub, Average or Paeth row filter"""
+    out = bytearray(row)
+    for i in range(len(out)):
+        left = out[i - bpp] if i >= bpp else 0
+        up = prev[i]
+        if kind == 1:
+            pred = left
+        elif kind == 3:
+            pred = (left + up) >> 1
+        elif kind == 4:
+            corner = prev[i - bpp] if i >= bpp else 0
+            p = left + up - corner
+            pa, pb, pc = abs(p - left), abs(p - up), abs(p - corner)
+            pred = left if pa <= pb and pa <= pc else up if pb <= pc else corner
+        else:
+            raise ValueError(f"invalid PNG filter type {kind}")
+        out[i] = (out[i] + pred) & 0xff
+    return bytes(out)
+
+
+def decode_png(data: bytes) -> Tuple[int, int, List[bytes]]:
+    """
+    Decode an 8-bit RGB/RGBA, non-interlaced PNG into (width, height, RGB
+    rows). None and Up rows (all the wallpaper cache writes) cost only
+    bytes operations; other filters fall back to a per-byte loop.
+    """
+    if data[:8] != b'\x89PNG\r\n\x1a\n':
+        raise ValueError("not a PNG file")
+    header, idat, pos = None, [], 8
+    while pos + 8 <= len(data):
+        length, tag = struct.unpack_from('>I4s', data, pos)
+        if tag == b'IHDR':
+            header = struct.unpack_from('>IIBBBBB', data, pos + 8)
+        elif tag == b'IDAT':
+            idat.append(data[pos + 8:pos + 8 + length])
+        elif tag == b'IEND':
+            break
+        pos += 12 + length
+    if header is None:
+        raise ValueError("PNG has no header")
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or color_type not in (2, 6) or interlace:
+        raise ValueError("only 8-bit RGB/RGBA non-interlaced PNGs are supported")
+    
+    bpp = 3 if color_type == 2 else 4
+    stride = width * bpp
+    raw = zlib.decompress(b''.join(idat))
+    rows = []
+    prev = bytes(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind, row = raw[start], raw[start + 1:start + 1 + stride]
+        if kind == 2:
+            row = unpack_lanes(pack_lanes(row) + pack_lanes(prev), stride)
+        elif kind:
+            row = unfilter_row(kind, row, prev, bpp)
+        rows.append(row)
+        prev = row
+    
+    if bpp == 4:
+        for y, row in enumerate(rows):
+            rgb = bytearray(width * 3)
+            for c in range(3):
+                rgb[c::3] = row[c::4]
+            rows[y] = bytes(rgb)
+    return width, height, rows
+
+
+# ============================================================================
+# FILTERS
+# ============================================================================
+
+def downscale_rows(rows: List[bytes], width: int, factor: int) -> List[bytes]:
+    """Average factor x factor pixel blocks (factor a power of two, <= 16)"""
+    bits = factor.bit_length() - 1
+    count = width * 3
+    small = width // factor
+    out = []
+    for top in range(0, len(rows) - factor + 1, factor):
+        block = sum(pack_lanes(row) for row in rows[top:top + factor])
+        row = unpack_lanes(divide_lanes(window_sum(block, bits), 2 * bits, count), count)
+        pixels = bytearray(small * 3)
+        for c in range(3):
+            pixels[c::3] = row[c::3 * factor][:small]
+        out.append(bytes(pixels))
+    return out
+
+
+def box_blur(rows: List[bytes], width: int, bits: int, passes: int) -> List[bytes]:
+    """
+    Box-blur RGB rows with a 2**bits wide window, horizontally then
+    vertically, passes times (three passes approximate a gaussian). Edges
+    repeat the border pixels; the window leans left and right on
+    alternate passes so the image does not drift.
+    """
+    size = 1 << bits
+    count = width * 3
+    row_mask = (1 << (16 * count)) - 1
+    for n in range(passes):
+        before = size // 2 - n % 2
+        after = size - 1 - before
+        
+        packed = []
+        for row in rows:
+            wide = pack_lanes(row[:3] * before + row + row[-3:] * after)
+            packed.append(divide_lanes(window_sum(wide, bits) & row_mask, bits, count))
+        
+        padded = [packed[0]] * before + packed + [packed[-1]] * after
+        total = sum(padded[:size])
+        rows = []
+        for y in range(len(packed)):
+            rows.append(unpack_lanes(divide_lanes(total, bits, count), count))
+            if y + size < len(padded):
+                total += padded[y + size] - padded[y]
+    return rows
+
+
+def tint_rows(rows: List[bytes], width: int, color: str,
+              amount: float, brightness: float) -> List[bytes]:
+    """Dim the rows and mix in amount of color (all lanes at once)"""
+    count = width * 3
+    keep = round(256 * (1 - amount) * brightness)
+    mix = round(256 * amount)
+    pixel = struct.pack('<3H', *(mix * c for c in bytes.fromhex(color.lstrip('#')[:6])))
+    tint = int.from_bytes(pixel * width, 'little') + lane_constant(128, count)
+    mask = lane_constant(0xff, count)
+    return [unpack_lanes(((pack_lanes(row) * keep + tint) >> 8) & mask, count) for row in rows]
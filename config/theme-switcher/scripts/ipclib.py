@@ -0,0 +1,355 @@
+"""
+Unix-socket IPC with running kitty and Hyprland instances: transition
+frames pushed on a fixed clock, the per-workspace border accent listener
+on Hyprland's event socket, and a stand-in Hyprland that replays recorded
+events to it for testing. Imported by --transition, --workspace-accents
+and --replay-events only; run directly, it recolors every kitty instance
+for the switcher's live preview.
+"""
+
+import json
+import os
+import select
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# ============================================================================
+# HYPRLAND SOCKETS
+# ============================================================================
+
+def hyprland_socket(name: str = ".socket.sock") -> Optional[str]:
+    """Command (or, with .socket2.sock, event) socket of the running Hyprland instance"""
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        return None
+    for root in (os.environ.get("XDG_RUNTIME_DIR", ""), "/tmp"):
+        path = os.path.join(root, "hypr", signature, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def hyprland_request(path: str, payload: bytes, timeout: float = 1.0) -> bytes:
+    """One request on Hyprland's command socket; it closes after replying"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(payload)
+        reply = []
+        while chunk := sock.recv(65536):
+            reply.append(chunk)
+    return b''.join(reply)
+
+
+# ============================================================================
+# KITTY REMOTE CONTROL
+# ============================================================================
+
+# Client version sent with every remote-control command, which kitty uses to
+# tell which protocol the client speaks: 0.14.2 is the oldest kitty whose
+# set-colors payload (colors, all, configured, reset) matches the one built
+# here, and later releases still accept it
+KITTY_PROTOCOL_VERSION = [0, 14, 2]
+
+def parse_kitty_colors(text: str) -> Dict[str, int]:
+    """Color settings ('name #rrggbb' lines) of a kitty theme file"""
+    colors = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(' ')
+        if key and not key.startswith('#'):
+            colors[key] = int(value.strip().lstrip('#'), 16)
+    return colors
+
+
+def kitty_set_colors(colors: Dict[str, int], reset: bool = False) -> bytes:
+    """kitty remote-control set-colors request for every window of an instance"""
+    command = {
+        'cmd': 'set-colors',
+        'version': KITTY_PROTOCOL_VERSION,
+        'payload': {'colors': colors, 'all': True, 'configured': False, 'reset': reset},
+    }
+    return b'\x1bP@kitty-cmd' + json.dumps(command).encode() + b'\x1b\\'
+
+
+def broadcast(paths: List[str], payload: bytes, timeout: float = 1.0) -> int:
+    """Send one request to every socket at once and collect the replies; returns how many answered"""
+    pending: Dict[socket.socket, str] = {}
+    for path in paths:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(payload)
+        except OSError:
+            sock.close()
+            continue
+        pending[sock] = path
+    
+    answered = 0
+    deadline = time.monotonic() + timeout
+    while pending and (left := deadline - time.monotonic()) > 0:
+        for sock in select.select(list(pending), [], [], left)[0]:
+            try:
+                sock.recv(4096)
+            except OSError:
+                pass
+            sock.close()
+            del pending[sock]
+            answered += 1
+    for sock in pending:
+        sock.close()
+    return answered
+
+
+# ============================================================================
+# TRANSITION FRAMES
+# ============================================================================
+
+def push_frames(paths: List[str], payloads: List[List[bytes]], fps: int) -> int:
+    """
+    Send one payload per socket per frame on a fixed clock; payloads[frame]
+    holds one request per path. Frames never queue up: each socket has at
+    most one request in flight, a socket that has not answered its previous
+    frame skips the current one, and frames whose deadline already passed
+    are dropped. Only the final frame waits for every peer. Returns the
+    number of frames shown.
+    """
+    in_flight: Dict[str, socket.socket] = {}
+    dead = set()
+    
+    def settle(path: str, timeout: float) -> bool:
+        """Collect the reply to the request in flight; False if still pending"""
+        sock = in_flight[path]
+        if not select.select([sock], [], [], timeout)[0]:
+            return False
+        try:
+            sock.recv(4096)
+        except OSError:
+            pass
+        sock.close()
+        del in_flight[path]
+        return True
+    
+    def send(path: str, payload: bytes) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.setblocking(False)
+            sock.connect(path)
+            sock.sendall(payload)
+        except OSError:
+            sock.close()
+            dead.add(path)
+            return
+        in_flight[path] = sock
+    
+    period = 1 / fps
+    last = len(payloads) - 1
+    shown = 0
+    start = time.monotonic()
+    frame = 0
+    while frame <= last:
+        # Skip ahead to the newest frame that is due
+        due = int((time.monotonic() - start) / period)
+        frame = max(frame, min(due, last))
+        
+        for path, payload in zip(paths, payloads[frame]):
+            if path in dead:
+                continue
+            if path in in_flight and not settle(path, 1.0 if frame == last else 0):
+                if frame < last:
+                    continue
+                # Final frame: an unresponsive peer is given up on
+                in_flight.pop(path).close()
+                dead.add(path)
+                continue
+            send(path, payload)
+        shown += 1
+        frame += 1
+        
+        delay = start + frame * period - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    
+    for path in list(in_flight):
+        if not settle(path, 1.0):
+            in_flight.pop(path).close()
+    
+    return shown
+
+
+# ============================================================================
+# WORKSPACE ACCENTS
+# ============================================================================
+
+def load_workspace_accents(path: Path) -> Dict[str, bytes]:
+    """Workspace id ('*' for the rest) -> ready-to-send Hyprland batch request"""
+    accents = {}
+    for line in path.read_text().splitlines():
+        if line and not line.startswith('#'):
+            key, _, payload = line.partition('\t')
+            accents[key] = payload.encode()
+    return accents
+
+
+def workspace_from_event(line: bytes) -> Optional[str]:
+    """Workspace a 'workspace>>NAME' or 'focusedmon>>MONITOR,NAME' event switched to"""
+    event, _, data = line.partition(b'>>')
+    if event == b'workspace':
+        return data.decode(errors='replace')
+    if event == b'focusedmon':
+        return data.partition(b',')[2].decode(errors='replace')
+    return None
+
+
+def run_workspace_listener(accents_file: Path) -> int:
+    """
+    Recolor the active border per workspace. Everything queued on the
+    event socket is drained before acting, so a burst of workspace
+    switches costs a single batch request for the workspace it ended on
+    and nothing piles up. Colors are re-read only when a theme switch
+    replaced the accents file, and re-pushed after `hyprctl reload` (which
+    resets the border to the global accent).
+    """
+    events_path, command_path = hyprland_socket(".socket2.sock"), hyprland_socket()
+    if not events_path or not command_path:
+        print("❌ Error: Hyprland is not running (no event socket)")
+        return 1
+    try:
+        accents = load_workspace_accents(accents_file)
+        accents_mtime = accents_file.stat().st_mtime_ns
+    except FileNotFoundError:
+        print(f"❌ Error: Workspace accents not deployed: {accents_file}")
+        return 1
+    
+    try:
+        current = str(json.loads(hyprland_request(command_path, b"j/activeworkspace"))['id'])
+    except (OSError, ValueError, KeyError, TypeError):
+        current = '*'
+    pushed = None
+    
+    events = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    events.connect(events_path)
+    buffer = b''
+    while True:
+        data = events.recv(65536)
+        if not data:
+            return 0   # compositor exited
+        buffer += data
+        events.setblocking(False)
+        try:
+            while chunk := events.recv(65536):
+                buffer += chunk
+        except BlockingIOError:
+            pass
+        finally:
+            events.setblocking(True)
+        
+        *lines, buffer = buffer.split(b'\n')
+        force = False
+        for line in lines:
+            workspace = workspace_from_event(line)
+            if workspace is not None:
+                current = workspace
+            elif line.startswith(b'configreloaded'):
+                force = True
+        
+        try:
+            mtime = accents_file.stat().st_mtime_ns
+            if mtime != accents_mtime:
+                accents, accents_mtime, force = load_workspace_accents(accents_file), mtime, True
+        except FileNotFoundError:
+            pass
+        
+        if current != pushed or force:
+            try:
+                hyprland_request(command_path, accents.get(current, accents['*']))
+                pushed = current
+            except OSError as e:
+                print(f"⚠️  Warning: accent push failed: {e}")
+
+
+def replay_hyprland_events(events_file: Path, interval: float = 0.0, linger: float = 1.0) -> int:
+    """
+    Stand-in Hyprland for exercising the workspace listener without a
+    compositor. Serves the sockets of $HYPRLAND_INSTANCE_SIGNATURE: the
+    event socket replays a recorded event log (one 'event>>data' line
+    each, e.g. captured with socat from .socket2.sock) to the first client,
+    the command socket answers 'ok' and logs every request. Exits `linger`
+    seconds after the last request.
+    """
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        print("❌ Error: set HYPRLAND_INSTANCE_SIGNATURE (and XDG_RUNTIME_DIR) for the stand-in sockets")
+        return 1
+    root = Path(os.environ.get("XDG_RUNTIME_DIR", "/tmp")) / "hypr" / signature
+    root.mkdir(parents=True, exist_ok=True)
+    recorded = [line.encode() + b'\n' for line in events_file.read_text().splitlines() if line]
+    
+    servers = {}
+    for name in (".socket.sock", ".socket2.sock"):
+        (root / name).unlink(missing_ok=True)
+        servers[name] = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        servers[name].bind(str(root / name))
+        servers[name].listen(16)
+    
+    requests = []
+    last_request = [time.monotonic()]
+    
+    def answer():
+        while True:
+            conn, _ = servers[".socket.sock"].accept()
+            with conn:
+                payload = conn.recv(65536)
+                requests.append(payload)
+                last_request[0] = time.monotonic()
+                conn.sendall(b'{"id": 1}' if payload == b"j/activeworkspace" else b'ok')
+    
+    threading.Thread(target=answer, daemon=True).start()
+    print(f"🔌 Stand-in Hyprland at {root}, waiting for a listener")
+    
+    client, _ = servers[".socket2.sock"].accept()
+    start = time.monotonic()
+    for line in recorded:
+        client.sendall(line)
+        if interval:
+            time.sleep(interval)
+    sent = time.monotonic() - start
+    
+    while time.monotonic() - max(last_request[0], start + sent) < linger:
+        time.sleep(0.05)
+    client.close()
+    
+    batches = [r for r in requests if r.startswith(b"[[BATCH]]")]
+    print(f"📼 {len(recorded)} events replayed in {sent * 1000:.0f} ms, "
+          f"{len(batches)} batch requests received")
+    if batches:
+        print(f"  last: {batches[-1].decode(errors='replace')}")
+    for name in servers:
+        (root / name).unlink(missing_ok=True)
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    """
+    ipclib.py kitty-colors THEME_FILE|--reset SOCKET...
+    
+    One set-colors request to every listed kitty socket from a single
+    process (the switcher's preview runs this on every cursor move).
+    """
+    if len(argv) < 2 or argv[0] != 'kitty-colors':
+        print("Usage: ipclib.py kitty-colors THEME_FILE|--reset SOCKET...", file=sys.stderr)
+        return 2
+    source, sockets = argv[1], argv[2:]
+    if source == '--reset':
+        payload = kitty_set_colors({}, reset=True)
+    else:
+        payload = kitty_set_colors(parse_kitty_colors(Path(source).read_text()))
+    return 0 if broadcast(sockets, payload) == len(sockets) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,203 @@
+"""
+Reload orchestration for generate-themes.py --reload: every target's
+reload strategy (restart, signal, hyprctl, kitty remote control) runs
+concurrently on asyncio with a per-attempt timeout and bounded retries.
+Imported by --reload only.
+
+    options = ReloadOptions(config_dir, kitty_socket_glob, 5.0, 2, 0.2)
+    results = asyncio.run(reload_targets(targets, options))
+    print_reload_report(results, elapsed)
+"""
+
+import asyncio
+import glob
+import os
+import shutil
+import signal
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+from themelib import Target
+
+# ============================================================================
+# DATA CLASSES
+# ============================================================================
+
+@dataclass
+class ReloadResult:
+    """Outcome of reloading one application after a theme switch"""
+    target: str
+    strategy: str
+    ok: bool
+    attempts: int
+    elapsed: float
+    detail: str = ''
+
+
+@dataclass
+class ReloadOptions:
+    """Where the deployed files are, and how hard to try"""
+    config_dir: Path        # deploy paths are relative to it
+    kitty_sockets: str      # glob of kitty remote-control sockets
+    timeout: float          # per attempt
+    retries: int
+    settle: float           # seconds a restarted daemon must stay up
+
+
+# ============================================================================
+# STRATEGIES
+# ============================================================================
+
+async def run_command(*argv: str, timeout: float) -> int:
+    """Run a command with its output discarded; kill it if it overruns"""
+    proc = await asyncio.create_subprocess_exec(
+        *argv, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+    try:
+        return await asyncio.wait_for(proc.wait(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+
+
+async def running_pids(binary: str) -> List[int]:
+    """PIDs of processes named binary"""
+    proc = await asyncio.create_subprocess_exec(
+        'pgrep', '-x', binary, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL)
+    out, _ = await proc.communicate()
+    return [int(pid) for pid in out.split()]
+
+
+async def reload_restart(binary: str, timeout: float, settle: float) -> str:
+    """
+    Restart a daemon that only reads its style at startup. The old instance
+    must be gone before the new one starts, and the new one is ready once
+    it has stayed up for settle seconds.
+    """
+    await run_command('pkill', '-x', binary, timeout=timeout)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while await running_pids(binary):
+        if loop.time() > deadline:
+            await run_command('pkill', '-KILL', '-x', binary, timeout=timeout)
+            break
+        await asyncio.sleep(0.02)
+    
+    proc = await asyncio.create_subprocess_exec(
+        binary, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL, start_new_session=True)
+    try:
+        code = await asyncio.wait_for(proc.wait(), settle)
+    except asyncio.TimeoutError:
+        return f"pid {proc.pid}"
+    raise RuntimeError(f"{binary} exited with status {code}")
+
+
+async def reload_signal(binary: str, signal_name: str, timeout: float) -> str:
+    """Ask running instances to re-read their config"""
+    code = await run_command('killall', f'-SIG{signal_name}', binary, timeout=timeout)
+    return 'signalled' if code == 0 else 'not running'
+
+
+async def reload_hyprctl(timeout: float) -> str:
+    """Reload Hyprland; the compositor is ready once hyprctl returns"""
+    code = await run_command('hyprctl', 'reload', timeout=timeout)
+    if code != 0:
+        raise RuntimeError(f"hyprctl exited with status {code}")
+    return 'reloaded'
+
+
+async def reload_kitty_remote(binary: str, colors_file: Path, sockets_glob: str, timeout: float) -> str:
+    """
+    Push the deployed colors to every kitty instance over its remote-control
+    socket, one set-colors call per instance, all in parallel. Instances
+    without a working socket fall back to SIGUSR1.
+    """
+    cli = ['kitten', '@'] if shutil.which('kitten') else ['kitty', '@']
+    sockets = sorted(glob.glob(sockets_glob))
+    
+    async def push(path: str) -> bool:
+        try:
+            return await run_command(*cli, '--to', f'unix:{path}', 'set-colors', '--all',
+                                     '--configured', str(colors_file), timeout=timeout) == 0
+        except asyncio.TimeoutError:
+            return False
+    
+    results = await asyncio.gather(*(push(path) for path in sockets))
+    pushed = {int(path.rsplit('-', 1)[-1]) for path, ok in zip(sockets, results)
+              if ok and path.rsplit('-', 1)[-1].isdigit()}
+    
+    signalled = 0
+    for pid in await running_pids(binary):
+        if pid not in pushed:
+            try:
+                os.kill(pid, signal.SIGUSR1)
+                signalled += 1
+            except OSError:
+                pass
+    return f"{len(pushed)} pushed, {signalled} signalled"
+
+
+# ============================================================================
+# ORCHESTRATION
+# ============================================================================
+
+async def reload_target(target: Target, options: ReloadOptions) -> ReloadResult:
+    """Run one target's reload strategy with a timeout and bounded retries"""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    strategy = target.reload
+    detail = ''
+    timeout, retries = options.timeout, options.retries
+    
+    for attempt in range(1, retries + 2):
+        try:
+            if strategy == 'restart':
+                detail = await reload_restart(target.requires, timeout, options.settle)
+            elif strategy.startswith('signal:'):
+                detail = await reload_signal(target.requires, strategy[len('signal:'):], timeout)
+            elif strategy == 'hyprctl':
+                detail = await reload_hyprctl(timeout)
+            elif strategy == 'kitty-remote':
+                detail = await reload_kitty_remote(target.requires, options.config_dir / target.deploy,
+                                                   options.kitty_sockets, timeout)
+            else:
+                return ReloadResult(target.name, strategy, False, attempt, 0.0,
+                                    f"unknown reload strategy '{strategy}'")
+            return ReloadResult(target.name, strategy, True, attempt, loop.time() - start, detail)
+        except asyncio.TimeoutError:
+            detail = f"timed out after {timeout:g}s"
+        except (OSError, RuntimeError) as e:
+            detail = str(e)
+        if attempt <= retries:
+            await asyncio.sleep(0.1 * attempt)
+    
+    return ReloadResult(target.name, strategy, False, retries + 1, loop.time() - start, detail)
+
+
+async def reload_targets(targets: List[Target], options: ReloadOptions) -> List[ReloadResult]:
+    """
+    Reload every target concurrently, once per (strategy, binary), and
+    return when all of them are ready or have given up. The total time is
+    that of the slowest reload rather than the sum.
+    """
+    seen = set()
+    pending = []
+    for target in targets:
+        key = (target.reload, target.requires)
+        if target.reload == 'none' or key in seen or not shutil.which(target.requires):
+            continue
+        seen.add(key)
+        pending.append(reload_target(target, options))
+    return list(await asyncio.gather(*pending))
+
+
+def print_reload_report(results: List[ReloadResult], elapsed: float) -> None:
+    """Per-application reload latency breakdown"""
+    for r in sorted(results, key=lambda r: r.elapsed, reverse=True):
+        mark = '✓' if r.ok else '❌'
+        retry = f", {r.attempts} attempts" if r.attempts > 1 else ''
+        print(f"  {mark} {r.target:<12} {r.strategy:<14} {r.elapsed * 1000:6.0f} ms  ({r.detail}{retry})")
+    print(f"  Σ {len(results)} reloads in {elapsed * 1000:.0f} ms")
@@ -0,0 +1,180 @@
+"""
+Schedule rules for the generator's light/dark scheduler: when each switch
+of schedule.json falls (clock times, or sunrise and sunset computed
+offline), dusk steps included, and a wait for the next one that sleeps
+through suspend. Imported by --schedule and --schedule-show only.
+
+    schedule = load_schedule(Path('schedule.json'))
+    for switch in schedule_switches(schedule, datetime.now().astimezone(), 4):
+        print(switch.when, switch.theme)
+"""
+
+import ctypes
+import errno
+import json
+import math
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# ============================================================================
+# RULES
+# ============================================================================
+
+@dataclass
+class ScheduledSwitch:
+    """
+    One switch of the schedule. Dusk transitions add intermediate switches
+    (step 1..steps-1) to interpolated palettes of the previous theme and
+    final, named <final>@<step>; the final switch has step 0.
+    """
+    when: datetime
+    theme: str
+    final: str
+    previous: Optional[str] = None
+    step: int = 0
+    steps: int = 0
+
+
+def sun_times(day: date, latitude: float, longitude: float) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Local sunrise and sunset on a day (NOAA approximation, about a minute
+    of error), computed offline. (None, None) during polar day or night.
+    """
+    gamma = 2 * math.pi / 365 * (day.timetuple().tm_yday - 1)
+    eqtime = 229.18 * (0.000075 + 0.001868 * math.cos(gamma) - 0.032077 * math.sin(gamma)
+                       - 0.014615 * math.cos(2 * gamma) - 0.040849 * math.sin(2 * gamma))
+    decl = (0.006918 - 0.399912 * math.cos(gamma) + 0.070257 * math.sin(gamma)
+            - 0.006758 * math.cos(2 * gamma) + 0.000907 * math.sin(2 * gamma)
+            - 0.002697 * math.cos(3 * gamma) + 0.00148 * math.sin(3 * gamma))
+    lat = math.radians(latitude)
+    cos_ha = (math.cos(math.radians(90.833)) / (math.cos(lat) * math.cos(decl))
+              - math.tan(lat) * math.tan(decl))
+    if not -1 <= cos_ha <= 1:
+        return None, None
+    
+    ha = math.degrees(math.acos(cos_ha))
+    midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    sunrise = midnight + timedelta(minutes=720 - 4 * (longitude + ha) - eqtime)
+    sunset = midnight + timedelta(minutes=720 - 4 * (longitude - ha) - eqtime)
+    return sunrise.astimezone(), sunset.astimezone()
+
+
+def rule_time(spec: str, day: date, schedule: Dict) -> Optional[datetime]:
+    """When a rule's 'at' (HH:MM, sunrise[+-MIN] or sunset[+-MIN]) falls on a local day"""
+    clock = re.fullmatch(r'(\d{1,2}):(\d{2})', spec)
+    if clock:
+        return datetime(day.year, day.month, day.day,
+                        int(clock.group(1)), int(clock.group(2))).astimezone()
+    
+    sun = re.fullmatch(r'(sunrise|sunset)([+-]\d+)?', spec)
+    sunrise, sunset = sun_times(day, schedule['latitude'], schedule['longitude'])
+    when = sunrise if sun.group(1) == 'sunrise' else sunset
+    if when is None:
+        return None
+    return when + timedelta(minutes=int(sun.group(2) or 0))
+
+
+def load_schedule(path: Path) -> Dict:
+    """Read and check schedule.json; raises FileNotFoundError or ValueError"""
+    try:
+        schedule = json.loads(path.read_text())
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in {path}: {e}") from None
+    
+    rules = schedule.get('rules') if isinstance(schedule, dict) else None
+    if not rules:
+        raise ValueError(f"{path} has no rules")
+    for rule in rules:
+        at = str(rule.get('at', ''))
+        if not rule.get('theme'):
+            raise ValueError(f"rule without a theme: {rule}")
+        if re.fullmatch(r'(sunrise|sunset)([+-]\d+)?', at):
+            if 'latitude' not in schedule or 'longitude' not in schedule:
+                raise ValueError(f"rule '{at}' needs latitude and longitude in {path}")
+        elif not re.fullmatch(r'([01]?\d|2[0-3]):[0-5]\d', at):
+            raise ValueError(f"rule time must be HH:MM, sunrise[+-MIN] or sunset[+-MIN]: '{at}'")
+    return schedule
+
+
+def schedule_switches(schedule: Dict, around: datetime, dusk_steps: int) -> List[ScheduledSwitch]:
+    """
+    Every switch from the day before `around` to the day after, in order,
+    dusk steps included. A dusk of N minutes spreads `steps` switches over
+    the N minutes before the rule's time, fading from the theme before it
+    (dusk_steps unless the rule sets its own 'steps').
+    """
+    finals = []
+    for offset in (-1, 0, 1):
+        day = around.date() + timedelta(days=offset)
+        for rule in schedule['rules']:
+            when = rule_time(str(rule['at']), day, schedule)
+            if when is not None:
+                finals.append((when, rule))
+    finals.sort(key=lambda item: item[0])
+    
+    switches = []
+    for i, (when, rule) in enumerate(finals):
+        theme = rule['theme']
+        previous = finals[i - 1][1]['theme'] if i else None
+        dusk = rule.get('dusk', 0)
+        steps = rule.get('steps', dusk_steps)
+        if dusk and previous and previous != theme and steps > 1:
+            for step in range(1, steps):
+                switches.append(ScheduledSwitch(
+                    when=when - timedelta(minutes=dusk * (steps - step) / steps),
+                    theme=f"{theme}@{step}", final=theme,
+                    previous=previous, step=step, steps=steps))
+        switches.append(ScheduledSwitch(when=when, theme=theme, final=theme, previous=previous,
+                                        steps=steps if dusk else 0))
+    return switches
+
+
+# ============================================================================
+# WAITING
+# ============================================================================
+
+def wait_until(when: datetime) -> bool:
+    """
+    Sleep until a wall-clock time without waking in between. A timerfd on
+    CLOCK_REALTIME keeps counting through suspend and is cancelled when the
+    clock is set, so this returns False when the schedule must be
+    recomputed and True once the time has come.
+    """
+    class Timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+    
+    class Itimerspec(ctypes.Structure):
+        _fields_ = [('it_interval', Timespec), ('it_value', Timespec)]
+    
+    CLOCK_REALTIME, TFD_CLOEXEC = 0, 0o2000000
+    TFD_TIMER_ABSTIME, TFD_TIMER_CANCEL_ON_SET = 1, 2
+    
+    deadline = when.timestamp()
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.timerfd_create(CLOCK_REALTIME, TFD_CLOEXEC)
+    except (OSError, AttributeError):
+        fd = -1
+    if fd < 0:
+        # No timerfd: one plain sleep, re-checked against the wall clock
+        time.sleep(max(0.0, deadline - time.time()))
+        return time.time() >= deadline
+    
+    try:
+        spec = Itimerspec(Timespec(0, 0), Timespec(int(deadline), int(deadline % 1 * 1e9)))
+        if libc.timerfd_settime(fd, TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET,
+                                ctypes.byref(spec), None) != 0:
+            raise OSError(ctypes.get_errno(), "timerfd_settime failed")
+        os.read(fd, 8)
+        return True
+    except OSError as e:
+        if e.errno == errno.ECANCELED:
+            return False
+        raise
+    finally:
+        os.close(fd)
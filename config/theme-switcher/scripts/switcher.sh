@@ -17,17 +17,80 @@ CURRENT_THEME_FILE="$THEME_SWITCHER_DIR/.current-theme"
 BACKUP_DIR="$THEME_SWITCHER_DIR/backups"
 MENU_THEME="$THEME_SWITCHER_DIR/theme-switcher-menu.rasi"
 LOG_FILE="$THEME_SWITCHER_DIR/.theme-switcher.log"
+GENERATOR="$THEME_SWITCHER_DIR/scripts/generate-themes.py"
+IPCLIB="$THEME_SWITCHER_DIR/scripts/ipclib.py"
+QUERY="$THEME_SWITCHER_DIR/scripts/theme-query.py"
+SWITCHER="$THEME_SWITCHER_DIR/scripts/switcher.sh"
 
-# Theme display name mappings
-declare -A THEME_DISPLAY_NAMES=(
-    ["catppuccin-mocha"]=" Catppuccin Mocha"
-    ["catppuccin-latte"]=" Catppuccin Latte"
-    ["rose-pine"]=" Rosé Pine"
-    ["nord"]=" Nord"
-    ["gruvbox"]=" Gruvbox"
-    ["tokyo-night"]=" Tokyo Night"
-    ["dracula"]=" Dracula"
-)
+# Target registry written by generate-themes.py: one line per application
+# with its theme file, deploy path, deploy mode, reload strategy and binary
+TARGET_REGISTRY="$THEME_SWITCHER_DIR/targets.tsv"
+
+# Role table of the applied theme, deployed by the roles target; get reads
+# it directly for the current theme
+DEPLOYED_ROLES="$THEME_SWITCHER_DIR/roles.tsv"
+
+# Targets deployed on every apply whatever --targets selects, so state that
+# describes the current theme (the role table behind get) never goes stale
+ALWAYS_TARGETS="roles"
+
+# Comma-separated target names (or binaries) to apply; empty means all
+SELECTED_TARGETS=""
+
+# Pre-rendered theme directory to apply as-is (apply --staged, used by the
+# scheduler) and whether to skip the notification (apply --quiet)
+STAGED_PATH=""
+QUIET=0
+
+# Running kitty instances listen here (kitty.conf: listen_on
+# unix:${XDG_RUNTIME_DIR}/kitty)
+KITTY_SOCKETS="${XDG_RUNTIME_DIR:-/run/user/$UID}/kitty-*"
+
+# Preview steps slower than this (microseconds) are logged
+PREVIEW_BUDGET_US=16000
+
+# Theme the open menu is previewing (removed when it closes); menu_preview
+# keeps its latest-wins slot and lock next to it
+MENU_PREVIEW="$THEME_SWITCHER_DIR/.menu-preview"
+
+# Whether rofi supports -on-selection-changed (1.7.6+): 1 or 0, checked
+# again only when the rofi binary is newer than this file
+ROFI_HOOK_CACHE="$THEME_SWITCHER_DIR/.rofi-selection-hook"
+
+# Overlapping switches are coalesced: the process holding SWITCH_LOCK
+# applies requests from the latest-wins SWITCH_PENDING slot until it is empty
+SWITCH_LOCK="$THEME_SWITCHER_DIR/.switch.lock"
+SWITCH_PENDING="$THEME_SWITCHER_DIR/.switch-pending"
+
+# Exit status of apply when the request was handed to the running switch
+# instead of applied (it wins unless a later request replaces it)
+SWITCH_QUEUED_STATUS=3
+
+# What apply deployed, per target: path, size, mtime, sha256 and theme,
+# plus a snapshot of each file for diffs (see status/verify)
+DEPLOY_MANIFEST="$THEME_SWITCHER_DIR/.deploy-manifest.tsv"
+DEPLOY_SNAPSHOTS="$THEME_SWITCHER_DIR/.deployed"
+
+# Cross-fade kitty and Hyprland borders over this many 60 fps frames before
+# applying; 0 is an instant switch (apply --transition turns it on once)
+TRANSITION_FRAMES="${THEME_TRANSITION_FRAMES:-0}"
+
+# Themes without a pre-generated directory are rendered on demand into
+# this LRU cache; THEME_CACHE_SIZE bounds how many stay rendered
+THEME_CACHE_DIR="${XDG_CACHE_HOME:-$HOME/.cache}/theme-switcher/themes"
+THEME_CACHE_SIZE="${THEME_CACHE_SIZE:-8}"
+
+# The scheduler's pre-rendered switches; intermediate dusk steps are named
+# FINAL@STEP and only exist here
+STAGE_DIR="${XDG_CACHE_HOME:-$HOME/.cache}/theme-switcher/staged"
+
+# Optional single-file bundle of rendered themes (generate-themes.py
+# --bundle); themes found in it are sliced out instead of rendered
+THEME_BUNDLE="$THEME_SWITCHER_DIR/themes.bundle"
+
+# Precomputed menu written by generate-themes.py:
+# "Display Name<TAB>slug<TAB>" plus rofi icon metadata for the palette swatch
+MENU_CACHE="$THEME_SWITCHER_DIR/menu.tsv"
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -59,72 +122,143 @@ ensure_directories() {
 
 # Get current theme (with fallback)
 get_current_theme() {
-    if [[ -f "$CURRENT_THEME_FILE" ]]; then
-        cat "$CURRENT_THEME_FILE"
-    else
-        echo "catppuccin-mocha"
+    local theme=""
+    [[ -f "$CURRENT_THEME_FILE" ]] && read -r theme < "$CURRENT_THEME_FILE"
+    echo "${theme:-catppuccin-mocha}"
+}
+
+# Regenerate the menu cache when palettes or variants.json were added,
+# removed or edited (mtimes are compared with test builtins, no forks)
+ensure_menu_cache() {
+    if [[ -f "$MENU_CACHE" && ! "$PALETTES_DIR" -nt "$MENU_CACHE" &&
+          ! "$THEME_SWITCHER_DIR/variants.json" -nt "$MENU_CACHE" ]]; then
+        return 0
     fi
+    python3 "$GENERATOR" --refresh-caches &>/dev/null || true
+    [[ -f "$MENU_CACHE" ]]
 }
 
-# Format theme name for display
+# Format theme name for display (palette "name" field from the menu cache;
+# a dusk step FINAL@STEP shows as the final theme's name and its step)
 format_theme_name() {
     local theme=$1
-    echo "${THEME_DISPLAY_NAMES[$theme]:-$theme}"
-}
-
-# Reverse lookup: display name to theme slug
-get_theme_slug() {
-    local display_name=$1
+    local name slug
     
-    for slug in "${!THEME_DISPLAY_NAMES[@]}"; do
-        if [[ "${THEME_DISPLAY_NAMES[$slug]}" == "$display_name" ]]; then
-            echo "$slug"
-            return 0
-        fi
-    done
+    if [[ "$theme" == *@* ]]; then
+        echo "$(format_theme_name "${theme%@*}") (dusk step ${theme##*@})"
+        return 0
+    fi
     
-    # Fallback: convert display name to slug
-    echo "$display_name" | sed 's/^[^ ]* //' | tr '[:upper:]' '[:lower:]' | tr ' ' '-'
+    if [[ -f "$MENU_CACHE" ]]; then
+        while IFS=$'\t' read -r name slug _; do
+            if [[ "$slug" == "$theme" ]]; then
+                echo "$name"
+                return 0
+            fi
+        done < "$MENU_CACHE"
+    fi
+    echo "$theme"
 }
 
-# Get list of available themes by scanning themes directory
+# Get list of available themes: pre-generated themes plus palettes that
+# can be rendered on demand
 get_available_themes() {
-    if [[ ! -d "$THEMES_DIR" ]]; then
+    if [[ ! -d "$THEMES_DIR" && ! -d "$PALETTES_DIR" ]]; then
         error "Themes directory not found: $THEMES_DIR"
         return 1
     fi
     
-    find "$THEMES_DIR" -mindepth 1 -maxdepth 1 -type d -printf "%f\n" | sort
+    {
+        find "$THEMES_DIR" -mindepth 1 -maxdepth 1 -type d -printf "%f\n"
+        find "$PALETTES_DIR" -mindepth 1 -maxdepth 1 -name "*.json" -printf "%f\n" | sed 's/\.json$//'
+    } | sort -u
+}
+
+# Print the directory holding a theme's files, rendering it into the
+# theme cache first if it was never pre-generated (derived variants such
+# as nord-oled have no palette file, only a menu entry)
+resolve_theme_path() {
+    local theme=$1
+    
+    if [[ -d "$THEMES_DIR/$theme" ]]; then
+        echo "$THEMES_DIR/$theme"
+        return 0
+    fi
+    
+    if [[ "$theme" == *@* ]]; then
+        if [[ -d "$STAGE_DIR/$theme" ]]; then
+            echo "$STAGE_DIR/$theme"
+            return 0
+        fi
+        error "Dusk step '$theme' is no longer staged (see generate-themes.py --schedule)"
+        return 1
+    fi
+    
+    if [[ ! -f "$PALETTES_DIR/$theme.json" && ! -f "$THEME_BUNDLE" ]] &&
+       ! grep -qF $'\t'"$theme"$'\t' "$MENU_CACHE" 2>/dev/null; then
+        error "Theme '$theme' not found in $THEMES_DIR or $PALETTES_DIR"
+        return 1
+    fi
+    
+    log "Rendering theme on demand: $theme"
+    if ! python3 "$GENERATOR" --ensure "$theme" --cache-size "$THEME_CACHE_SIZE" &>/dev/null; then
+        error "Failed to render theme: $theme"
+        return 1
+    fi
+    
+    echo "$THEME_CACHE_DIR/$theme"
 }
 
 # Validate theme exists
 validate_theme() {
     local theme=$1
-    local theme_path="$THEMES_DIR/$theme"
+    local theme_path=$2
     
     if [[ ! -d "$theme_path" ]]; then
         error "Theme '$theme' not found at: $theme_path"
         return 1
     fi
     
-    # Check for required files
-    local required_files=(
-        "waybar.css"
-        "rofi.rasi"
-        "kitty-theme.conf"
-    )
-    
-    for file in "${required_files[@]}"; do
+    # Check that every target we are about to apply has its file
+    local name file deploy mode reload requires
+    while IFS=$'\t' read -r name file deploy mode reload requires; do
         if [[ ! -f "$theme_path/$file" ]]; then
             error "Missing required file: $file in theme '$theme'"
             return 1
         fi
-    done
+    done < <(selected_targets)
     
     return 0
 }
 
-# Create backup of current configs
+# Print registry lines for targets that are selected and whose application
+# is installed; targets for missing applications are skipped entirely
+selected_targets() {
+    if [[ ! -f "$TARGET_REGISTRY" ]]; then
+        error "Target registry not found: $TARGET_REGISTRY (run generate-themes.py)"
+        return 1
+    fi
+    
+    local name file deploy mode reload requires
+    while IFS=$'\t' read -r name file deploy mode reload requires; do
+        [[ -z "$name" || "$name" == \#* ]] && continue
+        
+        if [[ -n "$SELECTED_TARGETS" && ",$SELECTED_TARGETS," != *",$name,"* \
+              && ",$SELECTED_TARGETS," != *",$requires,"* \
+              && ",$ALWAYS_TARGETS," != *",$name,"* ]]; then
+            continue
+        fi
+        
+        if ! command_exists "$requires"; then
+            log "Skipping $name: $requires not installed"
+            continue
+        fi
+        
+        printf '%s\t%s\t%s\t%s\t%s\t%s\n' "$name" "$file" "$deploy" "$mode" "$reload" "$requires"
+    done < "$TARGET_REGISTRY"
+}
+
+# Create backup of the configs the selected targets will overwrite
 backup_configs() {
     local timestamp=$(date +%Y%m%d_%H%M%S)
     local backup_path="$BACKUP_DIR/backup_$timestamp"
@@ -132,11 +266,10 @@ backup_configs() {
     log "Creating backup at: $backup_path"
     mkdir -p "$backup_path"
     
-    # Backup important config files
-    [[ -f "$CONFIG_DIR/waybar/style.css" ]] && cp "$CONFIG_DIR/waybar/style.css" "$backup_path/"
-    [[ -f "$CONFIG_DIR/kitty/theme.conf" ]] && cp "$CONFIG_DIR/kitty/theme.conf" "$backup_path/"
-    [[ -f "$CONFIG_DIR/alacritty/alacritty.toml" ]] && cp "$CONFIG_DIR/alacritty/alacritty.toml" "$backup_path/"
-    [[ -f "$CONFIG_DIR/rofi/powermenu.rasi" ]] && cp "$CONFIG_DIR/rofi/powermenu.rasi" "$backup_path/"
+    local name file deploy mode reload requires
+    while IFS=$'\t' read -r name file deploy mode reload requires; do
+        [[ -f "$CONFIG_DIR/$deploy" ]] && cp "$CONFIG_DIR/$deploy" "$backup_path/$name-${deploy##*/}"
+    done < <(selected_targets)
     
     # Keep only last 5 backups
     ls -dt "$BACKUP_DIR"/backup_* | tail -n +6 | xargs -r rm -rf
@@ -145,96 +278,68 @@ backup_configs() {
 }
 
 # ============================================================================
-# THEME APPLICATION
+# DEPLOY STRATEGIES (deploy_mode column of targets.tsv)
 # ============================================================================
 
-apply_waybar() {
-    local theme_path=$1
-    [[ -f "$theme_path/waybar.css" ]] || return 1
+# Copy into a temp file next to the destination and rename it into place,
+# so applications reading the file mid-switch (e.g. starship rendering a
+# prompt) never see it half-written
+deploy_copy() {
+    local src=$1 dest=$2 tmp
     
-    cp "$theme_path/waybar.css" "$CONFIG_DIR/waybar/style.css"
-    
-    # Reload waybar
-    if command_exists waybar; then
-        pkill waybar 2>/dev/null || true
-        waybar &>/dev/null &
-        disown
-    fi
-}
-
-apply_swaync() {
-    local theme_path=$1
-    [[ -f "$theme_path/swaync.css" ]] || return 1
-    
-    cp "$theme_path/swaync.css" "$CONFIG_DIR/swaync/style.css"
-    
-    # Reload swaync
-    if command_exists swaync; then
-        pkill swaync 2>/dev/null || true
-        swaync &>/dev/null &
-        disown
-    fi
-}
-
-apply_rofi() {
-    local theme_path=$1
-    [[ -f "$theme_path/rofi.rasi" ]] || return 1
-    
-    mkdir -p "$CONFIG_DIR/rofi"
-    cp "$theme_path/rofi.rasi" "$CONFIG_DIR/rofi/powermenu.rasi"
-    
-    # Also update theme switcher menu
-    [[ -f "$theme_path/theme-switcher-menu.rasi" ]] && \
-        cp "$theme_path/theme-switcher-menu.rasi" "$THEME_SWITCHER_DIR/theme-switcher-menu.rasi"
-    
-    # Update rofi launcher colors (adi1090x style)
-    if [[ -f "$theme_path/rofi-launcher-colors.rasi" ]]; then
-        mkdir -p "$CONFIG_DIR/rofi/launchers/type-2/shared"
-        cp "$theme_path/rofi-launcher-colors.rasi" "$CONFIG_DIR/rofi/launchers/type-2/shared/colors.rasi"
+    mkdir -p "$(dirname "$dest")"
+    tmp=$(mktemp "$dest.XXXXXX") || return 1
+    if ! cp "$src" "$tmp" || ! chmod 644 "$tmp" || ! mv -f "$tmp" "$dest"; then
+        rm -f "$tmp"
+        return 1
     fi
 }
 
-apply_alacritty() {
-    local theme_path=$1
-    [[ -f "$theme_path/alacritty-theme.toml" ]] || return 1
-    
-    local config_file="$CONFIG_DIR/alacritty/alacritty.toml"
+deploy_alacritty() {
+    local src=$1 dest=$2
     
-    if [[ -f "$config_file" ]]; then
-        # Remove existing color configuration
-        grep -v "^\[colors" "$config_file" | \
-        grep -v "^background\|^foreground\|^text\|^cursor\|^black\|^red\|^green\|^yellow\|^blue\|^magenta\|^cyan\|^white" \
-        > /tmp/alacritty_base.toml
-        
-        # Combine base config with new theme
-        cat /tmp/alacritty_base.toml "$theme_path/alacritty-theme.toml" > "$config_file"
-        rm /tmp/alacritty_base.toml
+    if [[ -f "$dest" ]]; then
+        # Remove existing color configuration and combine the base config
+        # with the new theme in a private temp file next to the config
+        local tmp
+        tmp=$(mktemp "$dest.XXXXXX") || return 1
+        {
+            grep -v "^\[colors" "$dest" | \
+            grep -v "^background\|^foreground\|^text\|^cursor\|^black\|^red\|^green\|^yellow\|^blue\|^magenta\|^cyan\|^white"
+            cat "$src"
+        } > "$tmp"
+        if ! chmod 644 "$tmp" || ! mv -f "$tmp" "$dest"; then
+            rm -f "$tmp"
+            return 1
+        fi
     else
         # Just copy theme if config doesn't exist
-        mkdir -p "$CONFIG_DIR/alacritty"
-        cp "$theme_path/alacritty-theme.toml" "$config_file"
+        deploy_copy "$src" "$dest"
     fi
 }
 
-apply_kitty() {
-    local theme_path=$1
-    [[ -f "$theme_path/kitty-theme.conf" ]] || return 1
+# The cached shell init (.zshrc sources only that file) carries the shell
+# colors, so rebuild it from the freshly deployed ones
+deploy_shell_init() {
+    local src=$1 dest=$2
     
-    mkdir -p "$CONFIG_DIR/kitty"
-    cp "$theme_path/kitty-theme.conf" "$CONFIG_DIR/kitty/theme.conf"
+    deploy_copy "$src" "$dest" || return 1
+    python3 "$GENERATOR" --shell-init >/dev/null
+}
+
+# The pre-blurred lock background is tinted with the deployed hyprlock
+# colors; rebuild it (and the config pointing hyprlock at it) with them
+deploy_lock_background() {
+    local src=$1 dest=$2
     
-    # Reload kitty instances
-    if command_exists kitty; then
-        killall -SIGUSR1 kitty 2>/dev/null || true
-    fi
+    deploy_copy "$src" "$dest" || return 1
+    python3 "$GENERATOR" --lock-background >/dev/null
 }
 
-apply_btop() {
-    local theme_path=$1
-    [[ -f "$theme_path/btop.theme" ]] || return 1
+deploy_btop() {
+    local src=$1 dest=$2
     
-    mkdir -p "$CONFIG_DIR/btop/themes"
-    cp "$theme_path/btop.theme" "$CONFIG_DIR/btop/themes/current.theme"
+    deploy_copy "$src" "$dest"
     
     # Update btop config to use current theme
     if [[ -f "$CONFIG_DIR/btop/btop.conf" ]]; then
@@ -242,45 +347,75 @@ apply_btop() {
     fi
 }
 
-apply_cava() {
-    local theme_path=$1
-    [[ -f "$theme_path/cava" ]] || return 1
-    
-    mkdir -p "$CONFIG_DIR/cava"
-    cp "$theme_path/cava" "$CONFIG_DIR/cava/config"
-}
+# ============================================================================
+# RELOADS (reload column of targets.tsv)
+# ============================================================================
 
-apply_starship() {
-    local theme_path=$1
-    [[ -f "$theme_path/starship-palette.toml" ]] || return 1
+# Reload the running applications of the given targets. The generator's
+# asyncio orchestrator runs every reload concurrently, each with a timeout
+# and bounded retries, and returns once all applications are ready; its
+# per-application latency breakdown goes to the log.
+reload_targets() {
+    local names=$1 report status=0
+    
+    report=$(python3 "$GENERATOR" --reload --targets "$names" 2>&1) || status=$?
+    log "Reloads:"$'\n'"$report"
     
-    mkdir -p "$CONFIG_DIR/starship"
-    cp "$theme_path/starship-palette.toml" "$CONFIG_DIR/starship/palette.toml"
+    if (( status != 0 )); then
+        APPLY_FAILED=$((APPLY_FAILED + $(grep -c '❌' <<< "$report" || true)))
+    fi
 }
 
-apply_hyprland_colors() {
+# ============================================================================
+# THEME APPLICATION
+# ============================================================================
+
+# Deploy every selected target, then run each distinct reload once.
+# Sets APPLY_FAILED to the number of targets that failed.
+apply_targets() {
     local theme_path=$1
-    [[ -f "$theme_path/hyprland-colors.conf" ]] || return 1
+    local -a reloads=()
+    APPLY_FAILED=0
+    DEPLOYED=()
     
-    mkdir -p "$CONFIG_DIR/hypr"
-    cp "$theme_path/hyprland-colors.conf" "$CONFIG_DIR/hypr/colors.conf"
-}
-
-apply_hyprland() {
-    if command_exists hyprctl; then
-        hyprctl reload &>/dev/null || true
+    local name file deploy mode reload requires
+    while IFS=$'\t' read -r name file deploy mode reload requires; do
+        # A newer switch was requested: leave deploying and reloading to it
+        superseded && return 1
+        
+        if ! "deploy_${mode//-/_}" "$theme_path/$file" "$CONFIG_DIR/$deploy"; then
+            error "Failed to apply $name theme"
+            APPLY_FAILED=$((APPLY_FAILED + 1))
+            continue
+        fi
+        
+        DEPLOYED+=("$name"$'\t'"$deploy")
+        [[ "$reload" != "none" ]] && reloads+=("$name")
+    done < <(selected_targets)
+    
+    superseded && return 1
+    
+    if (( ${#reloads[@]} > 0 )); then
+        reload_targets "$(IFS=,; echo "${reloads[*]}")"
     fi
 }
 
 # Main theme application function
 apply_theme() {
     local theme=$1
-    local theme_path="$THEMES_DIR/$theme"
+    local shown=${2:-$(get_current_theme)}
+    local theme_path
     
     log "Applying theme: $theme"
     
-    # Validate theme
-    if ! validate_theme "$theme"; then
+    # Locate (or render) and validate theme; staged themes are already rendered
+    if [[ -n "$STAGED_PATH" ]]; then
+        theme_path=$STAGED_PATH
+    elif ! theme_path=$(resolve_theme_path "$theme"); then
+        error "Theme validation failed: $theme"
+        return 1
+    fi
+    if ! validate_theme "$theme" "$theme_path"; then
         error "Theme validation failed: $theme"
         return 1
     fi
@@ -288,98 +423,497 @@ apply_theme() {
     # Create backup before applying
     backup_configs
     
-    # Apply to each application
-    local failed=0
-    
-    apply_waybar "$theme_path" || { error "Failed to apply waybar theme"; ((failed++)); }
-    apply_swaync "$theme_path" || { error "Failed to apply swaync theme"; ((failed++)); }
-    apply_rofi "$theme_path" || { error "Failed to apply rofi theme"; ((failed++)); }
-    apply_alacritty "$theme_path" || { error "Failed to apply alacritty theme"; ((failed++)); }
-    apply_kitty "$theme_path" || { error "Failed to apply kitty theme"; ((failed++)); }
-    apply_btop "$theme_path" || { error "Failed to apply btop theme"; ((failed++)); }
-    apply_cava "$theme_path" || { error "Failed to apply cava theme"; ((failed++)); }
-    apply_starship "$theme_path" || { error "Failed to apply starship theme"; ((failed++)); }
-    apply_hyprland_colors "$theme_path" || { error "Failed to apply hyprland colors"; ((failed++)); }
+    # Animate from what is on screen, then commit the final state below
+    superseded || transition_theme "$shown" "$theme"
     
-    # Reload window manager
-    apply_hyprland
+    # Apply to each application and reload them
+    if ! apply_targets "$theme_path"; then
+        log "Switch to $theme superseded by a newer request"
+        return 2
+    fi
+    local failed=$APPLY_FAILED
     
-    # Save current theme
+    # Save current theme and what was deployed for it
     echo "$theme" > "$CURRENT_THEME_FILE"
+    record_deployment "$theme" "${DEPLOYED[@]}"
     
     # Show notification
     local theme_display=$(format_theme_name "$theme")
     if [[ $failed -eq 0 ]]; then
-        notify-send "Theme Applied" "$theme_display is now active" -i preferences-desktop-theme
+        (( QUIET )) || notify-send "Theme Applied" "$theme_display is now active" -i preferences-desktop-theme
         success "Successfully applied theme: $theme"
     else
-        notify-send "Theme Partially Applied" "$theme_display applied with $failed errors" -u normal -i dialog-warning
+        (( QUIET )) || notify-send "Theme Partially Applied" "$theme_display applied with $failed errors" -u normal -i dialog-warning
         error "Theme applied with $failed errors: $theme"
     fi
 }
 
+# A newer switch request is waiting in the pending slot
+superseded() {
+    [[ -e "$SWITCH_PENDING" ]]
+}
+
+# Ask for a switch. The request replaces whatever is pending (latest wins);
+# if another switch is running it picks the request up, aborting its own
+# remaining work, so a burst of requests costs one full apply. Returns
+# SWITCH_QUEUED_STATUS when the request was left to that other switch.
+request_switch() {
+    local theme=$1 shown=${2:-} took=0
+    
+    printf '%s\n' "$theme" "$SELECTED_TARGETS" "$TRANSITION_FRAMES" "$STAGED_PATH" "$QUIET" \
+        > "$SWITCH_PENDING.$$"
+    mv "$SWITCH_PENDING.$$" "$SWITCH_PENDING"
+    
+    local lock_fd status=0 targets frames staged quiet
+    exec {lock_fd}> "$SWITCH_LOCK"
+    
+    # Re-check after unlocking: a request written while the previous owner
+    # was finishing would otherwise be left behind
+    while superseded; do
+        if ! flock -n "$lock_fd"; then
+            log "Queued theme: $theme (another switch is in progress)"
+            break
+        fi
+        
+        while [[ -e "$SWITCH_PENDING" ]] && mv "$SWITCH_PENDING" "$SWITCH_PENDING.taken" 2>/dev/null; do
+            { read -r theme; read -r targets; read -r frames; read -r staged; read -r quiet; } \
+                < "$SWITCH_PENDING.taken"
+            rm -f "$SWITCH_PENDING.taken"
+            took=1
+            SELECTED_TARGETS=$targets TRANSITION_FRAMES=${frames:-0}
+            STAGED_PATH=$staged QUIET=${quiet:-0}
+            
+            status=0
+            apply_theme "$theme" "$shown" || status=$?
+            shown=""
+        done
+        
+        flock -u "$lock_fd"
+    done
+    
+    exec {lock_fd}>&-
+    (( took )) || return "$SWITCH_QUEUED_STATUS"
+    (( status == 2 )) && status=0
+    return "$status"
+}
+
+# ============================================================================
+# DRIFT DETECTION
+# ============================================================================
+
+# Record the deployed files of the given "name<TAB>deploy" targets in the
+# manifest, keeping the entries of targets this apply did not touch. All
+# files are stat'ed and hashed in one call each.
+record_deployment() {
+    local theme=$1
+    shift
+    (( $# > 0 )) || return 0
+    
+    local -A entries=()
+    local name deploy size mtime hash from
+    if [[ -f "$DEPLOY_MANIFEST" ]]; then
+        while IFS=$'\t' read -r name deploy size mtime hash from; do
+            [[ "$name" == \#* ]] && continue
+            entries[$name]="$name"$'\t'"$deploy"$'\t'"$size"$'\t'"$mtime"$'\t'"$hash"$'\t'"$from"
+        done < "$DEPLOY_MANIFEST"
+    fi
+    
+    local -a names=() paths=() stats=() hashes=()
+    local entry i
+    mkdir -p "$DEPLOY_SNAPSHOTS"
+    for entry in "$@"; do
+        names+=("${entry%%$'\t'*}")
+        paths+=("$CONFIG_DIR/${entry#*$'\t'}")
+        cp "${paths[-1]}" "$DEPLOY_SNAPSHOTS/${names[-1]}"
+    done
+    mapfile -t stats < <(stat -c '%s %.9Y' "${paths[@]}")
+    mapfile -t hashes < <(sha256sum "${paths[@]}")
+    
+    for i in "${!names[@]}"; do
+        entries[${names[$i]}]="${names[$i]}"$'\t'"${paths[$i]#"$CONFIG_DIR/"}"$'\t'"${stats[$i]% *}"$'\t'"${stats[$i]#* }"$'\t'"${hashes[$i]%% *}"$'\t'"$theme"
+    done
+    
+    {
+        printf '# name\tdeploy\tsize\tmtime\tsha256\ttheme\n'
+        printf '%s\n' "${entries[@]}"
+    } > "$DEPLOY_MANIFEST.$$"
+    mv "$DEPLOY_MANIFEST.$$" "$DEPLOY_MANIFEST"
+}
+
+# Compare the deployed files of every installed target with the manifest.
+# Files whose size and mtime still match are trusted without reading them;
+# only the others are hashed. Drifted target names end up in DRIFTED.
+check_drift() {
+    local show_diff=${1:-0}
+    local current=$(get_current_theme)
+    DRIFTED=()
+    
+    local -A entries=()
+    local name deploy size mtime hash from
+    if [[ -f "$DEPLOY_MANIFEST" ]]; then
+        while IFS=$'\t' read -r name deploy size mtime hash from; do
+            [[ "$name" == \#* ]] && continue
+            entries[$name]="$size $mtime $hash $from"
+        done < "$DEPLOY_MANIFEST"
+    fi
+    
+    # One stat call for every deployed file (missing files are omitted)
+    local -a rows=() paths=()
+    local -A stats=()
+    local entry file mode reload requires path rest
+    mapfile -t rows < <(selected_targets)
+    for entry in "${rows[@]}"; do
+        IFS=$'\t' read -r name file deploy mode reload requires <<< "$entry"
+        paths+=("$CONFIG_DIR/$deploy")
+    done
+    while IFS=$'\t' read -r path rest; do
+        stats[$path]=$rest
+    done < <(stat -c $'%n\t%s %.9Y' "${paths[@]}" 2>/dev/null)
+    
+    echo "Theme: $(format_theme_name "$current") ($current)"
+    local state expected
+    for entry in "${rows[@]}"; do
+        IFS=$'\t' read -r name file deploy mode reload requires <<< "$entry"
+        path="$CONFIG_DIR/$deploy"
+        state=ok
+        
+        if [[ -z "${entries[$name]:-}" ]]; then
+            state="untracked"
+        elif [[ -z "${stats[$path]:-}" ]]; then
+            state="missing"
+        else
+            read -r size mtime hash from <<< "${entries[$name]}"
+            if [[ "$from" != "$current" ]]; then
+                state="stale ($from)"
+            elif [[ "${stats[$path]}" != "$size $mtime" ]]; then
+                expected=$(sha256sum "$path")
+                [[ "${expected%% *}" == "$hash" ]] || state="modified"
+            fi
+        fi
+        
+        if [[ "$state" == ok ]]; then
+            printf '  ✓ %-14s %s\n' "$name" "$deploy"
+            continue
+        fi
+        
+        printf '  ✗ %-14s %-44s %s\n' "$name" "$deploy" "$state"
+        DRIFTED+=("$name")
+        
+        if (( show_diff )) && [[ "$state" == modified && -f "$DEPLOY_SNAPSHOTS/$name" ]]; then
+            diff -u --label "$deploy (as deployed)" --label "$deploy" \
+                "$DEPLOY_SNAPSHOTS/$name" "$path" | sed 's/^/      /' || true
+        fi
+    done
+}
+
+# status/verify [--diff] [--fix]: report drift; --fix re-applies only the
+# drifted targets. verify exits non-zero while anything has drifted.
+show_status() {
+    local command=$1
+    shift
+    local show_diff=0 fix=0
+    while [[ $# -gt 0 ]]; do
+        case "$1" in
+            --diff) show_diff=1 ;;
+            --fix)  fix=1 ;;
+            *)      error "Unknown option: $1"; return 1 ;;
+        esac
+        shift
+    done
+    
+    check_drift "$show_diff"
+    
+    if (( ${#DRIFTED[@]} == 0 )); then
+        echo "All targets match the deployed theme"
+        return 0
+    fi
+    echo "${#DRIFTED[@]} targets drifted"
+    
+    if (( fix )); then
+        SELECTED_TARGETS=$(IFS=,; echo "${DRIFTED[*]}")
+        request_switch "$(get_current_theme)"
+        return
+    fi
+    
+    [[ "$command" == verify ]] && return 1
+    return 0
+}
+
+# ============================================================================
+# LIVE PREVIEW (IPC only, nothing is written to disk)
+# ============================================================================
+
+# Send one set-colors request (a kitty theme file, or --reset) to every
+# running kitty instance; a single process talks to all the sockets
+kitty_set_colors() {
+    local source=$1 socket
+    local -a sockets=()
+    for socket in $KITTY_SOCKETS; do
+        [[ -S "$socket" ]] && sockets+=("$socket")
+    done
+    (( ${#sockets[@]} )) || return 0
+    
+    python3 "$IPCLIB" kitty-colors "$source" "${sockets[@]}" &>/dev/null || true
+}
+
+# Push the border and shadow variables of a generated hyprland-colors.conf
+# to the running compositor in one batched IPC call
+hyprland_push_colors() {
+    local colors_file=$1
+    [[ -f "$colors_file" ]] && command_exists hyprctl || return 0
+    
+    local key _ value
+    local -A vars=()
+    while read -r key _ value; do
+        [[ "$key" == \$* ]] && vars["$key"]=$value
+    done < "$colors_file"
+    
+    hyprctl --batch "keyword general:col.active_border ${vars[\$active_border]:-} ;\
+ keyword general:col.inactive_border ${vars[\$inactive_border]:-} ;\
+ keyword decoration:shadow:color ${vars[\$shadow_active]:-} ;\
+ keyword decoration:shadow:color_inactive ${vars[\$shadow_inactive]:-}" &>/dev/null || true
+}
+
+# Recolor the cheap targets (kitty, Hyprland borders) to a theme. Only
+# themes already on disk are previewed: rendering one on demand would
+# stall the cursor, so a cache miss just shows nothing
+preview_theme() {
+    local theme=$1
+    local theme_path start=$EPOCHREALTIME
+    
+    if [[ -d "$THEMES_DIR/$theme" ]]; then
+        theme_path="$THEMES_DIR/$theme"
+    elif [[ -d "$THEME_CACHE_DIR/$theme" ]]; then
+        theme_path="$THEME_CACHE_DIR/$theme"
+    else
+        return 0
+    fi
+    
+    kitty_set_colors "$theme_path/kitty-theme.conf" &
+    hyprland_push_colors "$theme_path/hyprland-colors.conf" &
+    wait
+    
+    local elapsed=$(( ${EPOCHREALTIME/./} - ${start/./} ))
+    if (( elapsed > PREVIEW_BUDGET_US )); then
+        log "Preview of $theme took $((elapsed / 1000)) ms"
+    fi
+}
+
+# Cross-fade kitty and Hyprland borders between two themes. The frames are
+# computed and pushed by the generator, which talks to the sockets directly
+# (one hyprctl/kitten process per frame cannot hold 60 fps). Dusk steps are
+# a fade of their own and have no palette to interpolate from.
+transition_theme() {
+    local from=$1 to=$2
+    (( TRANSITION_FRAMES > 0 )) && [[ -n "$from" && "$from" != "$to" ]] || return 0
+    [[ "$from" != *@* && "$to" != *@* ]] || return 0
+    
+    python3 "$GENERATOR" --transition "$from" -t "$to" --frames "$TRANSITION_FRAMES" \
+        ${SELECTED_TARGETS:+--targets "$SELECTED_TARGETS"} &>/dev/null \
+        || log "Transition from $from to $to failed"
+}
+
+# Restore what is deployed on disk: kitty resets to its configured colors,
+# Hyprland gets the deployed colors.conf values back
+revert_preview() {
+    kitty_set_colors --reset &
+    hyprland_push_colors "$CONFIG_DIR/hypr/colors.conf" &
+    wait
+}
+
 # ============================================================================
 # THEME MENU
 # ============================================================================
 
+# Called by rofi (-on-selection-changed) with the highlighted entry, which
+# arrives as the raw menu line (name, tab, slug) or just its display name,
+# possibly split into words. Hooks are spawned without waiting, so a burst
+# of moves is coalesced: each records the wanted slug and, under the preview
+# lock, only the latest one is previewed. Nothing happens once the menu closed.
+menu_preview() {
+    local entry=${*//$'\t'/ } name slug wanted="" shown lock_fd
+    entry=${entry%"${entry##*[! ]}"}
+    
+    while IFS=$'\t' read -r name slug _; do
+        if [[ "$entry" == "$name $slug" || "$entry" == "$name" || "$entry" == "$slug" ]]; then
+            wanted=$slug
+            break
+        fi
+    done < "$MENU_CACHE"
+    [[ -n "$wanted" && -f "$MENU_PREVIEW" ]] || return 0
+    echo "$wanted" > "$MENU_PREVIEW.want"
+    
+    exec {lock_fd}> "$MENU_PREVIEW.lock"
+    flock "$lock_fd"
+    if [[ -f "$MENU_PREVIEW" ]]; then
+        wanted=$(<"$MENU_PREVIEW.want")
+        shown=$(<"$MENU_PREVIEW")
+        if [[ "$wanted" != "$shown" ]] && preview_theme "$wanted"; then
+            echo "$wanted" > "$MENU_PREVIEW"
+        fi
+    fi
+    exec {lock_fd}>&-
+}
+
+# Check rofi for -on-selection-changed once and cache the answer, so
+# opening the menu does not run rofi -help (hash and read are builtins)
+rofi_has_selection_hook() {
+    local rofi supported=0
+    hash rofi 2>/dev/null || return 1
+    rofi=${BASH_CMDS[rofi]}
+    
+    if [[ ! -f "$ROFI_HOOK_CACHE" || "$rofi" -nt "$ROFI_HOOK_CACHE" ]]; then
+        if [[ $("$rofi" -help 2>/dev/null) == *-on-selection-changed* ]]; then
+            echo 1 > "$ROFI_HOOK_CACHE"
+        else
+            echo 0 > "$ROFI_HOOK_CACHE"
+        fi
+    fi
+    read -r supported < "$ROFI_HOOK_CACHE" || true
+    [[ "$supported" == 1 ]]
+}
+
 show_menu() {
     local current=$(get_current_theme)
     
-    # Get available themes
-    local themes
-    if ! themes=$(get_available_themes); then
+    if ! ensure_menu_cache; then
+        error "Theme menu cache not found: $MENU_CACHE (run generate-themes.py)"
         exit 1
     fi
     
-    # Build menu options
-    local options=""
-    while IFS= read -r theme; do
-        local theme_display=$(format_theme_name "$theme")
-        if [[ "$theme" == "$current" ]]; then
-            options+="$theme_display ✓\n"
-        else
-            options+="$theme_display\n"
-        fi
-    done <<< "$themes"
+    # Slugs by row, and the active row so rofi can highlight and preselect it
+    local -a slugs=()
+    local current_row=0 name slug
+    while IFS=$'\t' read -r name slug _; do
+        [[ "$slug" == "$current" ]] && current_row=${#slugs[@]}
+        slugs+=("$slug")
+    done < "$MENU_CACHE"
     
-    # Show rofi menu
-    local chosen
-    chosen=$(echo -e "$options" | rofi -dmenu -i -p "󰏘 Themes" -theme "$MENU_THEME")
+    # One rofi instance; with -on-selection-changed (rofi 1.7.6+) every move,
+    # filtered or not, previews the highlighted theme through menu_preview.
+    # -format i is the row in the unfiltered cache, so it indexes slugs.
+    local -a hook=()
+    if rofi_has_selection_hook; then
+        hook=(-on-selection-changed "'$SWITCHER' menu-preview {entry}")
+    fi
+    echo "$current" > "$MENU_PREVIEW"
     
-    if [[ -n "$chosen" ]]; then
-        # Remove the checkmark if present
-        chosen=$(echo "$chosen" | sed 's/ ✓$//')
-        
-        # Convert display name to theme slug
-        local theme=$(get_theme_slug "$chosen")
-        
-        apply_theme "$theme"
+    local row status=0 shown lock_fd
+    row=$(rofi -dmenu -i -show-icons -p "󰏘 Themes" -theme "$MENU_THEME" \
+        -display-columns 1 -display-column-separator $'\t' -format i \
+        -a "$current_row" -selected-row "$current_row" "${hook[@]}" < "$MENU_CACHE") || status=$?
+    
+    # Wait for a preview in flight, then close the menu to later hooks
+    exec {lock_fd}> "$MENU_PREVIEW.lock"
+    flock "$lock_fd"
+    shown=$(<"$MENU_PREVIEW")
+    rm -f "$MENU_PREVIEW" "$MENU_PREVIEW.want"
+    exec {lock_fd}>&-
+    
+    if [[ $status -eq 0 && "$row" =~ ^[0-9]+$ && -n "${slugs[$row]:-}" ]]; then
+        request_switch "${slugs[$row]}" "$shown"
+        return
+    fi
+    
+    # Cancelled: undo any preview
+    if [[ "$shown" != "$current" ]]; then
+        revert_preview
     fi
+    return 0
 }
 
 # ============================================================================
 # ADDITIONAL FEATURES
 # ============================================================================
 
+# list and current answer from theme-query.py, which keeps its own index
+# of palettes and variants up to date
 show_current() {
-    local current=$(get_current_theme)
-    local display=$(format_theme_name "$current")
+    local current display
+    current=$(python3 "$QUERY" current) || return 1
+    display=$(python3 "$QUERY" current --name) || return 1
     echo "Current theme: $display ($current)"
 }
 
 list_themes() {
+    local current themes
+    current=$(python3 "$QUERY" current) || return 1
+    if ! themes=$(python3 "$QUERY" list); then
+        error "Could not list themes (run generate-themes.py)"
+        return 1
+    fi
+    
     echo "Available themes:"
     echo "================="
-    local current=$(get_current_theme)
-    
-    get_available_themes | while IFS= read -r theme; do
-        local display=$(format_theme_name "$theme")
-        if [[ "$theme" == "$current" ]]; then
-            echo "  $display (active)"
+    local slug name
+    while IFS=$'\t' read -r slug name _; do
+        if [[ "$slug" == "$current" ]]; then
+            echo "  $name (active)"
         else
-            echo "  $display"
+            echo "  $name"
         fi
+    done <<< "$themes"
+}
+
+# Print one color role from the theme's precompiled roles.tsv (written by
+# generate-themes.py), read with builtins only so it is cheap in loops
+get_color() {
+    local role="" theme="" format="hex"
+    while [[ $# -gt 0 ]]; do
+        case "$1" in
+            --theme)  theme="${2:-}"; [[ $# -gt 1 ]] && shift ;;
+            --format) format="${2:-}"; [[ $# -gt 1 ]] && shift ;;
+            -*)       error "Unknown option: $1"; return 1 ;;
+            *)        role=$1 ;;
+        esac
+        shift
     done
+    
+    if [[ -z "$role" ]]; then
+        error "No role specified. Usage: $0 get ROLE [--theme THEME] [--format hyprland|css|hex]"
+        return 1
+    fi
+    
+    # The current theme's table is the deployed one; other themes (or a
+    # setup that has not deployed it yet) are looked up by name
+    local roles_file=""
+    if [[ -z "$theme" ]]; then
+        if [[ -f "$DEPLOYED_ROLES" ]]; then
+            roles_file=$DEPLOYED_ROLES
+        else
+            theme="catppuccin-mocha"
+            [[ -f "$CURRENT_THEME_FILE" ]] && read -r theme < "$CURRENT_THEME_FILE"
+        fi
+    fi
+    
+    if [[ -n "$roles_file" ]]; then
+        :
+    elif [[ -f "$THEMES_DIR/$theme/roles.tsv" ]]; then
+        roles_file="$THEMES_DIR/$theme/roles.tsv"
+    elif [[ -f "$THEME_CACHE_DIR/$theme/roles.tsv" ]]; then
+        roles_file="$THEME_CACHE_DIR/$theme/roles.tsv"
+    else
+        roles_file="$(resolve_theme_path "$theme")/roles.tsv" || return 1
+        if [[ ! -f "$roles_file" ]]; then
+            error "No role table for theme '$theme' (re-run generate-themes.py)"
+            return 1
+        fi
+    fi
+    
+    local name hex css hyprland
+    while IFS=$'\t' read -r name hex css hyprland; do
+        [[ "$name" == "$role" ]] || continue
+        case "$format" in
+            hex)      echo "$hex" ;;
+            css)      echo "$css" ;;
+            hyprland) echo "$hyprland" ;;
+            *)        error "Unknown format: $format (hyprland, css or hex)"; return 1 ;;
+        esac
+        return 0
+    done < "$roles_file"
+    
+    error "Unknown color role: $role"
+    return 1
 }
 
 show_help() {
@@ -391,15 +925,37 @@ Usage: $(basename "$0") [COMMAND] [THEME]
 Commands:
     (no args)       Show interactive theme menu
     apply THEME     Apply a specific theme
+      --targets LIST  Only apply these targets (e.g. kitty,hyprland)
+      --transition    Cross-fade kitty and Hyprland borders first
+      --staged DIR    Apply the pre-rendered files in DIR (scheduler)
+      --quiet         No desktop notification
+    preview THEME   Recolor kitty and Hyprland borders without applying
+    revert          Undo a preview (restore the deployed colors)
+    status          Show targets whose deployed file drifted from the theme
+      --diff          Show a unified diff of hand edits
+      --fix           Re-apply only the drifted targets
+    verify          Like status, but exit non-zero on drift
+    get ROLE        Print a color of the current theme (e.g. mauve)
+      --theme THEME   Look it up in another theme
+      --format FMT    hex (#cba6f7, default), css (rgb(203, 166, 247))
+                      or hyprland (rgb(cba6f7))
     current         Show currently active theme
     list            List all available themes
     help            Show this help message
 
+Concurrent applies are latest-wins: while a switch is running, apply hands
+it the request and exits with status $SWITCH_QUEUED_STATUS (queued) without waiting. The
+running switch applies the request unless a later one replaces it first.
+
 Examples:
     $(basename "$0")                    # Show menu
     $(basename "$0") apply tokyo-night  # Apply Tokyo Night theme
+    $(basename "$0") apply nord --targets kitty,hyprland
+    $(basename "$0") apply nord --transition
+    $(basename "$0") status --diff      # What changed since the last apply
     $(basename "$0") list               # List all themes
     $(basename "$0") current            # Show current theme
+    $(basename "$0") get mauve --format hyprland
 
 Available themes:
 EOF
@@ -413,6 +969,13 @@ EOF
 # ============================================================================
 
 main() {
+    # Color queries only read, answer them before any setup
+    if [[ "${1:-}" == "get" ]]; then
+        shift
+        get_color "$@"
+        exit
+    fi
+    
     # Ensure directories exist
     ensure_directories
     
@@ -423,7 +986,36 @@ main() {
                 error "No theme specified. Usage: $0 apply THEME"
                 exit 1
             fi
-            apply_theme "$2"
+            local theme=$2
+            shift 2
+            while [[ $# -gt 0 ]]; do
+                case "$1" in
+                    --targets)    SELECTED_TARGETS="${2:-}"; [[ $# -gt 1 ]] && shift ;;
+                    --transition) (( TRANSITION_FRAMES > 0 )) || TRANSITION_FRAMES=30 ;;
+                    --staged)     STAGED_PATH="${2:-}"; [[ $# -gt 1 ]] && shift ;;
+                    --quiet)      QUIET=1 ;;
+                    *)            error "Unknown option: $1"; exit 1 ;;
+                esac
+                shift
+            done
+            request_switch "$theme"
+            ;;
+        preview)
+            if [[ -z "${2:-}" ]]; then
+                error "No theme specified. Usage: $0 preview THEME"
+                exit 1
+            fi
+            preview_theme "$2"
+            ;;
+        revert)
+            revert_preview
+            ;;
+        menu-preview)
+            shift
+            menu_preview "$@"
+            ;;
+        status|verify)
+            show_status "$@"
             ;;
         current)
             show_current
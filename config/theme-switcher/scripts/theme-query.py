@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+"""
+Theme Query - fast read-only answers for status bars and scripts
+
+Answers from the compact index generate-themes.py writes (.theme-index.tsv)
+and imports nothing beyond os and sys, so a poll costs little more than
+interpreter startup. The generator, and with it the render machinery, is
+only imported when the index is missing or stale, to rewrite it.
+
+  theme-query.py list                  slug, name and variant of each theme
+  theme-query.py current [--name]      current theme (or its display name)
+  theme-query.py validate-status       slug and 'ok' or the error, per palette;
+                                       exits 1 if any palette is invalid
+  theme-query.py check-startup [--budget MS]
+                                       wall-time budget check of the above
+"""
+
+import os
+import sys
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+BASE_DIR = os.path.join(os.path.expanduser("~"), ".config", "theme-switcher")
+PALETTES_DIR = os.path.join(BASE_DIR, "palettes")
+VARIANTS_FILE = os.path.join(BASE_DIR, "variants.json")
+CURRENT_THEME_FILE = os.path.join(BASE_DIR, ".current-theme")
+DEFAULT_THEME = "catppuccin-mocha"
+
+# Written by generate-themes.py (see write_query_index there)
+QUERY_INDEX_FILE = os.path.join(BASE_DIR, ".theme-index.tsv")
+QUERY_INDEX_VERSION = 1
+GENERATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate-themes.py")
+
+# check-startup: wall time each query command may take from exec to exit,
+# interpreter startup included (best of a few runs). A status bar polling
+# every second spends at most 5% of a core on it. Modules the commands
+# must not import are checked separately.
+STARTUP_BUDGET_MS = 50.0
+STARTUP_BUDGET_RUNS = 5
+HEAVY_MODULES = ('generate_themes', 'themelib', 'argparse', 'json', 'dataclasses',
+                 'pathlib', 'typing', 'asyncio', 'subprocess')
+QUERY_COMMANDS = (['list'], ['current'], ['current', '--name'], ['validate-status'])
+
+# Index columns
+SLUG, NAME, VARIANT, KIND, SOURCE, MTIME, SIZE, STATUS = range(8)
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+def mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def read_index(check=True):
+    """
+    Index rows, or None when the index is missing, from another version or
+    (with check) stale: the palettes directory, variants.json or any source
+    palette changed since it was written.
+    """
+    try:
+        with open(QUERY_INDEX_FILE, 'r') as f:
+            header = f.readline().rstrip('\n').split('\t')
+            rows = [line.rstrip('\n').split('\t') for line in f]
+    except FileNotFoundError:
+        return None
+
+    if header[0] != f"# theme-index {QUERY_INDEX_VERSION}" or len(header) != 3:
+        return None
+    if not check:
+        return rows
+    if header[1:] != [str(mtime_ns(PALETTES_DIR)), str(mtime_ns(VARIANTS_FILE))]:
+        return None
+
+    stats = {}
+    for row in rows:
+        source = row[SOURCE]
+        if source not in stats:
+            try:
+                stat = os.stat(os.path.join(PALETTES_DIR, f"{source}.json"))
+                stats[source] = [str(stat.st_mtime_ns), str(stat.st_size)]
+            except FileNotFoundError:
+                stats[source] = None
+        if stats[source] != row[MTIME:STATUS]:
+            return None
+    return rows
+
+
+def rebuild_index():
+    """Import the generator (and themelib) to rewrite the index"""
+    import contextlib
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location("generate_themes", GENERATOR)
+    generator = importlib.util.module_from_spec(spec)
+    # Keep the generator's warnings out of the answer
+    with contextlib.redirect_stdout(sys.stderr):
+        spec.loader.exec_module(generator)
+        generator.write_query_index(generator.load_palette_index())
+
+
+def load_index():
+    rows = read_index()
+    if rows is None:
+        rebuild_index()
+        rows = read_index(check=False)
+    if rows is None:
+        print(f"❌ Error: Could not build {QUERY_INDEX_FILE}", file=sys.stderr)
+        sys.exit(1)
+    return rows
+
+
+def current_theme():
+    try:
+        with open(CURRENT_THEME_FILE, 'r') as f:
+            return f.read().strip() or DEFAULT_THEME
+    except FileNotFoundError:
+        return DEFAULT_THEME
+
+# ============================================================================
+# COMMANDS
+# ============================================================================
+
+def list_themes():
+    sys.stdout.write("".join(f"{row[SLUG]}\t{row[NAME]}\t{row[VARIANT]}\n"
+                             for row in load_index() if row[STATUS] == 'ok'))
+    return 0
+
+
+def display_name(theme):
+    """Palette name of a theme; a scheduler dusk step FINAL@STEP names its step"""
+    final, _, step = theme.partition('@')
+    name = next((row[NAME] for row in load_index() if row[SLUG] == final), final)
+    return f"{name} (dusk step {step})" if step else name
+
+
+def show_current(name=False):
+    theme = current_theme()
+    print(display_name(theme) if name else theme)
+    return 0
+
+
+def validate_status():
+    """Palette files only; derived variants are valid whenever their base is"""
+    rows = [row for row in load_index() if row[SOURCE] == row[SLUG]]
+    sys.stdout.write("".join(f"{row[SLUG]}\t{row[STATUS]}\n" for row in rows))
+    return 0 if all(row[STATUS] == 'ok' for row in rows) else 1
+
+
+def check_startup(budget_ms=STARTUP_BUDGET_MS):
+    """
+    Time each query command as a whole process (best of STARTUP_BUDGET_RUNS)
+    against the budget, and list any heavy module it imports (one run under
+    -X importtime). The index is refreshed first, so the commands take
+    their fast path.
+    """
+    import subprocess
+    import time
+
+    def wall_time(args):
+        """Best wall time (ms) of running the interpreter with args"""
+        best = None
+        for _ in range(STARTUP_BUDGET_RUNS):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def imported_modules(args):
+        result = subprocess.run([sys.executable, "-X", "importtime", *args],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        modules = set()
+        for line in result.stderr.splitlines():
+            fields = line.removeprefix("import time:").split('|')
+            if len(fields) == 3 and fields[0].strip().isdigit():
+                modules.add(fields[2].strip())
+        return modules
+
+    load_index()
+    interpreter_ms = wall_time(["-c", "pass"])
+    baseline = imported_modules(["-c", "pass"])
+    print(f"Bare interpreter: {interpreter_ms:.1f} ms (budget {budget_ms:g} ms per command)")
+
+    failed = False
+    for command in QUERY_COMMANDS:
+        args = [os.path.abspath(__file__), *command]
+        elapsed = wall_time(args)
+        heavy = sorted(module for module in imported_modules(args) - baseline
+                       if module.split('.')[0] in HEAVY_MODULES)
+
+        label = ' '.join(command)
+        if heavy:
+            print(f"❌ {label}: imports {', '.join(heavy)}")
+            failed = True
+        elif elapsed > budget_ms:
+            print(f"❌ {label}: {elapsed:.1f} ms")
+            failed = True
+        else:
+            print(f"✅ {label}: {elapsed:.1f} ms")
+
+    return 1 if failed else 0
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def usage():
+    print(__doc__.strip().rsplit('\n\n', 1)[1], file=sys.stderr)
+    return 2
+
+
+def main(argv):
+    """Arguments are parsed by hand: importing argparse costs more than a query"""
+    command, options = (argv[0], argv[1:]) if argv else (None, [])
+
+    if command == 'list' and not options:
+        return list_themes()
+    if command == 'current' and options in ([], ['--name']):
+        return show_current(name=bool(options))
+    if command == 'validate-status' and not options:
+        return validate_status()
+    if command == 'check-startup':
+        if not options:
+            return check_startup()
+        if len(options) == 2 and options[0] == '--budget':
+            try:
+                return check_startup(float(options[1]))
+            except ValueError:
+                pass
+    return usage()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
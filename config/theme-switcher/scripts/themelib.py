@@ -0,0 +1,1726 @@
+#!/usr/bin/env python3
+
+"""
+Theme rendering library for Hyprland dotfiles
+
+Pure, in-memory rendering of palettes into application config files: no
+filesystem access unless asked for, no output, errors raised as
+ThemeError subclasses. generate-themes.py is the command-line front end.
+
+    from themelib import ThemeConfig, render
+
+    files = render({'family': 'base16', 'base00': '#1d2021', ...}, name='gruvbox-dark')
+    files['kitty']                        # -> b'foreground #...'
+
+    theme = ThemeConfig.from_file('palettes/nord.json')
+    theme.render(['kitty', 'hyprland'])   # -> {'kitty': b'...', 'hyprland': b'...'}
+"""
+
+import json
+import os
+import re
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from dataclasses import dataclass, field, replace
+
+# ============================================================================
+# PALETTE SCHEMA
+# ============================================================================
+
+# Theme-specific required colors (different themes use different naming)
+THEME_REQUIRED_COLORS = {
+    'catppuccin-mocha': {'base', 'text', 'red', 'green', 'yellow', 'blue', 'pink'},
+    'catppuccin-latte': {'base', 'text', 'red', 'green', 'yellow', 'blue', 'pink'},
+    'rose-pine': {'base', 'text', 'love', 'gold', 'pine', 'foam', 'iris', 'rose'},
+    'nord': {'nord0', 'nord4', 'nord10', 'nord11', 'nord13', 'nord14'},
+    'gruvbox': {'bg', 'fg', 'red', 'green', 'yellow', 'blue', 'orange'},
+    'tokyo-night': {'bg', 'fg', 'red', 'green', 'yellow', 'blue', 'cyan'},
+    'dracula': {'bg', 'fg', 'red', 'green', 'yellow', 'cyan', 'pink'},
+}
+
+# Family-specific required colors (palettes that declare a "family")
+BASE16_SLOTS = [f"base0{i:X}" for i in range(16)]
+BASE24_SLOTS = BASE16_SLOTS + [f"base1{i:X}" for i in range(8)]
+
+# The unified roles every mapping produces, in palette order
+COLOR_ROLES = [
+    'base', 'mantle', 'crust', 'text', 'subtext0', 'subtext1',
+    'surface0', 'surface1', 'surface2', 'overlay0', 'overlay1',
+    'blue', 'lavender', 'sapphire', 'sky', 'teal', 'green', 'yellow',
+    'peach', 'maroon', 'red', 'mauve', 'pink',
+]
+
+# "roles" palettes hold the unified roles directly (derived variants)
+FAMILY_REQUIRED_COLORS = {
+    'base16': set(BASE16_SLOTS),
+    'roles': set(COLOR_ROLES),
+}
+
+# Universal fallback for unknown themes
+REQUIRED_COLORS = {
+    'base', 'text', 'red', 'green', 'yellow', 'blue'
+}
+
+# Palette keys that describe the palette rather than hold a color
+PALETTE_METADATA_KEYS = {'name', 'family', 'variant', 'author', 'system'}
+
+# Role -> candidate base16/base24 slots, first present slot wins.
+# base24 adds darker backgrounds (base10, base11) and bright accents (base12-17).
+BASE16_ALIASES = {
+    'base': ['base00'],
+    'mantle': ['base10', 'base01'],
+    'crust': ['base11', 'base10', 'base01'],
+    'text': ['base05'],
+    'subtext0': ['base04'],
+    'subtext1': ['base05'],
+    'surface0': ['base01'],
+    'surface1': ['base02'],
+    'surface2': ['base03'],
+    'overlay0': ['base03'],
+    'overlay1': ['base04'],
+    'blue': ['base0D'],
+    'lavender': ['base15', 'base0D'],
+    'sapphire': ['base0C'],
+    'sky': ['base16', 'base0C'],
+    'teal': ['base0C'],
+    'green': ['base0B'],
+    'yellow': ['base0A'],
+    'peach': ['base09'],
+    'maroon': ['base0F', 'base08'],
+    'red': ['base08'],
+    'mauve': ['base0E'],
+    'pink': ['base17', 'base0E'],
+}
+
+# Minimum WCAG contrast ratios (AA): body text and non-text UI elements
+MIN_TEXT_CONTRAST = 4.5
+MIN_UI_CONTRAST = 3.0
+
+
+# Roles that act as surfaces; when a pair fails, the other role is nudged
+SURFACE_ROLES = {'base', 'mantle', 'crust', 'surface0', 'surface1', 'surface2'}
+
+# Border accent per Hyprland workspace 1-10; other workspaces use mauve
+WORKSPACE_ACCENT_ROLES = ['mauve', 'blue', 'teal', 'green', 'yellow',
+                          'peach', 'red', 'pink', 'lavender', 'sapphire']
+
+
+# ============================================================================
+# ERRORS
+# ============================================================================
+
+class ThemeError(Exception):
+    """Base class for everything this library raises"""
+
+
+class PaletteError(ThemeError):
+    """A palette is missing, unreadable or lacks required colors"""
+    
+    def __init__(self, message: str, theme: Optional[str] = None, missing: Iterable[str] = ()):
+        super().__init__(message)
+        self.theme = theme
+        self.missing = frozenset(missing)
+
+
+class UnknownTargetError(ThemeError):
+    """A target name that is not in the registry"""
+    
+    def __init__(self, names: Iterable[str]):
+        self.names = sorted(names)
+        super().__init__(f"unknown targets: {', '.join(self.names)}")
+
+
+class ThemeWarning(UserWarning):
+    """Recoverable palette problems (unknown theme family, odd color values)"""
+
+
+# ============================================================================
+# DATA CLASSES
+# ============================================================================
+
+@dataclass
+class Target:
+    """
+    An application the theme switcher styles: how its file is rendered,
+    where switcher.sh deploys it and how the application picks it up.
+    
+    deploy_mode: 'copy', a special-cased merge ('alacritty', 'btop'), or a
+                 copy that also rebuilds what is derived from the deployed
+                 file ('shell-init', 'lock-background')
+    reload:      'none', 'restart', 'signal:<SIG>', 'hyprctl' or 'kitty-remote'
+    requires:    binary that must be installed for the target to apply
+    contrast:    (fg role, bg role, 'text' | 'ui') pairs the output renders
+    """
+    name: str
+    render: Callable[[str, Dict[str, str]], str]
+    filename: str
+    deploy: str
+    requires: str
+    reload: str = 'none'
+    deploy_mode: str = 'copy'
+    contrast: List[Tuple[str, str, str]] = field(default_factory=list)
+
+
+@dataclass
+class ContrastResult:
+    """Contrast of one foreground/background role pair in one theme"""
+    theme: str
+    target: str
+    fg: str
+    bg: str
+    kind: str
+    fg_hex: str
+    bg_hex: str
+    wcag: float
+    apca: float
+    threshold: float
+
+    @property
+    def passed(self) -> bool:
+        return self.wcag >= self.threshold
+
+
+@dataclass
+class PaletteVariant:
+    """
+    A derived version of every palette (e.g. 'nord-oled'), produced by
+    transforming the mapped roles in OKLab instead of hand-written JSON.
+    
+    lightness:  factor on every role's lightness (< 1 dims)
+    contrast:   factor on each role's lightness distance from base
+    chroma:     factor on saturation
+    black:      turn base, mantle and crust pure black
+    applies_to: 'any', 'dark' or 'light' palettes
+    """
+    name: str
+    label: str
+    lightness: float = 1.0
+    contrast: float = 1.0
+    chroma: float = 1.0
+    black: bool = False
+    applies_to: str = 'any'
+
+
+@dataclass
+class ThemeConfig:
+    """
+    A theme to render: its name, raw palette and rendering options.
+    Everything happens in memory; only from_file() and write() touch the
+    filesystem. The palette is validated on construction.
+    """
+    name: str
+    colors: Dict[str, str]
+    fix_contrast: bool = False
+    min_text: float = MIN_TEXT_CONTRAST
+    min_ui: float = MIN_UI_CONTRAST
+    palette_file: Optional[Path] = None
+    
+    def __post_init__(self):
+        validate_palette(self.colors, self.name)
+    
+    @classmethod
+    def from_file(cls, path: Union[str, Path], name: Optional[str] = None,
+                  **options) -> 'ThemeConfig':
+        """Load a JSON palette; the theme name defaults to the file stem"""
+        path = Path(path)
+        try:
+            with open(path, 'r') as f:
+                colors = json.load(f)
+        except FileNotFoundError:
+            raise PaletteError(f"Palette file not found: {path}", theme=name or path.stem) from None
+        except json.JSONDecodeError as e:
+            raise PaletteError(f"Invalid JSON in {path}: {e}", theme=name or path.stem) from None
+        if not isinstance(colors, dict):
+            raise PaletteError(f"Palette {path} is not a JSON object", theme=name or path.stem)
+        return cls(name or path.stem, colors, palette_file=path, **options)
+    
+    def map_colors(self) -> Tuple[Dict[str, str], Dict[str, Tuple[str, str]]]:
+        """Unified role mapping, plus {role: (old, new)} contrast fixes if enabled"""
+        mapped = get_mapped_colors(self.name, self.colors)
+        if not self.fix_contrast:
+            return mapped, {}
+        return fix_contrast(self.name, mapped, self.min_text, self.min_ui)
+    
+    def render_text(self, targets: Optional[Iterable[Union[str, Target]]] = None) -> Dict[str, str]:
+        """Render the given targets (all registered by default): name -> text"""
+        mapped, _ = self.map_colors()
+        return {target.name: target.render(self.name, mapped)
+                for target in resolve_targets(targets)}
+    
+    def render(self, targets: Optional[Iterable[Union[str, Target]]] = None) -> Dict[str, bytes]:
+        """Render the given targets (all registered by default): name -> bytes"""
+        return {name: text.encode() for name, text in self.render_text(targets).items()}
+    
+    def write(self, output_dir: Union[str, Path],
+              targets: Optional[Iterable[Union[str, Target]]] = None) -> Path:
+        """Write each target's file into output_dir/<name>; returns that directory"""
+        theme_dir = Path(output_dir) / self.name
+        theme_dir.mkdir(parents=True, exist_ok=True)
+        for name, data in self.render(targets).items():
+            (theme_dir / TARGETS[name].filename).write_bytes(data)
+        return theme_dir
+
+
+# ============================================================================
+# COLOR MAPPING FUNCTIONS
+# ============================================================================
+
+def get_mapped_colors(theme_name: str, colors: Dict[str, str]) -> Dict[str, str]:
+    """
+    Map theme-specific color names to a unified color scheme.
+    This allows different themes to use their own naming conventions.
+    """
+    
+    # Palettes already in unified roles (derived variants)
+    if colors.get('family') == 'roles':
+        return {role: colors[role] for role in COLOR_ROLES}
+    
+    # Imported base16/base24 schemes
+    elif colors.get('family') == 'base16':
+        return {
+            role: next(colors[slot] for slot in slots if slot in colors)
+            for role, slots in BASE16_ALIASES.items()
+        }
+    
+    # Catppuccin themes (Mocha, Latte, etc.)
+    elif theme_name.startswith("catppuccin"):
+        return {
+            'base': colors.get('base', '#1e1e2e'),
+            'mantle': colors.get('mantle', '#181825'),
+            'crust': colors.get('crust', '#11111b'),
+            'text': colors.get('text', '#cdd6f4'),
+            'subtext0': colors.get('subtext0', '#a6adc8'),
+            'subtext1': colors.get('subtext1', '#bac2de'),
+            'surface0': colors.get('surface0', '#313244'),
+            'surface1': colors.get('surface1', '#45475a'),
+            'surface2': colors.get('surface2', '#585b70'),
+            'overlay0': colors.get('overlay0', '#6c7086'),
+            'overlay1': colors.get('overlay1', '#7f849c'),
+            'blue': colors.get('blue', '#89b4fa'),
+            'lavender': colors.get('lavender', '#b4befe'),
+            'sapphire': colors.get('sapphire', '#74c7ec'),
+            'sky': colors.get('sky', '#89dceb'),
+            'teal': colors.get('teal', '#94e2d5'),
+            'green': colors.get('green', '#a6e3a1'),
+            'yellow': colors.get('yellow', '#f9e2af'),
+            'peach': colors.get('peach', '#fab387'),
+            'maroon': colors.get('maroon', '#eba0ac'),
+            'red': colors.get('red', '#f38ba8'),
+            'mauve': colors.get('mauve', '#cba6f7'),
+            'pink': colors.get('pink', '#f5c2e7')
+        }
+    
+    # Rose Pine theme
+    elif theme_name == "rose-pine":
+        return {
+            'base': colors.get('base', '#191724'),
+            'mantle': colors.get('surface', '#1f1d2e'),
+            'crust': colors.get('base', '#191724'),
+            'text': colors.get('text', '#e0def4'),
+            'subtext0': colors.get('subtle', '#908caa'),
+            'subtext1': colors.get('subtle', '#908caa'),
+            'surface0': colors.get('surface', '#1f1d2e'),
+            'surface1': colors.get('overlay', '#26233a'),
+            'surface2': colors.get('highlight_med', '#403d52'),
+            'overlay0': colors.get('muted', '#6e6a86'),
+            'overlay1': colors.get('subtle', '#908caa'),
+            'blue': colors.get('pine', '#31748f'),
+            'lavender': colors.get('iris', '#c4a7e7'),
+            'sapphire': colors.get('foam', '#9ccfd8'),
+            'sky': colors.get('foam', '#9ccfd8'),
+            'teal': colors.get('foam', '#9ccfd8'),
+            'green': colors.get('foam', '#9ccfd8'),
+            'yellow': colors.get('gold', '#f6c177'),
+            'peach': colors.get('gold', '#f6c177'),
+            'maroon': colors.get('love', '#eb6f92'),
+            'red': colors.get('love', '#eb6f92'),
+            'mauve': colors.get('iris', '#c4a7e7'),
+            'pink': colors.get('rose', '#ebbcba')
+        }
+    
+    # Nord theme
+    elif theme_name == "nord":
+        return {
+            'base': colors.get('nord0', '#2e3440'),
+            'mantle': colors.get('nord1', '#3b4252'),
+            'crust': colors.get('nord0', '#2e3440'),
+            'text': colors.get('nord4', '#d8dee9'),
+            'subtext0': colors.get('nord4', '#d8dee9'),
+            'subtext1': colors.get('nord5', '#e5e9f0'),
+            'surface0': colors.get('nord1', '#3b4252'),
+            'surface1': colors.get('nord2', '#434c5e'),
+            'surface2': colors.get('nord3', '#4c566a'),
+            'overlay0': colors.get('nord3', '#4c566a'),
+            'overlay1': colors.get('nord4', '#d8dee9'),
+            'blue': colors.get('nord10', '#5e81ac'),
+            'lavender': colors.get('nord15', '#b48ead'),
+            'sapphire': colors.get('nord8', '#88c0d0'),
+            'sky': colors.get('nord8', '#88c0d0'),
+            'teal': colors.get('nord7', '#8fbcbb'),
+            'green': colors.get('nord14', '#a3be8c'),
+            'yellow': colors.get('nord13', '#ebcb8b'),
+            'peach': colors.get('nord12', '#d08770'),
+            'maroon': colors.get('nord11', '#bf616a'),
+            'red': colors.get('nord11', '#bf616a'),
+            'mauve': colors.get('nord15', '#b48ead'),
+            'pink': colors.get('nord15', '#b48ead')
+        }
+    
+    # Gruvbox theme
+    elif theme_name == "gruvbox":
+        return {
+            'base': colors.get('bg', '#282828'),
+            'mantle': colors.get('bg0', '#282828'),
+            'crust': colors.get('bg', '#282828'),
+            'text': colors.get('fg', '#ebdbb2'),
+            'subtext0': colors.get('fg2', '#d5c4a1'),
+            'subtext1': colors.get('fg1', '#ebdbb2'),
+            'surface0': colors.get('bg1', '#3c3836'),
+            'surface1': colors.get('bg2', '#504945'),
+            'surface2': colors.get('bg3', '#665c54'),
+            'overlay0': colors.get('bg4', '#7c6f64'),
+            'overlay1': colors.get('gray', '#928374'),
+            'blue': colors.get('blue', '#83a598'),
+            'lavender': colors.get('purple', '#d3869b'),
+            'sapphire': colors.get('aqua', '#8ec07c'),
+            'sky': colors.get('aqua', '#8ec07c'),
+            'teal': colors.get('aqua', '#8ec07c'),
+            'green': colors.get('green', '#b8bb26'),
+            'yellow': colors.get('yellow', '#fabd2f'),
+            'peach': colors.get('orange', '#fe8019'),
+            'maroon': colors.get('red', '#fb4934'),
+            'red': colors.get('red', '#fb4934'),
+            'mauve': colors.get('purple', '#d3869b'),
+            'pink': colors.get('purple', '#d3869b')
+        }
+    
+    # Tokyo Night theme
+    elif theme_name == "tokyo-night":
+        return {
+            'base': colors.get('bg', '#1a1b26'),
+            'mantle': colors.get('bg_dark', '#16161e'),
+            'crust': colors.get('bg_dark', '#16161e'),
+            'text': colors.get('fg', '#c0caf5'),
+            'subtext0': colors.get('fg_dark', '#a9b1d6'),
+            'subtext1': colors.get('fg', '#c0caf5'),
+            'surface0': colors.get('bg_highlight', '#292e42'),
+            'surface1': colors.get('terminal_black', '#414868'),
+            'surface2': colors.get('dark3', '#545c7e'),
+            'overlay0': colors.get('comment', '#565f89'),
+            'overlay1': colors.get('dark5', '#737aa2'),
+            'blue': colors.get('blue', '#7aa2f7'),
+            'lavender': colors.get('purple', '#bb9af7'),
+            'sapphire': colors.get('cyan', '#7dcfff'),
+            'sky': colors.get('cyan', '#7dcfff'),
+            'teal': colors.get('teal', '#1abc9c'),
+            'green': colors.get('green', '#9ece6a'),
+            'yellow': colors.get('yellow', '#e0af68'),
+            'peach': colors.get('orange', '#ff9e64'),
+            'maroon': colors.get('red1', '#db4b4b'),
+            'red': colors.get('red', '#f7768e'),
+            'mauve': colors.get('purple', '#bb9af7'),
+            'pink': colors.get('magenta', '#ff007c')
+        }
+    
+    # Dracula theme
+    elif theme_name == "dracula":
+        return {
+            'base': colors.get('bg', '#282a36'),
+            'mantle': colors.get('bg', '#282a36'),
+            'crust': colors.get('bg', '#282a36'),
+            'text': colors.get('fg', '#f8f8f2'),
+            'subtext0': colors.get('comment', '#6272a4'),
+            'subtext1': colors.get('fg', '#f8f8f2'),
+            'surface0': colors.get('current_line', '#44475a'),
+            'surface1': colors.get('selection', '#44475a'),
+            'surface2': colors.get('selection', '#44475a'),
+            'overlay0': colors.get('comment', '#6272a4'),
+            'overlay1': colors.get('comment', '#6272a4'),
+            'blue': colors.get('cyan', '#8be9fd'),
+            'lavender': colors.get('purple', '#bd93f9'),
+            'sapphire': colors.get('cyan', '#8be9fd'),
+            'sky': colors.get('cyan', '#8be9fd'),
+            'teal': colors.get('cyan', '#8be9fd'),
+            'green': colors.get('green', '#50fa7b'),
+            'yellow': colors.get('yellow', '#f1fa8c'),
+            'peach': colors.get('orange', '#ffb86c'),
+            'maroon': colors.get('red', '#ff5555'),
+            'red': colors.get('red', '#ff5555'),
+            'mauve': colors.get('purple', '#bd93f9'),
+            'pink': colors.get('pink', '#ff79c6')
+        }
+    
+    # Default/unknown theme - try to use colors as-is
+    else:
+        warnings.warn(f"Unknown theme '{theme_name}', using direct color mapping",
+                      ThemeWarning, stacklevel=2)
+        return colors
+
+
+# ============================================================================
+# COLOR MATH
+# ============================================================================
+
+def hex_to_rgb(hex_color: str) -> Tuple[float, float, float]:
+    """Parse #rgb / #rrggbb / #rrggbbaa into sRGB floats in 0..1 (alpha ignored)"""
+    value = hex_color.lstrip('#')
+    if len(value) in (3, 4):
+        value = ''.join(c * 2 for c in value[:3])
+    return tuple(int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+def rgb_to_hex(rgb: Tuple[float, float, float]) -> str:
+    """Format sRGB floats as #rrggbb, clamping out-of-gamut channels"""
+    return '#' + ''.join(f"{round(min(1.0, max(0.0, c)) * 255):02x}" for c in rgb)
+
+
+def srgb_to_linear(c: float) -> float:
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(c: float) -> float:
+    return c * 12.92 if c <= 0.0031308 else 1.055 * c ** (1 / 2.4) - 0.055
+
+
+def relative_luminance(hex_color: str) -> float:
+    """WCAG 2.x relative luminance"""
+    r, g, b = (srgb_to_linear(c) for c in hex_to_rgb(hex_color))
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def wcag_ratio(lum_a: float, lum_b: float) -> float:
+    """WCAG contrast ratio from two relative luminances (order independent)"""
+    hi, lo = max(lum_a, lum_b), min(lum_a, lum_b)
+    return (hi + 0.05) / (lo + 0.05)
+
+
+def apca_luminance(hex_color: str) -> float:
+    """APCA screen luminance (simple 2.4 exponent, APCA 0.0.98G coefficients)"""
+    r, g, b = hex_to_rgb(hex_color)
+    return 0.2126729 * r ** 2.4 + 0.7151522 * g ** 2.4 + 0.0721750 * b ** 2.4
+
+
+def apca_contrast(text_y: float, bg_y: float) -> float:
+    """APCA lightness contrast (Lc) of text on background, from APCA luminances"""
+    def clamp_black(y):
+        return y if y > 0.022 else y + (0.022 - y) ** 1.414
+
+    text_y, bg_y = clamp_black(text_y), clamp_black(bg_y)
+    if abs(bg_y - text_y) < 0.0005:
+        return 0.0
+
+    if bg_y > text_y:
+        sapc = (bg_y ** 0.56 - text_y ** 0.57) * 1.14
+        return 0.0 if sapc < 0.1 else (sapc - 0.027) * 100
+    sapc = (bg_y ** 0.65 - text_y ** 0.62) * 1.14
+    return 0.0 if sapc > -0.1 else (sapc + 0.027) * 100
+
+
+def hex_to_oklab(hex_color: str) -> Tuple[float, float, float]:
+    """Convert a hex color to OKLab (L, a, b)"""
+    r, g, b = (srgb_to_linear(c) for c in hex_to_rgb(hex_color))
+    l = (0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b) ** (1 / 3)
+    m = (0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b) ** (1 / 3)
+    s = (0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b) ** (1 / 3)
+    return (
+        0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+        1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+        0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s,
+    )
+
+
+def oklab_to_hex(lab: Tuple[float, float, float]) -> str:
+    """Convert OKLab (L, a, b) back to a gamut-clamped hex color"""
+    L, a, b = lab
+    l = (L + 0.3963377774 * a + 0.2158037573 * b) ** 3
+    m = (L - 0.1055613458 * a - 0.0638541728 * b) ** 3
+    s = (L - 0.0894841775 * a - 1.2914855480 * b) ** 3
+    rgb = (
+        4.0767416621 * l - 3.3077115913 * m + 0.2309699292 * s,
+        -1.2684380046 * l + 2.6097574011 * m - 0.3413193965 * s,
+        -0.0041960863 * l - 0.7034186147 * m + 1.7076147010 * s,
+    )
+    return rgb_to_hex(tuple(linear_to_srgb(min(1.0, max(0.0, c))) for c in rgb))
+
+
+def nudge_lightness(hex_color: str, against: str, min_ratio: float) -> str:
+    """
+    Move a color's OKLab lightness away from another color until their WCAG
+    ratio reaches min_ratio. Hue and chroma are kept; if neither direction
+    reaches the threshold, the best candidate found is returned.
+    """
+    L, a, b = hex_to_oklab(hex_color)
+    other = relative_luminance(against)
+    lighter_first = relative_luminance(hex_color) >= other
+
+    best, best_ratio = hex_color, wcag_ratio(relative_luminance(hex_color), other)
+    for direction in ((1, -1) if lighter_first else (-1, 1)):
+        step = 1
+        while 0.0 <= L + direction * step * 0.01 <= 1.0:
+            candidate = oklab_to_hex((L + direction * step * 0.01, a, b))
+            ratio = wcag_ratio(relative_luminance(candidate), other)
+            if ratio >= min_ratio:
+                return candidate
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+            step += 1
+    return best
+
+
+# ============================================================================
+# VALIDATION FUNCTIONS
+# ============================================================================
+
+def validate_palette(palette: Dict[str, str], theme_name: str) -> None:
+    """
+    Check that a palette has all required colors for its theme type.
+    Raises PaletteError; colors that do not look like hex get a ThemeWarning.
+    """
+    
+    # Get required colors for this specific theme
+    if palette.get('family') in FAMILY_REQUIRED_COLORS:
+        required = FAMILY_REQUIRED_COLORS[palette['family']]
+    else:
+        required = THEME_REQUIRED_COLORS.get(theme_name, REQUIRED_COLORS)
+    
+    # Filter out metadata keys, they are not colors
+    palette_colors = {k: v for k, v in palette.items() if k not in PALETTE_METADATA_KEYS}
+    
+    missing_colors = required - set(palette_colors.keys())
+    
+    if missing_colors:
+        raise PaletteError(f"Palette '{theme_name}' is missing required colors: {missing_colors}",
+                           theme=theme_name, missing=missing_colors)
+    
+    # Validate color format (should be hex colors, metadata keys are skipped)
+    for color_name, color_value in palette_colors.items():
+        if not isinstance(color_value, str):
+            raise PaletteError(f"Color '{color_name}' in '{theme_name}' is not a string",
+                               theme=theme_name)
+        
+        if not color_value.startswith('#'):
+            warnings.warn(f"Color '{color_name}' in '{theme_name}' doesn't start with '#': {color_value}",
+                          ThemeWarning, stacklevel=2)
+
+
+# ============================================================================
+# THEME GENERATORS
+# ============================================================================
+
+def generate_waybar(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Waybar color tokens (imported by waybar/style.css)"""
+    return f"""/* {theme_name.title()} */
+@define-color base   {mapped['base']};
+@define-color mantle {mapped['mantle']};
+@define-color crust  {mapped['crust']};
+
+@define-color text     {mapped['text']};
+@define-color subtext0 {mapped['subtext0']};
+@define-color subtext1 {mapped['subtext1']};
+
+@define-color surface0 {mapped['surface0']};
+@define-color surface1 {mapped['surface1']};
+@define-color surface2 {mapped['surface2']};
+
+@define-color overlay0 {mapped['overlay0']};
+@define-color overlay1 {mapped['overlay1']};
+
+@define-color blue     {mapped['blue']};
+@define-color lavender {mapped['lavender']};
+@define-color sapphire {mapped['sapphire']};
+@define-color sky      {mapped['sky']};
+@define-color teal     {mapped['teal']};
+@define-color green    {mapped['green']};
+@define-color yellow   {mapped['yellow']};
+@define-color peach    {mapped['peach']};
+@define-color maroon   {mapped['maroon']};
+@define-color red      {mapped['red']};
+@define-color mauve    {mapped['mauve']};
+@define-color pink     {mapped['pink']};
+"""
+
+
+def generate_swaync(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate SwayNC color tokens (imported by swaync/style.css)"""
+    return f"""/* {theme_name.title()} Colors */
+@define-color base   {mapped['base']};
+@define-color mantle {mapped['mantle']};
+@define-color crust  {mapped['crust']};
+
+@define-color text     {mapped['text']};
+@define-color subtext0 {mapped['subtext0']};
+@define-color subtext1 {mapped['subtext1']};
+
+@define-color surface0 {mapped['surface0']};
+@define-color surface1 {mapped['surface1']};
+@define-color surface2 {mapped['surface2']};
+
+@define-color overlay0 {mapped['overlay0']};
+@define-color overlay1 {mapped['overlay1']};
+
+@define-color blue     {mapped['blue']};
+@define-color lavender {mapped['lavender']};
+@define-color sapphire {mapped['sapphire']};
+@define-color sky      {mapped['sky']};
+@define-color teal     {mapped['teal']};
+@define-color green    {mapped['green']};
+@define-color yellow   {mapped['yellow']};
+@define-color peach    {mapped['peach']};
+@define-color maroon   {mapped['maroon']};
+@define-color red      {mapped['red']};
+@define-color mauve    {mapped['mauve']};
+@define-color pink     {mapped['pink']};
+"""
+
+
+def generate_rofi(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Rofi powermenu color tokens (imported by rofi/powermenu.rasi)"""
+    
+    return f"""* {{
+    bg:     {mapped['base']};
+    bg-alt: {mapped['mantle']};
+    fg:     {mapped['text']};
+    accent: {mapped['mauve']};
+    green:  {mapped['green']};
+    red:    {mapped['red']};
+    selected: {mapped['mauve']};
+    background: {mapped['base']};
+    background-alt: {mapped['surface0']};
+    foreground: {mapped['text']};
+    urgent: {mapped['red']};
+    active: {mapped['green']};
+}}
+"""
+
+
+def generate_rofi_launcher_colors(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Rofi launcher colors (adi1090x style)"""
+    
+    return f"""/**
+ * Rofi Colors - {theme_name.title()}
+ * Generated by theme-switcher
+ * 
+ * Author : Aditya Shakya (adi1090x)
+ * Github : @adi1090x
+ */
+
+* {{
+    background:     {mapped['base']};
+    background-alt: {mapped['surface0']};
+    foreground:     {mapped['text']};
+    selected:       {mapped['mauve']};
+    active:         {mapped['green']};
+    urgent:         {mapped['red']};
+}}
+"""
+
+
+def generate_btop(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Btop theme"""
+    
+    return f"""theme[main_bg]="{mapped['crust']}"
+theme[main_fg]="{mapped['text']}"
+theme[title]="{mapped['pink']}"
+theme[hi_fg]="{mapped['mauve']}"
+theme[selected_bg]="{mapped['surface2']}"
+theme[selected_fg]="{mapped['pink']}"
+theme[inactive_fg]="{mapped['overlay0']}"
+theme[graph_text]="{mapped['subtext1']}"
+theme[meter_bg]="{mapped['base']}"
+theme[proc_misc]="{mapped['pink']}"
+theme[cpu_box]="{mapped['mauve']}"
+theme[mem_box]="{mapped['green']}"
+theme[net_box]="{mapped['blue']}"
+theme[proc_box]="{mapped['yellow']}"
+theme[div_line]="{mapped['surface1']}"
+theme[temp_start]="{mapped['green']}"
+theme[temp_mid]="{mapped['yellow']}"
+theme[temp_end]="{mapped['red']}"
+theme[cpu_start]="{mapped['blue']}"
+theme[cpu_mid]="{mapped['mauve']}"
+theme[cpu_end]="{mapped['pink']}"
+theme[free_start]="{mapped['mauve']}"
+theme[free_mid]="{mapped['pink']}"
+theme[free_end]="{mapped['maroon']}"
+theme[cached_start]="{mapped['sky']}"
+theme[cached_mid]="{mapped['lavender']}"
+theme[cached_end]="{mapped['mauve']}"
+theme[available_start]="{mapped['peach']}"
+theme[available_mid]="{mapped['yellow']}"
+theme[available_end]="{mapped['green']}"
+theme[used_start]="{mapped['red']}"
+theme[used_mid]="{mapped['peach']}"
+theme[used_end]="{mapped['yellow']}"
+theme[download_start]="{mapped['green']}"
+theme[download_mid]="{mapped['sky']}"
+theme[download_end]="{mapped['blue']}"
+theme[upload_start]="{mapped['yellow']}"
+theme[upload_mid]="{mapped['peach']}"
+theme[upload_end]="{mapped['red']}"
+theme[process_start]="{mapped['blue']}"
+theme[process_mid]="{mapped['lavender']}"
+theme[process_end]="{mapped['mauve']}"
+"""
+
+
+def generate_cava(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Cava config"""
+    grad = [mapped['mauve'], mapped['pink'], mapped['red'], mapped['peach'], mapped['yellow'], mapped['green']]
+    
+    return f"""[general]
+framerate = 60
+bars = 0
+bar_width = 2
+bar_spacing = 1
+
+[input]
+method = pulse
+source = auto
+
+[output]
+method = ncurses
+channels = stereo
+mono_option = average
+reverse = 0
+
+[color]
+gradient = 1
+gradient_count = 6
+gradient_color_1 = '{grad[0]}'
+gradient_color_2 = '{grad[1]}'
+gradient_color_3 = '{grad[2]}'
+gradient_color_4 = '{grad[3]}'
+gradient_color_5 = '{grad[4]}'
+gradient_color_6 = '{grad[5]}'
+
+[smoothing]
+monstercat = 1
+waves = 0
+gravity = 100
+ignore = 0
+"""
+
+
+def generate_alacritty(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Alacritty theme"""
+    
+    return f"""[colors.primary]
+background = '{mapped['base']}'
+foreground = '{mapped['text']}'
+
+[colors.cursor]
+text = '{mapped['base']}'
+cursor = '{mapped['pink']}'
+
+[colors.selection]
+text = '{mapped['base']}'
+background = '{mapped['pink']}'
+
+[colors.normal]
+black = '{mapped['surface1']}'
+red = '{mapped['red']}'
+green = '{mapped['green']}'
+yellow = '{mapped['yellow']}'
+blue = '{mapped['blue']}'
+magenta = '{mapped['pink']}'
+cyan = '{mapped['teal']}'
+white = '{mapped['subtext1']}'
+
+[colors.bright]
+black = '{mapped['surface2']}'
+red = '{mapped['red']}'
+green = '{mapped['green']}'
+yellow = '{mapped['yellow']}'
+blue = '{mapped['blue']}'
+magenta = '{mapped['pink']}'
+cyan = '{mapped['teal']}'
+white = '{mapped['subtext0']}'
+"""
+
+
+def generate_kitty(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Kitty theme"""
+    
+    return f"""foreground {mapped['text']}
+background {mapped['base']}
+selection_foreground {mapped['base']}
+selection_background {mapped['pink']}
+cursor {mapped['pink']}
+cursor_text_color {mapped['base']}
+url_color {mapped['pink']}
+active_border_color {mapped['lavender']}
+inactive_border_color {mapped['overlay0']}
+bell_border_color {mapped['yellow']}
+active_tab_foreground {mapped['crust']}
+active_tab_background {mapped['mauve']}
+inactive_tab_foreground {mapped['text']}
+inactive_tab_background {mapped['mantle']}
+tab_bar_background {mapped['crust']}
+color0 {mapped['surface1']}
+color8 {mapped['surface2']}
+color1 {mapped['red']}
+color9 {mapped['red']}
+color2  {mapped['green']}
+color10 {mapped['green']}
+color3  {mapped['yellow']}
+color11 {mapped['yellow']}
+color4  {mapped['blue']}
+color12 {mapped['blue']}
+color5  {mapped['pink']}
+color13 {mapped['pink']}
+color6  {mapped['teal']}
+color14 {mapped['teal']}
+color7  {mapped['subtext1']}
+color15 {mapped['subtext0']}
+"""
+
+
+def generate_theme_menu(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate theme switcher menu for Rofi"""
+    
+    return f"""configuration {{
+	modi:                       "drun";
+    show-icons:                 true;
+    display-drun:               "󰏘";
+	drun-display-format:        "{{name}}";
+}}
+
+* {{
+    bg:     {mapped['base']};
+    bg-alt: {mapped['mantle']};
+    fg:     {mapped['text']};
+    accent: {mapped['mauve']};
+    surface: {mapped['surface0']};
+    
+    background: {mapped['base']};
+    background-alt: {mapped['surface0']};
+    foreground: {mapped['text']};
+    selected: {mapped['mauve']};
+    
+    font: "Ubuntu Nerd Font 13";
+}}
+
+window {{
+    transparency:                "real";
+    location:                    center;
+    anchor:                      center;
+    fullscreen:                  false;
+    width:                       450px;
+    x-offset:                    0px;
+    y-offset:                    0px;
+
+    enabled:                     true;
+    margin:                      0px;
+    padding:                     0px;
+    border:                      0px solid;
+    border-radius:               12px;
+    border-color:                @selected;
+    background-color:            @background;
+    cursor:                      "default";
+}}
+
+mainbox {{
+    enabled:                     true;
+    spacing:                     0px;
+    margin:                      0px;
+    padding:                     0px;
+    border:                      0px solid;
+    border-radius:               0px 0px 0px 0px;
+    border-color:                @selected;
+    background-color:            transparent;
+    children:                    [ "inputbar", "listview" ];
+}}
+
+inputbar {{
+    enabled:                     true;
+    spacing:                     10px;
+    margin:                      0px;
+    padding:                     15px;
+    border:                      0px solid;
+    border-radius:               12px 12px 0px 0px;
+    border-color:                @selected;
+    background-color:            @selected;
+    text-color:                  @background;
+    children:                    [ "prompt", "entry" ];
+}}
+
+prompt {{
+    enabled:                     true;
+    background-color:            inherit;
+    text-color:                  inherit;
+}}
+
+entry {{
+    enabled:                     true;
+    background-color:            inherit;
+    text-color:                  inherit;
+    cursor:                      text;
+    placeholder:                 "Search themes...";
+    placeholder-color:           inherit;
+}}
+
+listview {{
+    enabled:                     true;
+    columns:                     1;
+    lines:                       7;
+    cycle:                       true;
+    dynamic:                     true;
+    scrollbar:                   false;
+    layout:                      vertical;
+    reverse:                     false;
+    fixed-height:                true;
+    fixed-columns:               true;
+    
+    spacing:                     5px;
+    margin:                      0px;
+    padding:                     10px;
+    border:                      0px solid;
+    border-radius:               0px;
+    border-color:                @selected;
+    background-color:            transparent;
+    text-color:                  @foreground;
+    cursor:                      "default";
+}}
+
+element {{
+    enabled:                     true;
+    spacing:                     10px;
+    margin:                      0px;
+    padding:                     10px;
+    border:                      0px solid;
+    border-radius:               8px;
+    border-color:                @selected;
+    background-color:            transparent;
+    text-color:                  @foreground;
+    cursor:                      pointer;
+}}
+
+element normal.normal {{
+    background-color:            @background;
+    text-color:                  @foreground;
+}}
+
+element selected.normal {{
+    background-color:            @selected;
+    text-color:                  @background;
+}}
+
+element-icon {{
+    background-color:            transparent;
+    size:                        32px;
+    border-radius:               6px;
+    cursor:                      inherit;
+}}
+
+element-text {{
+    background-color:            transparent;
+    text-color:                  inherit;
+    highlight:                   inherit;
+    cursor:                      inherit;
+    vertical-align:              0.5;
+    horizontal-align:            0.0;
+}}
+"""
+
+
+def starship_palette(mapped: Dict[str, str]) -> Dict[str, str]:
+    """Starship palette entries (catppuccin names) for the mapped roles"""
+    return {
+        'rosewater': mapped.get('pink', '#f5c2e7'),
+        'flamingo': mapped.get('pink', '#f5c2e7'),
+        'pink': mapped['pink'],
+        'mauve': mapped['mauve'],
+        'red': mapped['red'],
+        'maroon': mapped.get('maroon', mapped['red']),
+        'peach': mapped['peach'],
+        'yellow': mapped['yellow'],
+        'green': mapped['green'],
+        'teal': mapped['teal'],
+        'sky': mapped['sky'],
+        'sapphire': mapped['sapphire'],
+        'blue': mapped['blue'],
+        'lavender': mapped['lavender'],
+        'text': mapped['text'],
+        'subtext1': mapped['subtext1'],
+        'subtext0': mapped['subtext0'],
+        'overlay2': mapped.get('overlay2', mapped['overlay1']),
+        'overlay1': mapped['overlay1'],
+        'overlay0': mapped['overlay0'],
+        'surface2': mapped['surface2'],
+        'surface1': mapped['surface1'],
+        'surface0': mapped['surface0'],
+        'base': mapped['base'],
+        'mantle': mapped['mantle'],
+        'crust': mapped['crust'],
+    }
+
+
+def generate_starship(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Starship dynamic palette"""
+    
+    entries = '\n'.join(f'{name} = "{color}"' for name, color in starship_palette(mapped).items())
+    return f"""# Starship Palette - {theme_name.title()}
+# Generated by theme-switcher
+# This palette is dynamically sourced by starship.toml
+
+[palettes.theme]
+{entries}
+"""
+
+
+def starship_layout_colors(layout: str) -> List[str]:
+    """
+    Palette names a starship layout refers to, in order of first use: every
+    word of a style string (`style = "bg:red fg:crust"`) or of a format
+    string's `[text](style)` group, minus the fg:/bg: prefixes.
+    """
+    styles = re.findall(r'^\s*\w*(?:style|symbol)\w*\s*=\s*["\']([^"\']*)["\']', layout, re.MULTILINE)
+    styles += re.findall(r'\]\(([^)]*)\)', layout)
+    
+    names = []
+    for spec in styles:
+        for word in spec.split():
+            word = word.split(':', 1)[-1]
+            if word not in names:
+                names.append(word)
+    return names
+
+
+def generate_starship_config(theme_name: str, mapped: Dict[str, str], layout: str) -> str:
+    """
+    Generate a complete starship.toml: the prompt layout followed by a
+    palette holding only the colors the layout uses, so starship parses a
+    single small file per prompt.
+    """
+    palette = starship_palette(mapped)
+    used = [name for name in starship_layout_colors(layout) if name in palette]
+    entries = '\n'.join(f'{name} = "{palette[name]}"' for name in used)
+    
+    return f"""# Starship Config - {theme_name.title()}
+# Generated by theme-switcher from ~/.config/starship/layout.toml
+# Edit the layout instead; this file is replaced on every theme switch
+
+{layout.rstrip()}
+
+[palettes.theme]
+{entries}
+"""
+
+
+def generate_shell(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate zsh color environment (fzf, LS_COLORS, syntax highlighting)"""
+
+    # Truecolor SGR sequence for LS_COLORS
+    def sgr(hex_color, bold=False):
+        r, g, b = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+        return f"{'01;' if bold else ''}38;2;{r};{g};{b}"
+
+    fzf = ','.join(f"{key}:{mapped[role]}" for key, role in (
+        ('fg', 'text'), ('bg', 'base'), ('hl', 'red'),
+        ('fg+', 'text'), ('bg+', 'surface0'), ('hl+', 'red'),
+        ('info', 'mauve'), ('prompt', 'mauve'), ('pointer', 'pink'),
+        ('marker', 'lavender'), ('spinner', 'pink'), ('header', 'red'),
+        ('border', 'overlay0'),
+    ))
+
+    archives = ('tar', 'tgz', 'gz', 'xz', 'zst', 'bz2', 'zip', '7z', 'rar')
+    media = ('png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'mp3', 'flac', 'ogg', 'mp4', 'mkv', 'webm')
+    ls_colors = ':'.join([
+        f"di={sgr(mapped['blue'], bold=True)}",
+        f"ln={sgr(mapped['teal'])}",
+        f"so={sgr(mapped['pink'])}",
+        f"pi={sgr(mapped['yellow'])}",
+        f"ex={sgr(mapped['green'], bold=True)}",
+        f"bd={sgr(mapped['yellow'], bold=True)}",
+        f"cd={sgr(mapped['yellow'], bold=True)}",
+        f"or={sgr(mapped['red'])}",
+        f"mi={sgr(mapped['red'])}",
+        *(f"*.{ext}={sgr(mapped['peach'])}" for ext in archives),
+        *(f"*.{ext}={sgr(mapped['mauve'])}" for ext in media),
+    ])
+
+    highlight = {
+        'default': 'text',
+        'unknown-token': 'red',
+        'reserved-word': 'mauve',
+        'alias': 'green',
+        'suffix-alias': 'green',
+        'builtin': 'green',
+        'function': 'green',
+        'command': 'green',
+        'precommand': 'green,underline',
+        'commandseparator': 'sky',
+        'path': 'text,underline',
+        'globbing': 'blue',
+        'single-hyphen-option': 'peach',
+        'double-hyphen-option': 'peach',
+        'single-quoted-argument': 'yellow',
+        'double-quoted-argument': 'yellow',
+        'dollar-quoted-argument': 'yellow',
+        'back-quoted-argument': 'mauve',
+        'redirection': 'sky',
+        'comment': 'overlay0',
+        'arg0': 'green',
+    }
+
+    def style(spec):
+        role, *attrs = spec.split(',')
+        return ','.join([f"fg={mapped[role]}", *attrs])
+
+    styles = '\n'.join(f"ZSH_HIGHLIGHT_STYLES[{key}]='{style(spec)}'"
+                       for key, spec in highlight.items())
+
+    return f"""# Shell Colors - {theme_name.title()}
+# Generated by theme-switcher
+# Sourced through the cached shell init (generate-themes.py --shell-init)
+
+export FZF_DEFAULT_OPTS="${{FZF_DEFAULT_OPTS:+$FZF_DEFAULT_OPTS }}--color={fzf}"
+export LS_COLORS='{ls_colors}'
+zstyle ':completion:*' list-colors "${{(s.:.)LS_COLORS}}"
+
+typeset -gA ZSH_HIGHLIGHT_STYLES
+{styles}
+ZSH_AUTOSUGGEST_HIGHLIGHT_STYLE='fg={mapped['overlay0']}'
+"""
+
+
+def generate_hyprland_colors(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate Hyprland color configuration"""
+    
+    # Convert hex to rgb format for Hyprland
+    def hex_to_rgb(hex_color):
+        hex_color = hex_color.lstrip('#')
+        return f"rgb({hex_color})"
+    
+    def hex_to_rgba(hex_color, alpha="44"):
+        hex_color = hex_color.lstrip('#')
+        return f"rgba({hex_color}{alpha})"
+    
+    return f"""# Hyprland Colors - {theme_name.title()}
+# Generated by theme-switcher
+# Source this file in your appearance.conf
+
+$active_border = {hex_to_rgb(mapped['mauve'])}
+$inactive_border = {hex_to_rgb(mapped['surface1'])}
+$shadow_active = {hex_to_rgba(mapped['mauve'], '44')}
+$shadow_inactive = {hex_to_rgba(mapped['mantle'], '44')}
+
+general {{
+    col.active_border = $active_border
+    col.inactive_border = $inactive_border
+}}
+
+decoration {{
+    shadow {{
+        color = $shadow_active
+        color_inactive = $shadow_inactive
+    }}
+}}
+"""
+
+
+def generate_workspace_accents(theme_name: str, mapped: Dict[str, str]) -> str:
+    """
+    Generate per-workspace border accents for the workspace listener: one
+    line per workspace id ('*' for any other) holding the ready-to-send
+    Hyprland batch request that recolors the active border and shadow.
+    """
+    
+    def batch(role):
+        color = mapped[role].lstrip('#')
+        return ("[[BATCH]]"
+                f"keyword general:col.active_border rgb({color});"
+                f"keyword decoration:shadow:color rgba({color}44)")
+    
+    lines = [f"{i}\t{batch(role)}" for i, role in enumerate(WORKSPACE_ACCENT_ROLES, 1)]
+    lines.append(f"*\t{batch('mauve')}")
+    return f"""# Workspace Accents - {theme_name.title()}
+# Generated by theme-switcher, read by generate-themes.py --workspace-accents
+{chr(10).join(lines)}
+"""
+
+
+def generate_hyprlock_colors(theme_name: str, mapped: Dict[str, str]) -> str:
+    """Generate the hyprlock color variables (sourced by hypr/hyprlock.conf)"""
+    lines = [f"${role} = rgb({mapped[role].lstrip('#')})" for role in COLOR_ROLES if role in mapped]
+    return f"""# Hyprlock Colors - {theme_name.title()}
+# Generated by theme-switcher
+{chr(10).join(lines)}
+"""
+
+
+def generate_waybar_calendar(theme_name: str, mapped: Dict[str, str]) -> str:
+    """
+    Generate the clock calendar colors, merged into waybar/config.jsonc
+    through its "include" list (Waybar only fills in keys the main config
+    leaves out, so the calendar "format" block lives here alone).
+    """
+    
+    def span(role, body):
+        return f"<span color='{mapped[role]}'><b>{body}</b></span>"
+    
+    calendar_format = {
+        'months': span('pink', '{}'),
+        'days': span('text', '{}'),
+        'weeks': span('teal', 'W{}'),
+        'weekdays': span('yellow', '{}'),
+        'today': span('red', '<u>{}</u>'),
+    }
+    body = json.dumps({'clock': {'calendar': {'format': calendar_format}}}, indent=2)
+    return f"""// Waybar Calendar Colors - {theme_name.title()}
+// Generated by theme-switcher
+{body}
+"""
+
+
+def generate_roles(theme_name: str, mapped: Dict[str, str]) -> str:
+    """
+    Generate the role lookup table behind `switcher.sh get`: one line per
+    role with the color pre-formatted as hex, CSS and Hyprland values, so
+    queries are a table scan with no palette loading or remapping.
+    """
+    lines = []
+    for role in COLOR_ROLES:
+        if role not in mapped:
+            continue
+        color = mapped[role]
+        r, g, b = (round(c * 255) for c in hex_to_rgb(color))
+        lines.append(f"{role}\t{color}\trgb({r}, {g}, {b})\trgb({color.lstrip('#')})")
+    return f"""# Color Roles - {theme_name.title()}
+# Generated by theme-switcher: role, hex, css, hyprland
+{chr(10).join(lines)}
+"""
+
+
+# ============================================================================
+# TARGET REGISTRY
+# ============================================================================
+
+# Every styled application, in apply order. Deploy paths are relative to
+# ~/.config; switcher.sh reads them from the generated targets.tsv.
+TARGETS: Dict[str, Target] = {}
+
+
+def register_target(target: Target) -> None:
+    """Add (or replace) a target in the registry"""
+    TARGETS[target.name] = target
+
+
+register_target(Target(
+    name='waybar',
+    render=generate_waybar,
+    filename='waybar-colors.css',
+    deploy='waybar/colors.css',
+    requires='waybar',
+    reload='restart',
+    contrast=[
+        ('text', 'surface0', 'text'),    # workspace buttons
+        ('crust', 'mauve', 'text'),      # active workspace, pulseaudio
+        ('crust', 'blue', 'text'),       # clock
+        ('crust', 'green', 'text'),      # cpu, spotify
+        ('crust', 'yellow', 'text'),     # memory
+        ('crust', 'sky', 'text'),        # network
+        ('crust', 'pink', 'text'),       # notifications
+        ('crust', 'maroon', 'text'),     # dnd
+        ('crust', 'red', 'text'),        # mode
+        ('overlay1', 'surface1', 'ui'),  # muted / paused
+        ('red', 'surface1', 'text'),     # network disconnected
+        ('text', 'base', 'text'),        # tooltip
+    ],
+))
+
+register_target(Target(
+    name='swaync',
+    render=generate_swaync,
+    filename='swaync-colors.css',
+    deploy='swaync/colors.css',
+    requires='swaync',
+    reload='restart',
+    contrast=[
+        ('text', 'surface0', 'text'),    # summary
+        ('subtext0', 'surface0', 'text'),  # body
+        ('overlay1', 'surface0', 'ui'),  # timestamp
+        ('crust', 'pink', 'text'),       # clear-all button
+        ('crust', 'red', 'text'),        # close button
+    ],
+))
+
+register_target(Target(
+    name='rofi',
+    render=generate_rofi,
+    filename='rofi-colors.rasi',
+    deploy='rofi/powermenu-colors.rasi',
+    requires='rofi',
+    contrast=[
+        ('base', 'mauve', 'text'),       # element selected
+        ('text', 'surface0', 'text'),    # element
+        ('base', 'red', 'text'),         # prompt colon
+        ('base', 'green', 'text'),       # prompt
+    ],
+))
+
+register_target(Target(
+    name='rofi-launcher',
+    render=generate_rofi_launcher_colors,
+    filename='rofi-launcher-colors.rasi',
+    deploy='rofi/launchers/type-2/shared/colors.rasi',
+    requires='rofi',
+    contrast=[
+        ('text', 'base', 'text'),
+        ('text', 'surface0', 'text'),
+        ('base', 'mauve', 'text'),       # element selected
+    ],
+))
+
+register_target(Target(
+    name='btop',
+    render=generate_btop,
+    filename='btop.theme',
+    deploy='btop/themes/current.theme',
+    requires='btop',
+    deploy_mode='btop',
+    contrast=[
+        ('text', 'crust', 'text'),
+        ('pink', 'surface2', 'text'),    # selected row
+        ('subtext1', 'crust', 'text'),   # graph text
+        ('overlay0', 'crust', 'ui'),     # inactive
+    ],
+))
+
+register_target(Target(
+    name='cava',
+    render=generate_cava,
+    filename='cava',
+    deploy='cava/config',
+    requires='cava',
+    contrast=[
+        ('mauve', 'base', 'ui'),
+        ('green', 'base', 'ui'),
+    ],
+))
+
+register_target(Target(
+    name='alacritty',
+    render=generate_alacritty,
+    filename='alacritty-theme.toml',
+    deploy='alacritty/alacritty.toml',
+    requires='alacritty',
+    deploy_mode='alacritty',
+    contrast=[
+        ('text', 'base', 'text'),
+        ('base', 'pink', 'text'),        # selection, cursor text
+    ],
+))
+
+register_target(Target(
+    name='kitty',
+    render=generate_kitty,
+    filename='kitty-theme.conf',
+    deploy='kitty/theme.conf',
+    requires='kitty',
+    reload='kitty-remote',
+    contrast=[
+        ('text', 'base', 'text'),
+        ('base', 'pink', 'text'),        # selection, cursor text
+        ('crust', 'mauve', 'text'),      # active tab
+        ('text', 'mantle', 'text'),      # inactive tab
+        ('pink', 'base', 'text'),        # url
+        ('red', 'base', 'text'),
+        ('green', 'base', 'text'),
+        ('yellow', 'base', 'text'),
+        ('blue', 'base', 'text'),
+        ('teal', 'base', 'text'),
+        ('lavender', 'base', 'ui'),      # active border
+    ],
+))
+
+register_target(Target(
+    name='theme-menu',
+    render=generate_theme_menu,
+    filename='theme-switcher-menu.rasi',
+    deploy='theme-switcher/theme-switcher-menu.rasi',
+    requires='rofi',
+    contrast=[
+        ('text', 'base', 'text'),
+        ('base', 'mauve', 'text'),       # inputbar, element selected
+    ],
+))
+
+register_target(Target(
+    name='starship',
+    render=generate_starship,
+    filename='starship-palette.toml',
+    deploy='starship/palette.toml',
+    requires='starship',
+    contrast=[
+        ('crust', 'red', 'text'),
+        ('crust', 'peach', 'text'),
+        ('crust', 'yellow', 'text'),
+        ('crust', 'green', 'text'),
+        ('crust', 'sapphire', 'text'),
+        ('crust', 'lavender', 'text'),
+        ('green', 'base', 'text'),       # prompt character
+        ('red', 'base', 'text'),
+    ],
+))
+
+def starship_config_target(layout: str) -> Target:
+    """
+    The 'starship' target in pre-merged mode: a complete starship.toml per
+    theme, rendered from the given prompt layout, in place of the palette
+    file the layout would otherwise have to pull in.
+    """
+    return replace(
+        TARGETS['starship'],
+        render=lambda theme_name, mapped: generate_starship_config(theme_name, mapped, layout),
+        filename='starship.toml',
+        deploy='starship/starship.toml',
+    )
+
+register_target(Target(
+    name='shell',
+    render=generate_shell,
+    filename='shell-colors.zsh',
+    deploy='theme-switcher/shell-colors.zsh',
+    requires='zsh',
+    deploy_mode='shell-init',
+    contrast=[
+        ('text', 'base', 'text'),
+        ('text', 'surface0', 'text'),    # fzf current line
+        ('red', 'base', 'text'),         # fzf match, unknown command
+        ('green', 'base', 'text'),       # commands
+        ('yellow', 'base', 'text'),      # quoted arguments
+        ('blue', 'base', 'text'),        # directories
+        ('overlay0', 'base', 'ui'),      # comments, autosuggestions
+    ],
+))
+
+register_target(Target(
+    name='workspace-accents',
+    render=generate_workspace_accents,
+    filename='hyprland-workspaces.tsv',
+    deploy='hypr/workspace-accents.tsv',
+    requires='hyprctl',
+    contrast=[(role, 'base', 'ui') for role in WORKSPACE_ACCENT_ROLES],
+))
+
+register_target(Target(
+    name='hyprland',
+    render=generate_hyprland_colors,
+    filename='hyprland-colors.conf',
+    deploy='hypr/colors.conf',
+    requires='hyprctl',
+    reload='hyprctl',
+    contrast=[
+        ('mauve', 'base', 'ui'),         # active border
+    ],
+))
+
+register_target(Target(
+    name='hyprlock',
+    render=generate_hyprlock_colors,
+    filename='hyprlock-colors.conf',
+    deploy='hypr/hyprlock-colors.conf',
+    requires='hyprlock',
+    deploy_mode='lock-background',
+    contrast=[
+        ('text', 'base', 'text'),        # clock
+        ('subtext0', 'base', 'text'),    # date, placeholder
+        ('text', 'surface0', 'text'),    # input field
+        ('mauve', 'base', 'ui'),         # input outer color
+        ('red', 'base', 'ui'),           # failed attempt
+    ],
+))
+
+register_target(Target(
+    name='waybar-calendar',
+    render=generate_waybar_calendar,
+    filename='waybar-calendar.jsonc',
+    deploy='waybar/calendar-colors.jsonc',
+    requires='waybar',
+    reload='restart',
+    contrast=[
+        ('pink', 'base', 'text'),        # month
+        ('text', 'base', 'text'),        # days
+        ('teal', 'base', 'text'),        # week numbers
+        ('yellow', 'base', 'text'),      # weekdays
+        ('red', 'base', 'text'),         # today
+    ],
+))
+
+register_target(Target(
+    name='roles',
+    render=generate_roles,
+    filename='roles.tsv',
+    deploy='theme-switcher/roles.tsv',
+    requires='bash',
+))
+
+
+# ============================================================================
+# CONTRAST AUDIT
+# ============================================================================
+
+def audit_contrast(
+    themes: Dict[str, Dict[str, str]],
+    min_text: float = MIN_TEXT_CONTRAST,
+    min_ui: float = MIN_UI_CONTRAST,
+) -> List[ContrastResult]:
+    """
+    Compute WCAG and APCA contrast for every target role pair of every theme.
+
+    All pairs are flattened into columns first and luminances are computed
+    once per distinct color, so auditing N palettes costs one pass over the
+    unique colors plus one arithmetic sweep over the pairs.
+    """
+    rows = [
+        (theme, target.name, fg, bg, kind)
+        for theme in themes
+        for target in TARGETS.values()
+        for fg, bg, kind in target.contrast
+    ]
+    fg_hex = [themes[theme][fg] for theme, _, fg, _, _ in rows]
+    bg_hex = [themes[theme][bg] for theme, _, _, bg, _ in rows]
+
+    unique = set(fg_hex) | set(bg_hex)
+    wcag_lum = {c: relative_luminance(c) for c in unique}
+    apca_lum = {c: apca_luminance(c) for c in unique}
+
+    wcag = [wcag_ratio(wcag_lum[f], wcag_lum[b]) for f, b in zip(fg_hex, bg_hex)]
+    apca = [apca_contrast(apca_lum[f], apca_lum[b]) for f, b in zip(fg_hex, bg_hex)]
+
+    return [
+        ContrastResult(theme, target, fg, bg, kind, f, b, ratio, lc,
+                       min_text if kind == 'text' else min_ui)
+        for (theme, target, fg, bg, kind), f, b, ratio, lc
+        in zip(rows, fg_hex, bg_hex, wcag, apca)
+    ]
+
+
+def fix_contrast(
+    theme_name: str,
+    mapped: Dict[str, str],
+    min_text: float = MIN_TEXT_CONTRAST,
+    min_ui: float = MIN_UI_CONTRAST,
+    max_passes: int = 4,
+) -> Tuple[Dict[str, str], Dict[str, Tuple[str, str]]]:
+    """
+    Nudge role lightness until every pair meets its threshold.
+    Returns the adjusted mapping and {role: (old, new)} for changed roles.
+    """
+    fixed = dict(mapped)
+    for _ in range(max_passes):
+        failing = [r for r in audit_contrast({theme_name: fixed}, min_text, min_ui)
+                   if not r.passed]
+        if not failing:
+            break
+        for result in failing:
+            role, other = (result.bg, result.fg) if result.fg in SURFACE_ROLES else (result.fg, result.bg)
+            if wcag_ratio(relative_luminance(fixed[role]),
+                          relative_luminance(fixed[other])) < result.threshold:
+                fixed[role] = nudge_lightness(fixed[role], fixed[other], result.threshold)
+
+    changes = {role: (mapped[role], fixed[role])
+               for role in mapped if fixed[role] != mapped[role]}
+    return fixed, changes
+
+
+# ============================================================================
+# PALETTE VARIANTS
+# ============================================================================
+
+# Variants derived from every palette, keyed by the theme name suffix
+VARIANTS: Dict[str, PaletteVariant] = {}
+
+# Roles a 'black' variant turns #000000
+BLACK_ROLES = {'base', 'mantle', 'crust'}
+
+
+def register_variant(variant: PaletteVariant) -> None:
+    """Add (or replace) a variant in the registry"""
+    VARIANTS[variant.name] = variant
+
+
+register_variant(PaletteVariant('oled', 'OLED', black=True, applies_to='dark'))
+register_variant(PaletteVariant('high-contrast', 'High Contrast', contrast=1.25))
+register_variant(PaletteVariant('dim', 'Dimmed', lightness=0.85, contrast=0.9, chroma=0.75))
+
+
+def derive_palettes(palettes: Dict[str, Dict[str, str]],
+                    variant: PaletteVariant) -> Dict[str, Dict[str, str]]:
+    """
+    Apply a variant to many mapped palettes in one pass. The palettes are
+    laid out as flat L/a/b columns (palette x role): every distinct color
+    is converted to OKLab once, the transforms run column-wise and every
+    distinct result is converted back once. Palettes lacking a role or
+    holding a non-hex color are left out. Returns {name: mapped roles} for
+    the derived palettes.
+    """
+    lab: Dict[str, Tuple[float, float, float]] = {}
+    for color in {color for mapped in palettes.values() for color in mapped.values()}:
+        try:
+            lab[color] = hex_to_oklab(color)
+        except (ValueError, TypeError):
+            pass
+    names = [name for name, mapped in palettes.items()
+             if all(mapped.get(role) in lab for role in COLOR_ROLES)]
+    cells = [palettes[name][role] for name in names for role in COLOR_ROLES]
+    
+    width = len(COLOR_ROLES)
+    k = variant.lightness
+    L = [lab[color][0] * k for color in cells]
+    ref = [L[i - i % width] for i in range(len(L))]   # each palette's base
+    L = [min(1.0, max(0.0, r + (l - r) * variant.contrast)) for l, r in zip(L, ref)]
+    A = [lab[color][1] * variant.chroma for color in cells]
+    B = [lab[color][2] * variant.chroma for color in cells]
+    if variant.black:
+        for i in range(len(L)):
+            if COLOR_ROLES[i % width] in BLACK_ROLES:
+                L[i] = A[i] = B[i] = 0.0
+    
+    converted: Dict[Tuple[float, float, float], str] = {}
+    hexes = []
+    for cell in zip(L, A, B):
+        if cell not in converted:
+            converted[cell] = oklab_to_hex(cell)
+        hexes.append(converted[cell])
+    
+    return {name: dict(zip(COLOR_ROLES, hexes[i * width:(i + 1) * width]))
+            for i, name in enumerate(names)}
+
+
+# ============================================================================
+# RENDERING API
+# ============================================================================
+
+def resolve_targets(targets: Optional[Iterable[Union[str, Target]]] = None) -> List[Target]:
+    """Targets by name (or as Target objects); all registered ones by default"""
+    if targets is None:
+        return list(TARGETS.values())
+    resolved, unknown = [], []
+    for target in targets:
+        if isinstance(target, Target):
+            resolved.append(target)
+        elif target in TARGETS:
+            resolved.append(TARGETS[target])
+        else:
+            unknown.append(target)
+    if unknown:
+        raise UnknownTargetError(unknown)
+    return resolved
+
+
+def render(palette: Union[Dict[str, str], str, os.PathLike], name: Optional[str] = None,
+           targets: Optional[Iterable[Union[str, Target]]] = None, **options) -> Dict[str, bytes]:
+    """
+    Render a palette, given as a dict or as the path of a JSON palette file,
+    into target name -> file contents. The name selects the palette's naming
+    convention (e.g. 'nord'); base16/base24 palettes ('family': 'base16')
+    need none. Options are ThemeConfig fields (fix_contrast, min_text, ...).
+    """
+    if isinstance(palette, (str, os.PathLike)):
+        theme = ThemeConfig.from_file(palette, name, **options)
+    else:
+        theme = ThemeConfig(name or 'custom', dict(palette), **options)
+    return theme.render(targets)
@@ -44,6 +44,227 @@ check_command() {
     command -v "$1" &> /dev/null
 }
 
+# starship.toml is rendered per theme from starship/layout.toml and deployed
+# by the theme switcher, so the repository does not ship one: put the
+# current theme's in place when there is none yet
+deploy_starship_config() {
+    local switcher="$HOME/.config/theme-switcher/scripts/switcher.sh"
+    local theme
+
+    if [ -f "$HOME/.config/starship/starship.toml" ] || [ ! -x "$switcher" ]; then
+        return 0
+    fi
+    theme=$(cat "$HOME/.config/theme-switcher/.current-theme" 2>/dev/null || true)
+    theme="${theme:-catppuccin-mocha}"
+    if "$switcher" apply "$theme" --targets starship --quiet > /dev/null; then
+        print_success "Starship config rendered for $theme"
+    else
+        print_warning "Starship config not rendered (applying a theme creates it)"
+    fi
+}
+
+DOTFILES_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
+# ============================================================================
+# SYNC MODE
+# ============================================================================
+# ./install.sh --sync updates an installed copy of the dotfiles in place of a
+# full reinstall. A manifest records the hash of every file it installed, so
+# only files changed upstream since the last sync are hashed and copied (each
+# replaced atomically), files edited locally are kept and reported as
+# conflicts, and only themes whose palette or generator changed are
+# regenerated. Directories installed as symlinks are already current.
+
+SYNC_STATE_DIR="${XDG_STATE_HOME:-$HOME/.local/state}/hyprland-dotfiles"
+SYNC_MANIFEST="$SYNC_STATE_DIR/manifest.tsv"  # path, size, mtime, sha256
+
+# Set $dest to where a repository path is installed (empty: not synced;
+# rendered themes and switcher backups are local state)
+sync_destination() {
+    case "$1" in
+        config/theme-switcher/themes/*|config/theme-switcher/backups/*) dest="" ;;
+        config/*)     dest="$HOME/.config/${1#config/}" ;;
+        .zshrc)       dest="$HOME/.zshrc" ;;
+        wallpapers/*) dest="$HOME/Pictures/Wallpapers/${1#wallpapers/}" ;;
+        *)            dest="" ;;
+    esac
+}
+
+# "PATH<TAB>SIZE<TAB>MTIME" for every tracked file (one stat call for all)
+sync_sources() (
+    cd "$DOTFILES_DIR"
+    if [ -d .git ] && check_command git; then
+        git ls-files -z -- config .zshrc wallpapers
+    else
+        find config wallpapers .zshrc -type f -print0 2>/dev/null
+    fi | xargs -0 -r stat --printf '%n\t%s\t%.9Y\n' 2>/dev/null
+)
+
+sha256_of() {
+    local sum
+    sum=$(sha256sum < "$1") || return 1
+    echo "${sum%% *}"
+}
+
+# Copy SRC over DEST atomically: readers see the old or the new file, never
+# a partial one
+sync_install() {
+    local tmp
+    mkdir -p "${2%/*}"
+    tmp=$(mktemp "${2%/*}/.dotfiles-sync.XXXXXX") || return 1
+    if cp -p "$1" "$tmp" && mv -f "$tmp" "$2"; then
+        return 0
+    fi
+    rm -f "$tmp"
+    return 1
+}
+
+sync_dotfiles() {
+    local -A old_size=() old_mtime=() old_hash=() size_of=() mtime_of=() hash_of=() seed=()
+    local -a to_hash=() updated=() conflicts=() kept=()
+    local rel size mtime hash dest dest_hash deploy name
+    local linked=0 removed=0 regenerate=false
+    local manifest_tmp
+
+    print_header "Syncing Dotfiles"
+
+    if [ -f "$SYNC_MANIFEST" ]; then
+        while IFS=$'\t' read -r rel size mtime hash; do
+            old_size[$rel]=$size
+            old_mtime[$rel]=$mtime
+            old_hash[$rel]=$hash
+        done < "$SYNC_MANIFEST"
+    else
+        print_info "No sync manifest yet, comparing every file"
+        regenerate=true
+    fi
+
+    # Files the theme switcher rewrites are only installed when missing
+    while IFS=$'\t' read -r name _ deploy _; do
+        [[ -z "$name" || "$name" == \#* ]] || seed["config/$deploy"]=1
+    done < "$DOTFILES_DIR/config/theme-switcher/targets.tsv"
+    seed[config/theme-switcher/current_theme]=1
+    seed[config/theme-switcher/.current-theme]=1
+
+    # Only files whose size or mtime changed since the last sync are hashed
+    while IFS=$'\t' read -r rel size mtime; do
+        sync_destination "$rel"
+        [ -n "$dest" ] || continue
+        size_of[$rel]=$size
+        mtime_of[$rel]=$mtime
+        if [[ "${old_size[$rel]:-}" == "$size" && "${old_mtime[$rel]:-}" == "$mtime" ]]; then
+            hash_of[$rel]=${old_hash[$rel]}
+        else
+            to_hash+=("$rel")
+        fi
+    done < <(sync_sources)
+
+    if [ ${#to_hash[@]} -gt 0 ]; then
+        while read -r hash rel; do
+            hash_of[$rel]=$hash
+        done < <(cd "$DOTFILES_DIR" && printf '%s\0' "${to_hash[@]}" | xargs -0 sha256sum)
+    fi
+
+    mkdir -p "$SYNC_STATE_DIR"
+    manifest_tmp=$(mktemp "$SYNC_STATE_DIR/.manifest.XXXXXX")
+
+    for rel in "${!hash_of[@]}"; do
+        sync_destination "$rel"
+        hash=${hash_of[$rel]}
+
+        if [ "$DOTFILES_DIR/$rel" -ef "$dest" ]; then
+            linked=$((linked + 1))
+            continue
+        fi
+
+        # Unchanged upstream since the last sync
+        if [[ -e "$dest" && "${old_hash[$rel]:-}" == "$hash" ]]; then
+            printf '%s\t%s\t%s\t%s\n' "$rel" "${size_of[$rel]}" "${mtime_of[$rel]}" "$hash" >> "$manifest_tmp"
+            continue
+        fi
+
+        if [ -e "$dest" ]; then
+            dest_hash=$(sha256_of "$dest" 2>/dev/null || true)
+            if [[ "$dest_hash" == "$hash" || -n "${seed[$rel]:-}" ]]; then
+                # Already identical, or owned by the current theme
+                printf '%s\t%s\t%s\t%s\n' "$rel" "${size_of[$rel]}" "${mtime_of[$rel]}" "$hash" >> "$manifest_tmp"
+                continue
+            fi
+            if [[ -z "${old_hash[$rel]:-}" || "$dest_hash" != "${old_hash[$rel]}" ]]; then
+                # Edited locally: keep it, leave the new version next to it and
+                # the old manifest entry, so the conflict is reported until resolved
+                if sync_install "$DOTFILES_DIR/$rel" "$dest.dotfiles-new"; then
+                    conflicts+=("$dest")
+                fi
+                if [ -n "${old_hash[$rel]:-}" ]; then
+                    printf '%s\t%s\t%s\t%s\n' "$rel" "${old_size[$rel]}" "${old_mtime[$rel]}" "${old_hash[$rel]}" >> "$manifest_tmp"
+                fi
+                continue
+            fi
+        fi
+
+        if sync_install "$DOTFILES_DIR/$rel" "$dest"; then
+            updated+=("$dest")
+            printf '%s\t%s\t%s\t%s\n' "$rel" "${size_of[$rel]}" "${mtime_of[$rel]}" "$hash" >> "$manifest_tmp"
+            [[ "$rel" == config/theme-switcher/* ]] && regenerate=true
+        else
+            print_error "Failed to install $dest"
+        fi
+    done
+
+    # Files removed upstream go too, unless they were edited locally
+    for rel in "${!old_hash[@]}"; do
+        [ -n "${hash_of[$rel]+x}" ] && continue
+        sync_destination "$rel"
+        [ -f "$dest" ] || continue
+        if [ "$(sha256_of "$dest")" = "${old_hash[$rel]}" ]; then
+            rm -f "$dest"
+            removed=$((removed + 1))
+        else
+            kept+=("$dest")
+        fi
+    done
+
+    sort -o "$manifest_tmp" "$manifest_tmp"
+    mv -f "$manifest_tmp" "$SYNC_MANIFEST"
+
+    if [ ${#updated[@]} -gt 0 ]; then
+        printf '%s\n' "${updated[@]}" | sort | while IFS= read -r dest; do
+            print_success "Updated ${dest/#$HOME/\~}"
+        done
+    fi
+    [ "$removed" -gt 0 ] && print_success "Removed $removed files deleted upstream"
+    [ "$linked" -gt 0 ] && print_info "$linked files are symlinked to the repository (already current)"
+
+    if [ ${#conflicts[@]} -gt 0 ]; then
+        print_warning "Kept ${#conflicts[@]} locally modified files (new version saved as *.dotfiles-new):"
+        printf '%s\n' "${conflicts[@]}" | sort | sed "s|^$HOME|  ~|"
+    fi
+    if [ ${#kept[@]} -gt 0 ]; then
+        print_warning "Kept ${#kept[@]} locally modified files that were removed upstream:"
+        printf '%s\n' "${kept[@]}" | sort | sed "s|^$HOME|  ~|"
+    fi
+
+    # Only themes whose palette or generator changed are re-rendered
+    if [ "$regenerate" = true ] && [ "${THEME_SWITCHER_LAZY:-0}" != "1" ] \
+        && [ -f "$HOME/.config/theme-switcher/scripts/generate-themes.py" ]; then
+        print_info "Regenerating changed themes..."
+        if python "$HOME/.config/theme-switcher/scripts/generate-themes.py" --incremental; then
+            print_success "Themes up to date"
+        else
+            print_warning "Theme generation failed (can be done manually later)"
+        fi
+    fi
+    deploy_starship_config
+
+    print_success "Sync complete: ${#updated[@]} updated, ${#conflicts[@]} conflicts"
+}
+
+if [ "${1:-}" = "--sync" ]; then
+    sync_dotfiles
+    exit 0
+fi
+
 # ============================================================================
 # SYSTEM CHECKS
 # ============================================================================
@@ -325,8 +546,6 @@ fi
 
 print_header "Creating Symlinks"
 
-DOTFILES_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-
 for config in "${configs[@]}"; do
     if [ -d "$DOTFILES_DIR/config/$config" ]; then
         print_info "Linking $config..."
@@ -369,10 +588,12 @@ done
 
 print_header "Generating Themes"
 
-if [ -f "$HOME/.config/theme-switcher/scripts/generate-themes.py" ]; then
+if [ "${THEME_SWITCHER_LAZY:-0}" = "1" ]; then
+    print_info "Lazy theme mode: themes are rendered on first use"
+elif [ -f "$HOME/.config/theme-switcher/scripts/generate-themes.py" ]; then
     print_info "Generating theme files..."
     cd "$HOME/.config/theme-switcher/scripts"
-    if python generate-themes.py; then
+    if python generate-themes.py --incremental; then
         print_success "Themes generated successfully!"
     else
         print_warning "Theme generation failed (can be done manually later)"
@@ -380,6 +601,7 @@ if [ -f "$HOME/.config/theme-switcher/scripts/generate-themes.py" ]; then
 else
     print_warning "Theme generator not found"
 fi
+deploy_starship_config
 
 # ============================================================================
 # COPY WALLPAPERS